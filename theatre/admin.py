@@ -7,7 +7,10 @@ from theatre.models import (
     TheatreHall,
     Performance,
     Ticket,
-    Reservation
+    Reservation,
+    SalesSummary,
+    SeatHold,
+    HeldSeat,
 )
 
 
@@ -21,6 +24,23 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = (TicketInLine,)
 
 
+class HeldSeatInLine(admin.TabularInline):
+    model = HeldSeat
+    extra = 0
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    inlines = (HeldSeatInLine,)
+    list_display = ("id", "performance", "user", "expires_at")
+
+
+@admin.register(SalesSummary)
+class SalesSummaryAdmin(admin.ModelAdmin):
+    list_display = ("performance", "day", "tickets_sold")
+    list_filter = ("day",)
+
+
 admin.site.register(Genre)
 admin.site.register(Actor)
 admin.site.register(Play)
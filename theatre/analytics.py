@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from theatre.models import SalesSummary, Ticket
+
+OCCUPANCY_GROUPS = {
+    "performance": ("id", "play__title"),
+    "play": ("play_id", "play__title"),
+    "hall": ("theatre_hall_id", "theatre_hall__name"),
+    "day": ("show_day", None),
+    "week": ("show_week", None),
+}
+SALES_INTERVALS = ("day", "week")
+
+
+def show_periods(prefix=""):
+    tz = timezone.get_current_timezone()
+    return {
+        "show_day": TruncDate(f"{prefix}show_time", tzinfo=tz),
+        "show_week": TruncWeek(f"{prefix}show_time", tzinfo=tz),
+    }
+
+
+def occupancy(performances, group_by):
+    """
+    Sold tickets against capacity for ``performances`` grouped by
+    performance, play, hall or show day/week. Sales come from the
+    summary table, never from tickets.
+    """
+    key, label = OCCUPANCY_GROUPS[group_by]
+    performances = performances.order_by()
+    summaries = SalesSummary.objects.filter(
+        performance__in=performances.values("id")
+    )
+    if key.startswith("show_"):
+        performances = performances.annotate(**show_periods())
+        summaries = summaries.annotate(**show_periods("performance__"))
+        sold_key = key
+    else:
+        sold_key = f"performance__{key}"
+
+    fields = {"key": F(key)}
+    if label:
+        fields["label"] = F(label)
+    groups = (
+        performances
+        .values(**fields)
+        .annotate(
+            performances=Count("id"),
+            capacity=Sum(
+                F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+            ),
+        )
+        .order_by("key")
+    )
+    sold = dict(
+        summaries
+        .values_list(sold_key)
+        .annotate(sold=Sum("tickets_sold"))
+        .order_by()
+    )
+
+    rows = []
+    for group in groups:
+        group["sold"] = sold.get(group["key"], 0)
+        group["occupancy"] = (
+            round(group["sold"] / group["capacity"], 4)
+            if group["capacity"] else 0
+        )
+        if group_by == "week":
+            group["key"] = timezone.localdate(group["key"])
+        rows.append(group)
+    return rows
+
+
+def sales(performances, interval):
+    """Tickets sold per sale day or week for ``performances``."""
+    summaries = SalesSummary.objects.filter(
+        performance__in=performances.order_by().values("id")
+    )
+    if interval == "week":
+        summaries = summaries.annotate(period=TruncWeek("day"))
+    else:
+        summaries = summaries.annotate(period=F("day"))
+
+    return list(
+        summaries
+        .values("period")
+        .annotate(tickets_sold=Sum("tickets_sold"))
+        .order_by("period")
+    )
+
+
+def rebuild_sales_summary(batch_size=5000):
+    sales = (
+        Ticket.objects
+        .order_by()
+        .values(
+            "performance_id",
+            day=TruncDate(
+                "reservation__created_at",
+                tzinfo=timezone.get_current_timezone()
+            ),
+        )
+        .annotate(tickets_sold=Count("id"))
+    )
+
+    with transaction.atomic():
+        SalesSummary.objects.all().delete()
+        return SalesSummary.objects.bulk_create(
+            (SalesSummary(**row) for row in sales.iterator()),
+            batch_size=batch_size,
+        )
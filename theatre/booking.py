@@ -0,0 +1,435 @@
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ErrorDetail
+
+from theatre import events
+from theatre.cache import bump_watermarks
+from theatre.models import (
+    HeldSeat,
+    Performance,
+    Reservation,
+    SalesSummary,
+    SeatHold,
+    Ticket,
+)
+from theatre.seating import best_blocks, held_seats, row_masks, taken_seats
+
+ALLOCATION_ATTEMPTS = 3
+
+
+class SeatsUnavailable(Exception):
+    def __init__(self, seats):
+        self.seats = sorted(seats)
+        super(SeatsUnavailable, self).__init__(
+            f"Seats are not available: {self.seats}"
+        )
+
+
+class SeatsConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the requested seats are not available."
+    default_code = "seat_conflict"
+
+    def __init__(self, seats):
+        super(SeatsConflict, self).__init__()
+        self.detail = {
+            "detail": ErrorDetail(self.default_detail, self.default_code),
+            "seats": [
+                {"performance": performance_id, "row": row, "seat": seat}
+                for performance_id, row, seat in sorted(seats)
+            ],
+        }
+
+
+class NoSeatsTogether(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Not enough free seats next to each other."
+    default_code = "no_seats_together"
+
+
+def seat_key(ticket_data):
+    performance = ticket_data["performance"]
+    performance_id = getattr(performance, "pk", performance)
+    return performance_id, ticket_data["row"], ticket_data["seat"]
+
+
+def seat_errors(tickets_data, seats, message):
+    seats = set(seats)
+    errors = []
+
+    for ticket_data in tickets_data:
+        _, row, seat = key = seat_key(ticket_data)
+        if key in seats:
+            errors.append(
+                {"Seats": f"Seat (row: {row}, seat: {seat}) {message}"}
+            )
+        else:
+            errors.append({})
+
+    return errors
+
+
+def seats_condition(seats):
+    condition = Q()
+    for performance_id, row, seat in seats:
+        condition |= Q(performance_id=performance_id, row=row, seat=seat)
+    return condition
+
+
+def find_taken_seats(seats):
+    seats = set(seats)
+    if not seats:
+        return set()
+
+    return set(
+        Ticket.objects.filter(seats_condition(seats)).values_list(
+            "performance_id", "row", "seat"
+        )
+    )
+
+
+def find_held_seats(seats, exclude_user=None):
+    seats = set(seats)
+    if not seats:
+        return set()
+
+    held_seats = HeldSeat.objects.filter(
+        seats_condition(seats),
+        hold__expires_at__gt=timezone.now(),
+    )
+    if exclude_user is not None:
+        held_seats = held_seats.exclude(hold__user=exclude_user)
+
+    return set(held_seats.values_list("performance_id", "row", "seat"))
+
+
+def holders_of_seats(seats):
+    seats = set(seats)
+    if not seats:
+        return {}
+
+    return {
+        (performance_id, row, seat): user_id
+        for performance_id, row, seat, user_id in HeldSeat.objects.filter(
+            seats_condition(seats),
+            hold__expires_at__gt=timezone.now(),
+        ).values_list("performance_id", "row", "seat", "hold__user_id")
+    }
+
+
+def book_tickets(reservation, tickets_data):
+    held = find_held_seats(
+        map(seat_key, tickets_data), exclude_user=reservation.user_id
+    )
+    if held:
+        raise SeatsUnavailable(held)
+
+    tickets = [
+        Ticket(reservation=reservation, **ticket_data)
+        for ticket_data in tickets_data
+    ]
+
+    try:
+        with transaction.atomic():
+            tickets = Ticket.objects.bulk_create(tickets)
+    except IntegrityError:
+        taken = find_taken_seats(map(seat_key, tickets_data))
+        if not taken:
+            raise
+        raise SeatsUnavailable(taken)
+
+    increment_tickets_sold(tickets)
+    record_sales(
+        Counter(ticket.performance_id for ticket in tickets),
+        timezone.localdate(reservation.created_at)
+    )
+
+    return tickets
+
+
+def find_blocks(performance, count):
+    """Free blocks of ``count`` seats, taken and held seats excluded."""
+    theatre_hall = performance.theatre_hall
+    occupied = list(taken_seats(performance.id))
+    occupied += held_seats(performance.id)
+
+    return best_blocks(
+        row_masks(theatre_hall.rows, theatre_hall.seats_in_row, occupied),
+        theatre_hall.seats_in_row,
+        count,
+    )
+
+
+def allocate_seats(reservation, performance, count):
+    """
+    Book the most central ``count`` adjacent seats. When another booking
+    takes them first, occupancy is read again and the next best block is
+    tried, up to ``ALLOCATION_ATTEMPTS`` times.
+    """
+    for _ in range(ALLOCATION_ATTEMPTS):
+        blocks = find_blocks(performance, count)
+        if not blocks:
+            raise NoSeatsTogether()
+
+        row, first = blocks[0]
+        try:
+            return book_tickets(
+                reservation,
+                [
+                    {"performance": performance, "row": row, "seat": seat}
+                    for seat in range(first, first + count)
+                ]
+            )
+        except SeatsUnavailable:
+            continue
+
+    raise NoSeatsTogether(
+        "The seats were taken by other bookings, please try again."
+    )
+
+
+BatchResult = namedtuple("BatchResult", ("reservation", "tickets", "seats"))
+
+
+def book_batch(requests):
+    """
+    Book ``(user, tickets_data)`` requests together: taken and held seats
+    are looked up once for the whole batch and every reservation that can
+    be booked is written by the same few bulk statements in one
+    transaction. Returns a ``BatchResult`` per request, with either the
+    reservation and its tickets or the seats that were unavailable.
+    Seats requested twice within the batch go to the earlier request.
+    """
+    keys = [
+        [seat_key(ticket_data) for ticket_data in tickets_data]
+        for _, tickets_data in requests
+    ]
+    all_keys = {key for request_keys in keys for key in request_keys}
+    taken = find_taken_seats(all_keys)
+    holders = holders_of_seats(all_keys)
+
+    results = [None] * len(requests)
+    pending = []
+    claimed = set()
+    for index, (user, _) in enumerate(requests):
+        unavailable = {
+            key for key in keys[index]
+            if key in taken
+            or key in claimed
+            or holders.get(key, user.pk) != user.pk
+        }
+        if unavailable:
+            results[index] = BatchResult(None, None, sorted(unavailable))
+        else:
+            claimed.update(keys[index])
+            pending.append(index)
+
+    while pending:
+        try:
+            with transaction.atomic():
+                booked = insert_batch([requests[index] for index in pending])
+        except IntegrityError:
+            # Someone else booked some of the seats in the meantime: drop
+            # the requests that lost them and write the rest again.
+            taken = find_taken_seats(
+                key for index in pending for key in keys[index]
+            )
+            if not taken:
+                raise
+            lost = {
+                index: sorted(taken.intersection(keys[index]))
+                for index in pending
+            }
+            for index, seats in lost.items():
+                if seats:
+                    results[index] = BatchResult(None, None, seats)
+            pending = [index for index in pending if not lost[index]]
+        else:
+            for index, (reservation, tickets) in zip(pending, booked):
+                results[index] = BatchResult(reservation, tickets, [])
+            break
+
+    return results
+
+
+def insert_batch(requests):
+    reservations = Reservation.objects.bulk_create(
+        [Reservation(user=user) for user, _ in requests]
+    )
+    tickets = Ticket.objects.bulk_create([
+        Ticket(reservation=reservation, **ticket_data)
+        for reservation, (_, tickets_data) in zip(reservations, requests)
+        for ticket_data in tickets_data
+    ])
+
+    increment_tickets_sold(tickets)
+    sales = defaultdict(Counter)
+    booked = []
+    start = 0
+    for reservation, (_, tickets_data) in zip(reservations, requests):
+        reservation_tickets = tickets[start:start + len(tickets_data)]
+        start += len(tickets_data)
+        sales[timezone.localdate(reservation.created_at)].update(
+            ticket.performance_id for ticket in reservation_tickets
+        )
+        booked.append((reservation, reservation_tickets))
+
+    for day, counts in sales.items():
+        record_sales(counts, day)
+
+    return booked
+
+
+def per_performance(counts):
+    return Case(
+        *[
+            When(pk=performance_id, then=Value(count))
+            for performance_id, count in counts.items()
+        ],
+        default=Value(0),
+    )
+
+
+def increment_tickets_sold(tickets):
+    counts = Counter(ticket.performance_id for ticket in tickets)
+    if not counts:
+        return
+
+    Performance.objects.filter(pk__in=counts).update(
+        tickets_sold=F("tickets_sold") + per_performance(counts)
+    )
+    # Bumped only once the new tickets are visible to other requests.
+    performance_ids = list(counts)
+    transaction.on_commit(
+        lambda: bump_watermarks(Performance, performance_ids)
+    )
+    events.tickets_changed(events.TAKEN, tickets)
+
+
+def release_tickets(tickets, day=None):
+    """
+    Take ``tickets``, deleted together, off the sold counters and, when
+    given, the sales of their sale ``day``.
+    """
+    counts = Counter(ticket.performance_id for ticket in tickets)
+    if not counts:
+        return
+
+    Performance.objects.filter(pk__in=counts).update(
+        tickets_sold=Greatest(
+            F("tickets_sold") - per_performance(counts), Value(0)
+        )
+    )
+    if day is not None:
+        record_sales(
+            {
+                performance_id: -count
+                for performance_id, count in counts.items()
+            },
+            day,
+        )
+    performance_ids = list(counts)
+    transaction.on_commit(
+        lambda: bump_watermarks(Performance, performance_ids)
+    )
+    events.tickets_changed(events.RELEASED, tickets)
+
+
+def record_sales(counts, day):
+    """Add per-performance ticket counts, possibly negative, to ``day``."""
+    counts = {
+        performance_id: count
+        for performance_id, count in counts.items() if count
+    }
+    if not counts:
+        return
+
+    added = [
+        SalesSummary(performance_id=performance_id, day=day)
+        for performance_id, count in counts.items() if count > 0
+    ]
+    if added:
+        # Make sure the rows exist, then bump them all in one UPDATE.
+        SalesSummary.objects.bulk_create(added, ignore_conflicts=True)
+
+    SalesSummary.objects.filter(performance_id__in=counts, day=day).update(
+        tickets_sold=Greatest(
+            F("tickets_sold") + Case(
+                *[
+                    When(performance_id=performance_id, then=Value(count))
+                    for performance_id, count in counts.items()
+                ],
+                default=Value(0),
+            ),
+            Value(0),
+        )
+    )
+
+
+def release_expired_holds(performance_id=None):
+    holds = SeatHold.objects.filter(expires_at__lte=timezone.now())
+    if performance_id is not None:
+        holds = holds.filter(performance_id=performance_id)
+
+    deleted, _ = holds.delete()
+    return deleted
+
+
+def hold_seats(user, performance, seats, expires_at):
+    keys = {(performance.id, row, seat) for row, seat in seats}
+
+    with transaction.atomic():
+        release_expired_holds(performance.id)
+
+        taken = find_taken_seats(keys)
+        if taken:
+            raise SeatsUnavailable(taken)
+
+        hold = SeatHold.objects.create(
+            user=user, performance=performance, expires_at=expires_at
+        )
+        try:
+            with transaction.atomic():
+                HeldSeat.objects.bulk_create([
+                    HeldSeat(
+                        hold=hold, performance=performance, row=row, seat=seat
+                    )
+                    for row, seat in seats
+                ])
+        except IntegrityError:
+            held = find_held_seats(keys)
+            if not held:
+                raise
+            raise SeatsUnavailable(held)
+
+    return hold
+
+
+def confirm_hold(hold):
+    with transaction.atomic():
+        hold = (
+            SeatHold.objects
+            .select_for_update()
+            .select_related("performance")
+            .get(pk=hold.pk, expires_at__gt=timezone.now())
+        )
+        reservation = Reservation.objects.create(user_id=hold.user_id)
+        book_tickets(
+            reservation,
+            [
+                {
+                    "performance": hold.performance,
+                    "row": row,
+                    "seat": seat
+                }
+                for row, seat in hold.seats.values_list("row", "seat")
+            ]
+        )
+        hold.delete()
+
+    return reservation
@@ -0,0 +1,258 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+VERSION_KEY_PREFIX = "theatre:version"
+RESPONSE_KEY_PREFIX = "theatre:response"
+WATERMARK_KEY_PREFIX = "theatre:watermark"
+
+
+def version_key(model):
+    return f"{VERSION_KEY_PREFIX}:{model._meta.label_lower}"
+
+
+def get_counters(keys):
+    counters = cache.get_many(keys)
+
+    for key in keys:
+        if key not in counters:
+            # Seed evicted counters from the clock so they never fall back
+            # to a value something older was stored under.
+            cache.add(key, time.time_ns(), timeout=None)
+            counters[key] = cache.get(key)
+
+    return tuple(counters[key] for key in keys)
+
+
+def bump_counter(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return None
+
+
+def get_versions(models):
+    return get_counters([version_key(model) for model in models])
+
+
+def bump_version(model):
+    return bump_counter(version_key(model))
+
+
+def watermark_key(model, pk):
+    return f"{WATERMARK_KEY_PREFIX}:{model._meta.label_lower}:{pk}"
+
+
+def bump_watermarks(model, pks):
+    # A clock reading rather than a counter, so it doubles as the
+    # Last-Modified time of the object.
+    now = time.time_ns()
+    cache.set_many(
+        {watermark_key(model, pk): now for pk in pks}, timeout=None
+    )
+
+
+def make_etag(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(request, etag, wildcard=True):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return False
+
+    etags = parse_etags(if_none_match)
+    return (wildcard and "*" in etags) or etag in etags
+
+
+def not_modified(etag, **headers):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response["ETag"] = etag
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+class CachedResponseMixin:
+    cache_models = ()
+    cache_timeout = 60 * 60
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            super(CachedResponseMixin, self).list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super(CachedResponseMixin, self).retrieve,
+            request,
+            *args,
+            **kwargs
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(
+            super(CachedResponseMixin, self).alist, request, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(
+            super(CachedResponseMixin, self).aretrieve,
+            request,
+            *args,
+            **kwargs
+        )
+
+    def get_response_cache_key(self, request):
+        return ":".join((
+            RESPONSE_KEY_PREFIX,
+            self.basename,
+            make_etag(
+                get_versions(self.cache_models),
+                request.accepted_renderer.format,
+                # Responses hold absolute URLs, e.g. of posters.
+                request.build_absolute_uri(),
+            ).strip('"'),
+        ))
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache_key = self.get_response_cache_key(request)
+        cached = cache.get(cache_key)
+
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            etag = self.response_etag(request, response)
+            cache.set(cache_key, (response.data, etag), self.cache_timeout)
+        else:
+            data, etag = cached
+            response = Response(data)
+
+        return self.conditional_response(request, response, etag)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        cache_key = await sync_to_async(self.get_response_cache_key)(request)
+        cached = await cache.aget(cache_key)
+
+        if cached is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            etag = self.response_etag(request, response)
+            await cache.aset(
+                cache_key, (response.data, etag), self.cache_timeout
+            )
+        else:
+            data, etag = cached
+            response = Response(data)
+
+        return self.conditional_response(request, response, etag)
+
+    def response_etag(self, request, response):
+        return make_etag(
+            request.accepted_renderer.format,
+            JSONRenderer().render(response.data),
+        )
+
+    def conditional_response(self, request, response, etag):
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        response["ETag"] = etag
+        return response
+
+
+class WatermarkMixin:
+    """
+    Conditional GET for detail views of objects with a watermark.
+
+    The ETag is derived from the object's watermark and the versions of
+    ``watermark_models`` alone, so a matching ``If-None-Match`` is answered
+    with 304 from the cache before the object is even loaded.
+    """
+
+    watermark_models = ()
+
+    def get_watermark_lapse(self, pk):
+        """
+        When something the response shows last ran out on its own, which
+        bumps no watermark, in nanoseconds since the epoch.
+        """
+        return 0
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.watermarked_response(
+            super(WatermarkMixin, self).retrieve, request, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.awatermarked_response(
+            super(WatermarkMixin, self).aretrieve, request, *args, **kwargs
+        )
+
+    def get_watermark_validators(self, request):
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        watermark, *versions = get_counters([
+            watermark_key(self.queryset.model, pk),
+            *(version_key(model) for model in self.watermark_models),
+        ])
+        watermark = max(watermark, self.get_watermark_lapse(pk))
+        etag = make_etag(
+            watermark,
+            versions,
+            request.accepted_renderer.format,
+            request.get_full_path(),
+        )
+        return etag, http_date(watermark // 10 ** 9)
+
+    def watermarked_response(self, handler, request, *args, **kwargs):
+        validators = self.get_watermark_validators(request)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+
+        if self.watermark_matches(request, validators):
+            response = not_modified(validators[0])
+        else:
+            response = handler(request, *args, **kwargs)
+        return self.watermark_headers(response, validators)
+
+    async def awatermarked_response(self, handler, request, *args, **kwargs):
+        validators = await sync_to_async(self.get_watermark_validators)(
+            request
+        )
+        if validators is None:
+            return await handler(request, *args, **kwargs)
+
+        if self.watermark_matches(request, validators):
+            response = not_modified(validators[0])
+        else:
+            response = await handler(request, *args, **kwargs)
+        return self.watermark_headers(response, validators)
+
+    def watermark_matches(self, request, validators):
+        # The object has not been loaded, so "*" cannot be answered.
+        etag, _ = validators
+        return etag_matches(request, etag, wildcard=False)
+
+    def watermark_headers(self, response, validators):
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response["ETag"], response["Last-Modified"] = validators
+        return response
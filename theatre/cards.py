@@ -0,0 +1,69 @@
+"""
+Play cards: the genre and actor names a play list renders, stored on each
+play so that a page of plays is read in a single query.
+
+Model signals refresh the cards of the plays a change touches;
+``rebuild_cards`` recomputes all of them after writes that send no
+signals, such as bulk loads.
+"""
+from theatre.models import Play
+
+
+def build_cards(play_ids):
+    """``{play_id: card}`` with ``[id, name]`` pairs in id order."""
+    cards = {play_id: {"genres": [], "actors": []} for play_id in play_ids}
+
+    genres = (
+        Play.genres.through.objects
+        .filter(play_id__in=play_ids)
+        .order_by("genre_id")
+        .values_list("play_id", "genre_id", "genre__name")
+    )
+    for play_id, genre_id, name in genres:
+        cards[play_id]["genres"].append([genre_id, name])
+
+    actors = (
+        Play.actors.through.objects
+        .filter(play_id__in=play_ids)
+        .order_by("actor_id")
+        .values_list(
+            "play_id", "actor_id", "actor__first_name", "actor__last_name"
+        )
+    )
+    for play_id, actor_id, first_name, last_name in actors:
+        cards[play_id]["actors"].append(
+            [actor_id, f"{first_name} {last_name}"]
+        )
+
+    return cards
+
+
+def refresh_cards(play_ids):
+    play_ids = set(play_ids)
+    if not play_ids:
+        return
+
+    Play.objects.bulk_update(
+        [
+            Play(pk=play_id, card=card)
+            for play_id, card in build_cards(play_ids).items()
+        ],
+        ["card"],
+    )
+
+
+def linked_play_ids(instance):
+    """Ids of the plays linked to a genre or an actor."""
+    return list(instance.plays.values_list("id", flat=True))
+
+
+def rebuild_cards(batch_size=1000):
+    play_ids = Play.objects.order_by("id").values_list("id", flat=True)
+    rebuilt = 0
+
+    for start in range(0, play_ids.count(), batch_size):
+        batch = list(play_ids[start:start + batch_size])
+        refresh_cards(batch)
+        rebuilt += len(batch)
+
+    return rebuilt
@@ -0,0 +1,398 @@
+"""
+Seat availability events, pushed to clients as server-sent events.
+
+Bookings publish a delta per performance once they commit. Every worker
+fans events out to its own subscribers through an in-process broker; the
+broker's backend decides whether events published by one worker also
+reach the subscribers of the others.
+"""
+import asyncio
+import json
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from theatre.models import Performance
+
+TAKEN = "taken"
+RELEASED = "released"
+CONTENT_TYPE = "text/event-stream"
+
+QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+KEEPALIVE = b": keepalive\n\n"
+
+
+def format_event(kind, data, retry=None):
+    lines = [f"event: {kind}"]
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscription:
+    def __init__(self, broker, performance_id, queue_size):
+        self.broker = broker
+        self.performance_id = performance_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+        self.ended = False
+
+    def put(self, message):
+        # Runs on the subscriber's event loop.
+        if self.ended:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind to catch up with deltas: end the stream so
+            # the client reconnects and starts from a fresh snapshot.
+            self.end()
+
+    def end(self):
+        if self.ended:
+            return
+        self.ended = True
+        # Whatever is still queued is covered by the client's next snapshot.
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+def fan_out(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.put(message)
+
+
+def end_all(subscriptions):
+    for subscription in subscriptions:
+        subscription.end()
+
+
+class Broker:
+    """Fans availability events out to the subscribers of this process."""
+
+    def __init__(self, backend, queue_size=QUEUE_SIZE):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+        self.queue_size = queue_size
+        self.backend = import_string(backend)(self)
+
+    def subscribe(self, performance_id):
+        subscription = Subscription(self, performance_id, self.queue_size)
+        with self.lock:
+            self.subscriptions[performance_id].add(subscription)
+        self.backend.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.performance_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.performance_id]
+
+    def has_subscribers(self, performance_id):
+        return performance_id in self.subscriptions
+
+    def subscriber_count(self):
+        with self.lock:
+            return sum(map(len, self.subscriptions.values()))
+
+    def publish(self, performance_id, kind, data):
+        self.backend.send(performance_id, kind, data)
+
+    def deliver(self, performance_id, kind, data):
+        """Hand an event to local subscribers; safe from any thread."""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(performance_id, ()))
+        if subscriptions:
+            # Encoded once, however many clients receive it.
+            self.call_on_loops(
+                fan_out, subscriptions, format_event(kind, data)
+            )
+
+    def end_streams(self):
+        """End every local stream, so their clients resynchronize."""
+        with self.lock:
+            subscriptions = [
+                subscription
+                for subscriptions in self.subscriptions.values()
+                for subscription in subscriptions
+            ]
+        self.call_on_loops(end_all, subscriptions)
+
+    def call_on_loops(self, callback, subscriptions, *args):
+        loops = defaultdict(list)
+        for subscription in subscriptions:
+            loops[subscription.loop].append(subscription)
+
+        for loop, loop_subscriptions in loops.items():
+            try:
+                loop.call_soon_threadsafe(callback, loop_subscriptions, *args)
+            except RuntimeError:
+                # The loop has been closed along with its streams.
+                pass
+
+
+class LocalBackend:
+    """Delivers events to the subscribers of the publishing process only."""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def interested(self, performance_id):
+        return self.broker.has_subscribers(performance_id)
+
+    def send(self, performance_id, kind, data):
+        self.broker.deliver(performance_id, kind, data)
+
+
+class PostgresBackend(LocalBackend):
+    """
+    Shares events between workers through PostgreSQL ``LISTEN``/``NOTIFY``.
+
+    Each worker with subscribers listens on its own connection in a daemon
+    thread and delivers everything it hears, its own events included.
+    """
+
+    channel = "theatre_availability"
+    # NOTIFY payloads are limited to 8000 bytes.
+    max_seats = 200
+    poll_seconds = 60
+    reconnect_seconds = 1
+
+    def __init__(self, broker):
+        super(PostgresBackend, self).__init__(broker)
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def start(self):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(
+                    target=self.listen, name="theatre-events", daemon=True
+                )
+                self.listener.start()
+
+    def interested(self, performance_id):
+        # Other workers may have subscribers.
+        return True
+
+    def send(self, performance_id, kind, data):
+        seats = data["seats"]
+        with connections["default"].cursor() as cursor:
+            for start in range(0, len(seats), self.max_seats):
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    [
+                        self.channel,
+                        json.dumps({
+                            "performance": performance_id,
+                            "kind": kind,
+                            "data": {
+                                **data,
+                                "seats": seats[start:start + self.max_seats],
+                            },
+                        }),
+                    ],
+                )
+
+    def listen(self):
+        import psycopg2
+
+        params = connections["default"].get_connection_params()
+        connected_before = False
+        while True:
+            listener = None
+            try:
+                listener = psycopg2.connect(**params)
+                listener.autocommit = True
+                with listener.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                if connected_before:
+                    # Events sent while we were away are lost.
+                    self.broker.end_streams()
+                connected_before = True
+                self.receive(listener)
+            except psycopg2.Error:
+                time.sleep(self.reconnect_seconds)
+            finally:
+                if listener is not None:
+                    listener.close()
+
+    def receive(self, listener):
+        while True:
+            if select.select([listener], [], [], self.poll_seconds)[0]:
+                listener.poll()
+                while listener.notifies:
+                    message = json.loads(listener.notifies.pop(0).payload)
+                    self.broker.deliver(
+                        message["performance"],
+                        message["kind"],
+                        message["data"],
+                    )
+
+
+broker = None
+broker_lock = threading.Lock()
+
+
+def get_broker():
+    global broker
+
+    with broker_lock:
+        if broker is None:
+            broker = Broker(
+                getattr(
+                    settings,
+                    "AVAILABILITY_EVENTS_BACKEND",
+                    "theatre.events.LocalBackend",
+                )
+            )
+        return broker
+
+
+def publish_availability(kind, seats):
+    """Publish ``kind`` deltas for ``{performance_id: [(row, seat)]}``."""
+    backend = get_broker().backend
+    seats = {
+        performance_id: performance_seats
+        for performance_id, performance_seats in seats.items()
+        if backend.interested(performance_id)
+    }
+    if not seats:
+        return
+
+    # Counted like the seat map of the snapshot, held seats included.
+    available = Performance.objects.filter(pk__in=seats).values_list(
+        "id",
+        F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+        - F("tickets_sold")
+        - Count(
+            "held_seats",
+            filter=Q(held_seats__hold__expires_at__gt=timezone.now()),
+        ),
+    )
+    for performance_id, count in available:
+        get_broker().publish(
+            performance_id,
+            kind,
+            {
+                "performance": performance_id,
+                "seats": [
+                    {"row": row, "seat": seat}
+                    for row, seat in sorted(seats[performance_id])
+                ],
+                "available": count,
+            },
+        )
+
+
+def tickets_changed(kind, tickets):
+    """Publish deltas for ``tickets`` once the transaction commits."""
+    seats = defaultdict(list)
+    for ticket in tickets:
+        seats[ticket.performance_id].append((ticket.row, ticket.seat))
+    if seats:
+        transaction.on_commit(lambda: publish_availability(kind, seats))
+
+
+def release_connections():
+    # An open stream may last for hours; it must not keep the request's
+    # database connection open the way a finished request would not.
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def stream(subscription, snapshot):
+    try:
+        yield format_event("snapshot", snapshot, retry=RETRY_MILLISECONDS)
+        while True:
+            try:
+                message = await subscription.get(KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        subscription.close()
+
+
+def is_event_stream(headers):
+    return any(
+        name.lower() == b"content-type"
+        and value.startswith(CONTENT_TYPE.encode())
+        for name, value in headers
+    )
+
+
+class StreamDisconnectMiddleware:
+    """
+    ASGI middleware cancelling event streams whose client has gone away.
+
+    Django 4.2 stops reading from the connection once it has the request
+    body, so on its own it keeps feeding a stream nobody listens to.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        streaming = asyncio.Event()
+
+        async def send_message(message):
+            if message["type"] == "http.response.start" and is_event_stream(
+                message["headers"]
+            ):
+                streaming.set()
+            await send(message)
+
+        handler = asyncio.ensure_future(self.app(scope, receive, send_message))
+        watcher = asyncio.ensure_future(
+            self.wait_for_disconnect(streaming, receive)
+        )
+        try:
+            await asyncio.wait(
+                {handler, watcher}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            watcher.cancel()
+            if not handler.done():
+                handler.cancel()
+                await asyncio.wait({handler})
+
+        if not handler.cancelled():
+            handler.result()
+
+    async def wait_for_disconnect(self, streaming, receive):
+        # The body has been read by the time a response starts.
+        await streaming.wait()
+        while (await receive())["type"] != "http.disconnect":
+            pass
@@ -1,9 +1,16 @@
 import datetime
+from django import forms
 from django.utils import timezone
 
 import django_filters
 
-from theatre.models import Play, Actor, Genre, Performance
+from theatre.models import Play, Actor, Genre, Performance, Ticket
+
+
+def day_start(date):
+    return timezone.make_aware(
+        datetime.datetime.combine(date, datetime.time.min)
+    )
 
 
 class PlayFilter(django_filters.FilterSet):
@@ -21,24 +28,80 @@ class PlayFilter(django_filters.FilterSet):
 
 
 class DateRangeFilter(django_filters.Filter):
+    field_class = forms.IntegerField
+
+    def filter(self, qs, value):
+        if value is not None:
+            today = timezone.localdate()
+            end_date = today + datetime.timedelta(days=value)
+            qs = qs.filter(**{
+                f"{self.field_name}__gte": day_start(today),
+                f"{self.field_name}__lt": day_start(
+                    end_date + datetime.timedelta(days=1)
+                ),
+            })
+        return qs
+
+
+class DayBoundFilter(django_filters.DateFilter):
+    def __init__(self, *args, inclusive_end=False, **kwargs):
+        self.inclusive_end = inclusive_end
+        super(DayBoundFilter, self).__init__(*args, **kwargs)
+
     def filter(self, qs, value):
         if value:
-            today = timezone.now().date()
-            end_date = today + datetime.timedelta(days=int(value))
-            qs = qs.filter(show_time__date__range=[today, end_date])
+            if self.inclusive_end:
+                value += datetime.timedelta(days=1)
+                lookup = "lt"
+            else:
+                lookup = "gte"
+            qs = qs.filter(**{
+                f"{self.field_name}__{lookup}": day_start(value)
+            })
         return qs
 
 
 class PerformanceFilter(django_filters.FilterSet):
     date_range = DateRangeFilter(
         field_name="show_time",
-        lookup_expr="date"
+        min_value=0
     )
     play = django_filters.CharFilter(
         field_name="play__title",
         lookup_expr="icontains"
     )
 
+    @classmethod
+    def get_filters(cls):
+        # "from" and "to" are Python keywords, so they can't be declared
+        # as class attributes.
+        filters = super().get_filters()
+        filters["from"] = DayBoundFilter(field_name="show_time")
+        filters["to"] = DayBoundFilter(
+            field_name="show_time",
+            inclusive_end=True
+        )
+        return filters
+
     class Meta:
         model = Performance
         fields = ["date_range", "play"]
+
+
+class TicketExportFilter(django_filters.FilterSet):
+    play = django_filters.NumberFilter(field_name="performance__play_id")
+
+    @classmethod
+    def get_filters(cls):
+        # Bounds are on the sale date, i.e. when the reservation was made.
+        filters = super().get_filters()
+        filters["from"] = DayBoundFilter(field_name="reservation__created_at")
+        filters["to"] = DayBoundFilter(
+            field_name="reservation__created_at",
+            inclusive_end=True
+        )
+        return filters
+
+    class Meta:
+        model = Ticket
+        fields = ["play"]
@@ -0,0 +1,115 @@
+"""
+``Idempotency-Key`` support for create endpoints.
+
+Every user and key gets a database row, inserted in the transaction of the
+create it guards and holding that create's response, which is replayed for
+every retry with the same key without running the view again. A retry that
+arrives while the first request is still running blocks on the unique row
+until the first one commits or rolls back, so no worker can book twice.
+"""
+import datetime
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from theatre.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    IDEMPOTENCY_HEADER,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    description=(
+        "Client-chosen key that makes retries safe: the first successful "
+        "response is replayed for every request with the same key"
+    ),
+)
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = (
+        "This Idempotency-Key was already used for a different request."
+    )
+    default_code = "idempotency_key_reused"
+
+
+def request_fingerprint(request):
+    return hashlib.sha256(
+        "\0".join((
+            request.method,
+            request.path,
+            json.dumps(request.data, sort_keys=True, default=str),
+        )).encode()
+    ).hexdigest()
+
+
+class IdempotentCreateMixin:
+    idempotency_timeout = datetime.timedelta(hours=24)
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    def create(self, request, *args, **kwargs):
+        return self.idempotent_response(
+            super(IdempotentCreateMixin, self).create,
+            request,
+            *args,
+            **kwargs
+        )
+
+    def idempotent_response(self, handler, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({
+                IDEMPOTENCY_HEADER: (
+                    f"Must be 1 to {MAX_KEY_LENGTH} characters long."
+                )
+            })
+
+        fingerprint = request_fingerprint(request)
+        IdempotencyKey.objects.filter(
+            user=request.user,
+            created_at__lt=timezone.now() - self.idempotency_timeout,
+        ).delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, fingerprint=fingerprint
+                    )
+            except IntegrityError:
+                # The request owning the key has committed its response.
+                return self.replay(
+                    IdempotencyKey.objects.get(user=request.user, key=key),
+                    fingerprint,
+                )
+
+            response = handler(request, *args, **kwargs)
+            if not status.is_success(response.status_code):
+                # Frees the key for a retry, along with whatever was written.
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=["status_code", "response"])
+            return response
+
+    def replay(self, record, fingerprint):
+        if record.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+
+        response = Response(record.response, status=record.status_code)
+        response["Idempotent-Replayed"] = "true"
+        return response
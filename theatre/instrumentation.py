@@ -0,0 +1,309 @@
+"""
+Per-request timing for every view.
+
+The middleware counts queries and SQL time through a database execute
+wrapper, splits the rest of the request into view, serialize and render
+time and reports all of it in a ``Server-Timing`` header. Observations are also
+aggregated into per-process histograms that ``metrics`` serves in the
+Prometheus text format.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+METRICS = (
+    (
+        "theatre_request_duration_seconds",
+        "Total time spent handling the request",
+        DURATION_BUCKETS,
+    ),
+    (
+        "theatre_request_sql_seconds",
+        "Time spent executing SQL queries",
+        DURATION_BUCKETS,
+    ),
+    (
+        "theatre_request_view_seconds",
+        "Time spent in the view outside of SQL queries and serializers",
+        DURATION_BUCKETS,
+    ),
+    (
+        "theatre_request_serialize_seconds",
+        "Time spent building serializer data outside of SQL queries",
+        DURATION_BUCKETS,
+    ),
+    (
+        "theatre_request_render_seconds",
+        "Time spent rendering the response body",
+        DURATION_BUCKETS,
+    ),
+    (
+        "theatre_request_queries",
+        "Number of SQL queries executed",
+        QUERY_BUCKETS,
+    ),
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield f"{bound:g}", total
+        yield "+Inf", total + self.counts[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {
+            name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+            for name, _, buckets in METRICS
+        }
+
+    def observe(self, labels, values):
+        with self.lock:
+            for name, value in values.items():
+                self.histograms[name][labels].observe(value)
+
+    def export(self):
+        lines = []
+        with self.lock:
+            for name, description, _ in METRICS:
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for (handler, method), histogram in sorted(
+                    self.histograms[name].items()
+                ):
+                    labels = f'handler="{handler}",method="{method}"'
+                    for bound, count in histogram.samples():
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+                        )
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum:g}")
+                    lines.append(
+                        f"{name}_count{{{labels}}} {sum(histogram.counts)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def handler_name(view_func, method):
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return getattr(view_func, "__name__", "unknown")
+
+    actions = getattr(view_func, "actions", None)
+    if actions:
+        return f"{view_class.__name__}.{actions.get(method.lower(), method)}"
+    return view_class.__name__
+
+
+class RequestTimer:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0
+        self.serialize = 0
+        self.handler = "unmatched"
+        self.view_started = None
+        self.view_sql_started = 0
+        self.render_started = None
+        self.render_sql_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def serializing(self):
+        started = time.perf_counter()
+        sql_started = self.sql
+        try:
+            yield
+        finally:
+            self.serialize += (
+                time.perf_counter() - started - (self.sql - sql_started)
+            )
+
+
+@lru_cache(maxsize=None)
+def timed_serializer_class(serializer_class):
+    class TimedSerializer(serializer_class):
+        @property
+        def data(self):
+            with self.request_timer.serializing():
+                return super(TimedSerializer, self).data
+
+    TimedSerializer.__name__ = serializer_class.__name__
+    TimedSerializer.__qualname__ = serializer_class.__qualname__
+    return TimedSerializer
+
+
+def timed_serializer(request, serializer):
+    """
+    Count the time ``serializer.data`` takes as serialize time of
+    ``request`` rather than view time.
+    """
+    timer = getattr(request, "timer", None)
+    if timer is not None and not hasattr(serializer, "request_timer"):
+        serializer.__class__ = timed_serializer_class(type(serializer))
+        serializer.request_timer = timer
+    return serializer
+
+
+class SerializerTimingMixin:
+    def get_serializer(self, *args, **kwargs):
+        return timed_serializer(
+            self.request,
+            super(SerializerTimingMixin, self).get_serializer(
+                *args, **kwargs
+            ),
+        )
+
+
+def execute_wrappers():
+    return connection.execute_wrappers
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timer = request.timer = RequestTimer()
+        started = time.perf_counter()
+
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+
+        return self.finish(request, response, started)
+
+    async def __acall__(self, request):
+        timer = request.timer = RequestTimer()
+        started = time.perf_counter()
+
+        # Async views query through sync_to_async, on the connection of the
+        # request's sync thread rather than of the event loop.
+        wrappers = await sync_to_async(execute_wrappers)()
+        wrappers.append(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrappers.remove(timer)
+
+        return self.finish(request, response, started)
+
+    def finish(self, request, response, started):
+        timer = request.timer
+        finished = time.perf_counter()
+        total = finished - started
+        render = (
+            finished - timer.render_started
+            if timer.render_started is not None else 0
+        )
+        view = 0
+        if timer.view_started is not None:
+            view_sql = (
+                timer.sql if timer.render_started is None
+                else timer.render_sql_started
+            ) - timer.view_sql_started
+            view = max(
+                (timer.render_started or finished)
+                - timer.view_started
+                - view_sql
+                - timer.serialize,
+                0
+            )
+
+        response["Server-Timing"] = ", ".join((
+            f'db;dur={timer.sql * 1000:.2f};desc="{timer.queries} queries"',
+            f"view;dur={view * 1000:.2f}",
+            f"serialize;dur={timer.serialize * 1000:.2f}",
+            f"render;dur={render * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ))
+        registry.observe(
+            (timer.handler, request.method),
+            {
+                "theatre_request_duration_seconds": total,
+                "theatre_request_sql_seconds": timer.sql,
+                "theatre_request_view_seconds": view,
+                "theatre_request_serialize_seconds": timer.serialize,
+                "theatre_request_render_seconds": render,
+                "theatre_request_queries": timer.queries,
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timer.handler = handler_name(view_func, request.method)
+        request.timer.view_started = time.perf_counter()
+        request.timer.view_sql_started = request.timer.sql
+
+    def process_template_response(self, request, response):
+        # Template responses, DRF's included, are rendered right after
+        # this hook returns.
+        request.timer.render_started = time.perf_counter()
+        request.timer.render_sql_started = request.timer.sql
+        return response
+
+
+def metrics_allowed(request):
+    allowed_ips = getattr(settings, "METRICS_ALLOWED_IPS", [])
+    return (
+        request.META.get("REMOTE_ADDR") in allowed_ips
+        or request.user.is_staff
+    )
+
+
+def metrics(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.export(), content_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,467 @@
+import datetime
+import json
+import math
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from theatre.booking import hold_seats
+from theatre.models import (
+    Genre,
+    Actor,
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+)
+from theatre.seeding import seed_dataset, throwaway_database
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and report p50/p95/p99 latency, "
+        "query count and response size for every API endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--halls", type=int, default=50)
+        parser.add_argument("--plays", type=int, default=2000)
+        parser.add_argument("--performances", type=int, default=20000)
+        parser.add_argument("--tickets", type=int, default=1000000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--genres", type=int, default=18)
+        parser.add_argument("--actors", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=50,
+            help="Requests per scenario",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Reservations per batch reservation request",
+        )
+        parser.add_argument(
+            "--cold-cache",
+            action="store_true",
+            help="Clear the response cache before every request",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON report to this file instead of stdout",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="Compare against a previously saved JSON report",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed relative p95 slowdown against the baseline",
+        )
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            dataset = self.seed(options)
+            results = self.run_scenarios(options)
+
+        report = {"dataset": dataset, "results": results}
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options["tolerance"])
+
+    def seed(self, options):
+        started = time.perf_counter()
+        dataset = seed_dataset(
+            halls=options["halls"],
+            plays=options["plays"],
+            performances=options["performances"],
+            tickets=options["tickets"],
+            users=options["users"],
+            genres=options["genres"],
+            actors=options["actors"],
+            seed=options["seed"],
+        )
+        dataset["seconds"] = round(time.perf_counter() - started, 2)
+
+        self.user = get_user_model().objects.order_by("id").first()
+        self.admin = get_user_model().objects.create_superuser(
+            email="bench-admin@seed.theatre", password="1qazcde3"
+        )
+        self.bench_hall = TheatreHall.objects.create(
+            name="Bench hall",
+            rows=options["iterations"] * 2,
+            seats_in_row=10,
+        )
+        self.bench_performance = Performance.objects.create(
+            play=Play.objects.order_by("id").first(),
+            theatre_hall=self.bench_hall,
+            show_time=timezone.now() + datetime.timedelta(days=365),
+        )
+        self.next_row = 0
+
+        self.batch_size = options["batch_size"]
+        self.batch_users = list(
+            get_user_model().objects.order_by("id")
+            .values_list("id", flat=True)[:self.batch_size]
+        )
+        batch_hall = TheatreHall.objects.create(
+            name="Bench batch hall",
+            rows=options["iterations"] * self.batch_size,
+            seats_in_row=10,
+        )
+        self.batch_performance = Performance.objects.create(
+            play=self.bench_performance.play,
+            theatre_hall=batch_hall,
+            show_time=self.bench_performance.show_time,
+        )
+        self.next_batch_row = 0
+
+        # One row per hold request, and the last for the hold retrieved.
+        hold_hall = TheatreHall.objects.create(
+            name="Bench hold hall",
+            rows=options["iterations"] + 1,
+            seats_in_row=10,
+        )
+        self.hold_performance = Performance.objects.create(
+            play=self.bench_performance.play,
+            theatre_hall=hold_hall,
+            show_time=self.bench_performance.show_time,
+        )
+        self.hold = hold_seats(
+            self.user,
+            self.hold_performance,
+            [(hold_hall.rows, 1)],
+            timezone.now() + datetime.timedelta(days=1),
+        )
+        self.next_hold_row = 0
+
+        return dataset
+
+    def book_payload(self):
+        self.next_row += 1
+        return {
+            "tickets": [
+                {
+                    "row": self.next_row,
+                    "seat": seat,
+                    "performance": self.bench_performance.id,
+                }
+                for seat in (1, 2)
+            ]
+        }
+
+    def batch_payload(self):
+        reservations = []
+        for index in range(self.batch_size):
+            self.next_batch_row += 1
+            reservations.append({
+                "user": self.batch_users[index % len(self.batch_users)],
+                "tickets": [
+                    {
+                        "row": self.next_batch_row,
+                        "seat": seat,
+                        "performance": self.batch_performance.id,
+                    }
+                    for seat in (1, 2)
+                ],
+            })
+        return {"reservations": reservations}
+
+    def hold_payload(self):
+        self.next_hold_row += 1
+        return {
+            "performance": self.hold_performance.id,
+            "seats": [
+                {"row": self.next_hold_row, "seat": seat} for seat in (1, 2)
+            ],
+        }
+
+    def scenarios(self):
+        play = Play.objects.order_by("id").first()
+        reservation = Reservation.objects.filter(user=self.user).first()
+        detail_ids = {
+            "genre": Genre.objects.values_list("id", flat=True).first(),
+            "actor": Actor.objects.values_list("id", flat=True).first(),
+            "play": play.id,
+            "theatrehall": self.bench_hall.id,
+            "performance": self.bench_performance.id,
+            "reservation": reservation.id if reservation else None,
+        }
+        scenarios = []
+        self.reservations_per_request = {}
+        # The login throttle reads the email from form data.
+        self.formats = {"token:anonymous": "multipart"}
+
+        for basename, object_id in detail_ids.items():
+            for role in ("user", "admin"):
+                scenarios.append((
+                    f"{basename}-list:{role}",
+                    role,
+                    "get",
+                    lambda basename=basename: reverse(
+                        f"theatre:{basename}-list"
+                    ),
+                    None,
+                ))
+                # Reservations are only visible to their owner.
+                if object_id is None or (
+                    basename == "reservation" and role == "admin"
+                ):
+                    continue
+                scenarios.append((
+                    f"{basename}-detail:{role}",
+                    role,
+                    "get",
+                    lambda basename=basename, object_id=object_id: reverse(
+                        f"theatre:{basename}-detail", args=[object_id]
+                    ),
+                    None,
+                ))
+
+        for role in ("user", "admin"):
+            scenarios.append((
+                f"reservation-create:{role}",
+                role,
+                "post",
+                lambda: reverse("theatre:reservation-list"),
+                self.book_payload,
+            ))
+            self.reservations_per_request[f"reservation-create:{role}"] = 1
+
+        scenarios.append((
+            "reservation-batch:admin",
+            "admin",
+            "post",
+            lambda: reverse("theatre:reservation-batch"),
+            self.batch_payload,
+        ))
+        self.reservations_per_request["reservation-batch:admin"] = (
+            self.batch_size
+        )
+
+        counter = iter(range(10 ** 9))
+        creates = {
+            "genre": lambda: {"name": f"Bench genre {next(counter)}"},
+            "actor": lambda: {
+                "first_name": "Bench",
+                "last_name": f"Actor {next(counter)}",
+            },
+            "play": lambda: {
+                "title": f"Bench play {next(counter)}",
+                "description": "Benchmark",
+            },
+            "theatrehall": lambda: {
+                "name": f"Bench hall {next(counter)}",
+                "rows": 10,
+                "seats_in_row": 10,
+            },
+            # Hours apart, as a hall holds one performance at a time.
+            "performance": lambda: {
+                "play": play.id,
+                "theatre_hall": self.bench_hall.id,
+                "show_time": (
+                    self.bench_performance.show_time
+                    + datetime.timedelta(hours=next(counter) + 1)
+                ).isoformat(),
+            },
+        }
+        for basename, payload in creates.items():
+            scenarios.append((
+                f"{basename}-create:admin",
+                "admin",
+                "post",
+                lambda basename=basename: reverse(f"theatre:{basename}-list"),
+                payload,
+            ))
+
+        scenarios.append((
+            "seathold-create:user",
+            "user",
+            "post",
+            lambda: reverse("theatre:seathold-list"),
+            self.hold_payload,
+        ))
+        scenarios.append((
+            "seathold-detail:user",
+            "user",
+            "get",
+            lambda: reverse("theatre:seathold-detail", args=[self.hold.id]),
+            None,
+        ))
+
+        term = play.title.split()[0]
+        for name, query in (("list", term), ("autocomplete", term[:4])):
+            scenarios.append((
+                f"search-{name}:user",
+                "user",
+                "get",
+                lambda name=name: reverse(f"theatre:search-{name}"),
+                lambda query=query: {"q": query},
+            ))
+
+        refresh = str(RefreshToken.for_user(self.admin))
+        scenarios += [
+            (
+                "register:anonymous",
+                "anonymous",
+                "post",
+                lambda: reverse("user:register"),
+                lambda: {
+                    "email": f"bench-{next(counter)}@seed.theatre",
+                    "password": "1qazcde3",
+                },
+            ),
+            (
+                "manage:user",
+                "user",
+                "get",
+                lambda: reverse("user:manage"),
+                None,
+            ),
+            (
+                "manage-update:user",
+                "user",
+                "patch",
+                lambda: reverse("user:manage"),
+                lambda: {"email": self.user.email},
+            ),
+            (
+                "token:anonymous",
+                "anonymous",
+                "post",
+                lambda: reverse("user:token_obtain_pair"),
+                lambda: {"email": self.admin.email, "password": "1qazcde3"},
+            ),
+            (
+                "token-refresh:anonymous",
+                "anonymous",
+                "post",
+                lambda: reverse("user:token_refresh"),
+                lambda: {"refresh": refresh},
+            ),
+        ]
+
+        return scenarios
+
+    def run_scenarios(self, options):
+        clients = {"anonymous": APIClient()}
+        for role, user in (("user", self.user), ("admin", self.admin)):
+            clients[role] = APIClient()
+            clients[role].force_authenticate(user)
+
+        throttle = UserRateThrottle()
+        throttle_keys = [
+            throttle.cache_format % {"scope": throttle.scope, "ident": user.pk}
+            for user in (self.user, self.admin)
+        ]
+        throttle = AnonRateThrottle()
+        throttle_keys.append(throttle.cache_format % {
+            "scope": throttle.scope, "ident": "127.0.0.1"
+        })
+
+        results = {}
+        for name, role, method, url, payload in self.scenarios():
+            timings, queries, sizes, statuses = [], [], [], set()
+            # Every scenario starts cold, so that one role's requests do
+            # not warm the response cache for the next.
+            cache.clear()
+
+            for _ in range(options["iterations"]):
+                cache.delete_many(throttle_keys)
+                if options["cold_cache"]:
+                    cache.clear()
+                data = payload() if payload else None
+                path = url()
+
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    response = getattr(clients[role], method)(
+                        path, data, format=self.formats.get(name, "json")
+                    )
+                    timings.append(time.perf_counter() - started)
+
+                queries.append(len(context.captured_queries))
+                sizes.append(len(response.content))
+                statuses.add(response.status_code)
+
+            # Unless every request is cold, percentiles are of the hot ones.
+            hot = timings
+            if not options["cold_cache"] and len(timings) > 1:
+                hot = timings[1:]
+            results[name] = {
+                "cold_ms": round(timings[0] * 1000, 3),
+                "p50_ms": round(percentile(hot, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(hot, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(hot, 0.99) * 1000, 3),
+                "queries": max(queries),
+                "bytes": max(sizes),
+                "status": sorted(statuses),
+            }
+            if name in self.reservations_per_request:
+                # Compares the batch endpoint with one reservation per call.
+                results[name]["reservations_per_second"] = round(
+                    self.reservations_per_request[name]
+                    * len(timings) / sum(timings),
+                    1
+                )
+            self.stderr.write(
+                f"{name}: p95 {results[name]['p95_ms']} ms, "
+                f"{results[name]['queries']} queries"
+            )
+
+        return results
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+        regressions = []
+        for name, result in sorted(results.items()):
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if result["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: p95 {previous['p95_ms']} -> "
+                    f"{result['p95_ms']} ms"
+                )
+            if result["queries"] > previous["queries"]:
+                regressions.append(
+                    f"{name}: queries {previous['queries']} -> "
+                    f"{result['queries']}"
+                )
+
+        if regressions:
+            raise CommandError(
+                "Regressions against baseline:\n" + "\n".join(regressions)
+            )
+
+        self.stderr.write(
+            self.style.SUCCESS("No regressions against baseline")
+        )
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.throttling import UserRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.management.commands.bench_api import percentile
+from theatre.models import Play, Performance
+from theatre.seeding import seed_dataset, throwaway_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and compare concurrent-client "
+        "throughput of the async read endpoints served through the ASGI "
+        "handler with their sync twins served through the WSGI handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--halls", type=int, default=20)
+        parser.add_argument("--plays", type=int, default=500)
+        parser.add_argument("--performances", type=int, default=5000)
+        parser.add_argument("--tickets", type=int, default=100000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Clients sending requests at the same time",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=320,
+            help="Requests per endpoint and handler",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON report to this file instead of stdout",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be >= 1.")
+
+        with throwaway_database():
+            dataset = seed_dataset(
+                halls=options["halls"],
+                plays=options["plays"],
+                performances=options["performances"],
+                tickets=options["tickets"],
+                users=options["concurrency"],
+                seed=options["seed"],
+            )
+            results = self.run_endpoints(options)
+
+        report = {"dataset": dataset, "results": results}
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def endpoints(self):
+        play_id = Play.objects.order_by("id").values_list("id", flat=True)[0]
+        performance_id = (
+            Performance.objects.order_by("-tickets_sold")
+            .values_list("id", flat=True)[0]
+        )
+        return (
+            ("performance-list", ()),
+            ("performance-detail", (performance_id,)),
+            ("performance-seats", (performance_id,)),
+            ("play-list", ()),
+            ("play-detail", (play_id,)),
+        )
+
+    def run_endpoints(self, options):
+        users = list(get_user_model().objects.order_by("id"))
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        throttle = UserRateThrottle()
+        throttle_keys = [
+            throttle.cache_format % {"scope": throttle.scope, "ident": user.pk}
+            for user in users
+        ]
+
+        results = {}
+        for name, args in self.endpoints():
+            for handler, path, run in (
+                ("wsgi", reverse(f"theatre:{name}", args=args), self.wsgi),
+                (
+                    "asgi",
+                    reverse(f"theatre:async-{name}", args=args),
+                    self.asgi,
+                ),
+            ):
+                cache.delete_many(throttle_keys)
+                started = time.perf_counter()
+                timings, statuses = run(path, tokens, options["requests"])
+                elapsed = time.perf_counter() - started
+
+                key = f"{name}:{handler}"
+                results[key] = {
+                    "requests_per_second": round(len(timings) / elapsed, 1),
+                    "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+                    "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+                    "status": sorted(statuses),
+                }
+                self.stderr.write(
+                    f"{key}: {results[key]['requests_per_second']} req/s, "
+                    f"p95 {results[key]['p95_ms']} ms"
+                )
+
+        return results
+
+    def split(self, tokens, total):
+        share, extra = divmod(total, len(tokens))
+        return [
+            (token, share + (index < extra))
+            for index, token in enumerate(tokens)
+        ]
+
+    def wsgi(self, path, tokens, total):
+        """One thread per client, like a threaded WSGI server."""
+
+        def client(token, count):
+            browser = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+            timings, statuses = [], set()
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = browser.get(path)
+                    timings.append(time.perf_counter() - started)
+                    statuses.add(response.status_code)
+                    # Without persistent connections every request
+                    # opens its own.
+                    connections.close_all()
+            finally:
+                connections.close_all()
+            return timings, statuses
+
+        with ThreadPoolExecutor(len(tokens)) as pool:
+            return self.merge(pool.map(
+                lambda args: client(*args), self.split(tokens, total)
+            ))
+
+    def asgi(self, path, tokens, total):
+        """One task per client on a single event loop, like uvicorn."""
+
+        async def client(token, count):
+            browser = AsyncClient()
+            headers = {"authorization": f"Bearer {token}"}
+            timings, statuses = [], set()
+            for _ in range(count):
+                # The ASGI handler gives every request its own context
+                # and so its own thread for sync code.
+                async with ThreadSensitiveContext():
+                    started = time.perf_counter()
+                    response = await browser.get(path, headers=headers)
+                    timings.append(time.perf_counter() - started)
+                    statuses.add(response.status_code)
+                    await sync_to_async(connections.close_all)()
+            return timings, statuses
+
+        async def clients():
+            return await asyncio.gather(*(
+                client(token, count)
+                for token, count in self.split(tokens, total)
+            ))
+
+        return self.merge(asyncio.run(clients()))
+
+    def merge(self, results):
+        timings, statuses = [], set()
+        for client_timings, client_statuses in results:
+            timings.extend(client_timings)
+            statuses.update(client_statuses)
+        return timings, statuses
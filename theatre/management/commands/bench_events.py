@@ -0,0 +1,253 @@
+import asyncio
+import gc
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre import events
+from theatre.management.commands.bench_api import percentile
+from theatre.models import Performance
+from theatre.seeding import seed_dataset, throwaway_database
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current size, in kilobytes on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class FanOut:
+    def __init__(self, expected):
+        self.expected = expected
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.done = asyncio.Event()
+
+    def received(self):
+        self.count += 1
+        if self.count == self.expected:
+            self.done.set()
+
+
+class Stream:
+    """One client connection, spoken to in ASGI messages directly."""
+
+    def __init__(self, number, path, token, fan_out):
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Bearer {token}".encode()),
+            ],
+            "client": ("127.0.0.1", 10000 + number),
+            "server": ("testserver", 80),
+        }
+        self.messages = asyncio.Queue()
+        self.messages.put_nowait({"type": "http.request", "body": b""})
+        self.opened = asyncio.Event()
+        self.status = None
+        self.fan_out = fan_out
+
+    async def receive(self):
+        return await self.messages.get()
+
+    async def send(self, message):
+        body = message.get("body", b"")
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            if self.status != 200:
+                self.opened.set()
+        elif body.startswith(b"event: snapshot"):
+            self.opened.set()
+        elif body.startswith(f"event: {events.TAKEN}".encode()):
+            self.fan_out.received()
+
+    def disconnect(self):
+        self.messages.put_nowait({"type": "http.disconnect"})
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database, hold many availability streams "
+        "open at once through the ASGI application with the in-process "
+        "broker, and report memory per connection and fan-out latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--subscribers",
+            type=int,
+            default=2000,
+            help="Streams held open at the same time",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=100,
+            help="Users the streams are spread over, for the rate limits",
+        )
+        parser.add_argument(
+            "--events",
+            type=int,
+            default=20,
+            help="Deltas published to every stream",
+        )
+        parser.add_argument(
+            "--connect-batch",
+            type=int,
+            default=100,
+            help="Streams opened concurrently",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            help="Write the JSON report to this file instead of stdout",
+        )
+
+    def handle(self, *args, **options):
+        if min(
+            options["subscribers"],
+            options["users"],
+            options["events"],
+            options["connect_batch"],
+        ) < 1:
+            raise CommandError(
+                "--subscribers, --users, --events and --connect-batch "
+                "must be >= 1."
+            )
+
+        # Serve through the same entry point as a deployment would.
+        from theatre_api_service.asgi import application
+
+        with throwaway_database():
+            dataset = seed_dataset(
+                halls=1,
+                plays=1,
+                performances=1,
+                tickets=0,
+                users=options["users"],
+                genres=1,
+                actors=1,
+                seed=options["seed"],
+            )
+            performance_id = Performance.objects.values_list(
+                "id", flat=True
+            )[0]
+            tokens = [
+                str(AccessToken.for_user(user))
+                for user in get_user_model().objects.order_by("id")
+            ]
+            # Stands in for the shared backend of a multi-worker setup.
+            events.broker = events.Broker("theatre.events.LocalBackend")
+
+            results = asyncio.run(
+                self.run(application, performance_id, tokens, options)
+            )
+
+        report = {"dataset": dataset, "results": results}
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+    async def run(self, application, performance_id, tokens, options):
+        path = reverse("theatre:async-performance-events", args=[
+            performance_id
+        ])
+        total = options["subscribers"]
+        fan_out = FanOut(total)
+        broker = events.get_broker()
+
+        gc.collect()
+        threads_before = threading.active_count()
+        rss_before = rss_bytes()
+        tracemalloc.start()
+
+        streams, tasks = [], []
+        started = time.perf_counter()
+        for start in range(0, total, options["connect_batch"]):
+            batch = [
+                Stream(number, path, tokens[number % len(tokens)], fan_out)
+                for number in range(
+                    start, min(start + options["connect_batch"], total)
+                )
+            ]
+            tasks.extend(
+                asyncio.ensure_future(
+                    application(stream.scope, stream.receive, stream.send)
+                )
+                for stream in batch
+            )
+            await asyncio.gather(*(stream.opened.wait() for stream in batch))
+            streams.extend(batch)
+        connect_seconds = time.perf_counter() - started
+
+        statuses = sorted({stream.status for stream in streams})
+        if statuses != [200]:
+            raise CommandError(f"Streams answered with {statuses}.")
+
+        gc.collect()
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        rss = rss_bytes() - rss_before
+        threads = threading.active_count() - threads_before
+        self.stderr.write(
+            f"{total} streams open in {connect_seconds:.1f} s, "
+            f"{rss / total / 1024:.1f} KiB RSS each"
+        )
+
+        latencies = []
+        for number in range(options["events"]):
+            fan_out.reset()
+            started = time.perf_counter()
+            # Published from a worker thread, like an on_commit hook.
+            await asyncio.to_thread(
+                broker.publish,
+                performance_id,
+                events.TAKEN,
+                {
+                    "performance": performance_id,
+                    "seats": [{"row": 1, "seat": number + 1}],
+                    "available": 0,
+                },
+            )
+            await fan_out.done.wait()
+            latencies.append(time.perf_counter() - started)
+
+        for stream in streams:
+            stream.disconnect()
+        await asyncio.gather(*tasks)
+
+        return {
+            "subscribers": total,
+            "connect_seconds": round(connect_seconds, 2),
+            "rss_bytes_per_connection": round(rss / total),
+            "python_heap_bytes_per_connection": round(heap / total),
+            "threads_per_connection": round(threads / total, 2),
+            "fan_out_p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "fan_out_p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "subscribers_after_disconnect": broker.subscriber_count(),
+        }
@@ -0,0 +1,107 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from theatre.models import Play, Performance
+from theatre.seeding import seed_dataset, throwaway_database
+from theatre.serializers import (
+    PlayListSerializer,
+    PlayListValuesSerializer,
+    PerformanceListSerializer,
+    PerformanceListValuesSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare model-instance and values() list serializers on a "
+        "throwaway database and check that they render identical JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            seed_dataset(
+                halls=max(options["rows"] // 100, 1),
+                plays=options["rows"],
+                performances=options["rows"],
+                tickets=0,
+                users=1,
+                seed=options["seed"],
+            )
+            results = self.run_cases(options["repeat"])
+
+        self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+
+    def cases(self):
+        context = {"request": RequestFactory().get("/")}
+        plays = Play.objects.order_by("id")
+        performances = Performance.objects.order_by(
+            "-show_time", "-id"
+        ).annotate(available_tickets=(
+            F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+            - F("tickets_sold")
+        ))
+
+        return {
+            "play-list": (
+                lambda: PlayListSerializer(
+                    plays.prefetch_related("genres", "actors"),
+                    many=True,
+                    context=context,
+                ),
+                lambda: PlayListValuesSerializer(
+                    PlayListValuesSerializer.values(plays),
+                    many=True,
+                    context=context,
+                ),
+            ),
+            "performance-list": (
+                lambda: PerformanceListSerializer(
+                    performances.select_related("play", "theatre_hall"),
+                    many=True,
+                    context=context,
+                ),
+                lambda: PerformanceListValuesSerializer(
+                    PerformanceListValuesSerializer.values(performances),
+                    many=True,
+                    context=context,
+                ),
+            ),
+        }
+
+    def measure(self, make_serializer, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = JSONRenderer().render(make_serializer().data)
+            timings.append(time.perf_counter() - started)
+        return min(timings), content
+
+    def run_cases(self, repeat):
+        results = {}
+        for name, (model_path, values_path) in self.cases().items():
+            model_seconds, model_content = self.measure(model_path, repeat)
+            values_seconds, values_content = self.measure(values_path, repeat)
+            if model_content != values_content:
+                raise CommandError(f"{name}: values() output differs")
+
+            results[name] = {
+                "model_ms": round(model_seconds * 1000, 1),
+                "values_ms": round(values_seconds * 1000, 1),
+                "speedup": round(model_seconds / values_seconds, 2),
+                "bytes": len(model_content),
+            }
+            self.stderr.write(
+                f"{name}: {results[name]['speedup']}x faster"
+            )
+
+        return results
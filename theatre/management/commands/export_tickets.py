@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from theatre.export import EXPORT_CHUNK_SIZE, OUTPUT_FORMATS, export_tickets
+from theatre.filters import TicketExportFilter
+from theatre.models import Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream sold tickets with their reservation, user, performance, "
+        "play and hall as CSV or NDJSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(OUTPUT_FORMATS), default="csv"
+        )
+        parser.add_argument(
+            "--from", dest="date_from", help="First sale day (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            "--to", dest="date_to", help="Last sale day (YYYY-MM-DD)"
+        )
+        parser.add_argument("--play", type=int, help="Play id")
+        parser.add_argument(
+            "--output", help="Write to this file instead of stdout"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        filterset = TicketExportFilter(
+            {
+                "from": options["date_from"],
+                "to": options["date_to"],
+                "play": options["play"],
+            },
+            queryset=Ticket.objects.all(),
+        )
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        blocks = export_tickets(
+            filterset.qs, options["format"], options["chunk_size"]
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="") as export_file:
+                export_file.writelines(blocks)
+        else:
+            for block in blocks:
+                self.stdout.write(block, ending="")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from theatre.models import Play
+from theatre.posters import generate_variants
+
+
+class Command(BaseCommand):
+    help = "Create resized poster variants for plays that lack them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants for every play with a poster",
+        )
+
+    def handle(self, *args, **options):
+        plays = Play.objects.exclude(poster="").exclude(poster__isnull=True)
+        if not options["force"]:
+            plays = plays.filter(poster_variants={})
+
+        done = failed = 0
+        for play in plays.iterator():
+            try:
+                generate_variants(play)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f"Play {play.id}: {error}")
+            else:
+                done += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated variants for {done} plays, {failed} failed"
+            )
+        )
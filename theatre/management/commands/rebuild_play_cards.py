@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from theatre.cache import bump_version
+from theatre.cards import rebuild_cards
+from theatre.models import Play
+
+
+class Command(BaseCommand):
+    help = "Recompute the genre and actor names stored on every play"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_cards(options["batch_size"])
+        bump_version(Play)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rebuilt} play cards")
+        )
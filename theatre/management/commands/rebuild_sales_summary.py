@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from theatre.analytics import rebuild_sales_summary
+
+
+class Command(BaseCommand):
+    help = "Recount the per-performance daily sales summary from tickets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        created = rebuild_sales_summary(options["chunk_size"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {len(created)} sales summary rows")
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from theatre import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Invalidate the play and actor search index in every worker "
+        "and rebuild it from the database"
+    )
+
+    def handle(self, *args, **options):
+        index = search.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {len(index.play_titles)} plays and "
+                f"{len(index.actor_names)} actors"
+            )
+        )
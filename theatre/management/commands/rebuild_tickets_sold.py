@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from theatre.cache import bump_version
+from theatre.models import Performance, Ticket
+
+
+class Command(BaseCommand):
+    help = "Recount Performance.tickets_sold from the Ticket table"
+
+    def handle(self, *args, **options):
+        sold = (
+            Ticket.objects
+            .filter(performance=OuterRef("pk"))
+            .order_by()
+            .values("performance")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+
+        with transaction.atomic():
+            updated = Performance.objects.update(
+                tickets_sold=Coalesce(
+                    Subquery(sold, output_field=IntegerField()), 0
+                )
+            )
+        # Available seats may have changed for any performance.
+        bump_version(Performance)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Recounted tickets for {updated} performances")
+        )
@@ -0,0 +1,91 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from theatre.seeding import DEFAULT_CHUNK_SIZE, seed_dataset, seed_user_email
+
+SCALES = {
+    "small": {
+        "genres": 10,
+        "actors": 200,
+        "plays": 500,
+        "halls": 10,
+        "performances": 2000,
+        "tickets": 100000,
+        "users": 500,
+    },
+    "medium": {
+        "genres": 18,
+        "actors": 2000,
+        "plays": 5000,
+        "halls": 50,
+        "performances": 50000,
+        "tickets": 2000000,
+        "users": 20000,
+    },
+    "large": {
+        "genres": 40,
+        "actors": 20000,
+        "plays": 50000,
+        "halls": 200,
+        "performances": 500000,
+        "tickets": 20000000,
+        "users": 200000,
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with a reproducible synthetic "
+        "catalog, performances and sold tickets using bulk inserts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=sorted(SCALES),
+            default="small",
+            help="Preset sizes; the options below override single counts",
+        )
+        for name in SCALES["small"]:
+            parser.add_argument(f"--{name}", type=int)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        counts = {
+            name: default if options[name] is None else options[name]
+            for name, default in SCALES[options["scale"]].items()
+        }
+        if counts["users"] < 1 or counts["halls"] < 1 or counts["plays"] < 1:
+            raise CommandError("Seeding needs a user, a hall and a play")
+        if get_user_model().objects.filter(
+            email=seed_user_email(options["seed"], 0)
+        ).exists():
+            raise CommandError(
+                f"Seed {options['seed']} was already loaded into this "
+                "database; pass a different --seed"
+            )
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            summary = seed_dataset(
+                seed=options["seed"],
+                chunk_size=options["chunk_size"],
+                log=self.stderr.write,
+                **counts,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                ", ".join(
+                    f"{count} {name}" for name, count in summary.items()
+                )
+                + f" created in {time.perf_counter() - started:.1f}s"
+            )
+        )
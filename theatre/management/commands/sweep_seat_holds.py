@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from theatre.booking import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Delete expired seat holds"
+
+    def handle(self, *args, **options):
+        deleted = release_expired_holds()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} expired hold rows")
+        )
@@ -1,7 +1,9 @@
 import os
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from django.utils.text import slugify
+
+from theatre.posters import content_hash, poster_name
 
 
 class Genre(models.Model):
@@ -25,9 +27,9 @@ class Actor(models.Model):
 
 def play_image_file_path(instance, filename):
     _, extension = os.path.splitext(filename)
-    filename = slugify(instance.title)
+    digest = content_hash(instance.poster.chunks())
 
-    return os.path.join("uploads/plays/", filename)
+    return poster_name(instance.title, digest, extension.lower())
 
 
 class Play(models.Model):
@@ -36,6 +38,12 @@ class Play(models.Model):
     genres = models.ManyToManyField(Genre, blank=True, related_name="plays")
     actors = models.ManyToManyField(Actor, blank=True, related_name="plays")
     poster = models.ImageField(null=True, upload_to=play_image_file_path)
+    # Size name -> storage name of the resized copies of ``poster``.
+    poster_variants = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
+    # Genre and actor names for play lists, kept by theatre.cards.
+    card = models.JSONField(null=True, editable=False)
 
     def __str__(self):
         return self.title
@@ -66,6 +74,7 @@ class Performance(models.Model):
         related_name="performances"
     )
     show_time = models.DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
 
     @staticmethod
     def validate_show_time(show_time, minimum_show_time, error_to_raise):
@@ -79,6 +88,12 @@ class Performance(models.Model):
     class Meta:
         unique_together = ("theatre_hall", "show_time")
         ordering = ["-show_time"]
+        indexes = [
+            models.Index(
+                fields=["show_time", "id"],
+                name="performance_show_time_id_idx"
+            ),
+        ]
 
 
 class Reservation(models.Model):
@@ -91,6 +106,12 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="reservation_user_created_idx"
+            ),
+        ]
 
 
 class Ticket(models.Model):
@@ -148,3 +169,79 @@ class Ticket(models.Model):
 
     class Meta:
         unique_together = ("performance", "row", "seat")
+
+
+class SalesSummary(models.Model):
+    """Tickets sold per performance and local sale day."""
+
+    performance = models.ForeignKey(
+        Performance,
+        on_delete=models.CASCADE,
+        related_name="sales"
+    )
+    day = models.DateField()
+    tickets_sold = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.performance_id} on {self.day}: {self.tickets_sold}"
+
+    class Meta:
+        unique_together = ("performance", "day")
+        verbose_name_plural = "sales summaries"
+
+
+class SeatHold(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    performance = models.ForeignKey(
+        Performance,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+
+
+class HeldSeat(models.Model):
+    row = models.PositiveIntegerField()
+    seat = models.PositiveIntegerField()
+    performance = models.ForeignKey(
+        Performance,
+        on_delete=models.CASCADE,
+        related_name="held_seats"
+    )
+    hold = models.ForeignKey(
+        SeatHold,
+        on_delete=models.CASCADE,
+        related_name="seats"
+    )
+
+    def __str__(self):
+        return f"row: {self.row}, seat: {self.seat}"
+
+    class Meta:
+        unique_together = ("performance", "row", "seat")
+
+
+class IdempotencyKey(models.Model):
+    """The response of a create sent with an ``Idempotency-Key``."""
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        unique_together = ("user", "key")
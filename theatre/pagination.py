@@ -1,7 +1,33 @@
-from rest_framework.pagination import PageNumberPagination
+from asgiref.sync import sync_to_async
+from rest_framework.pagination import CursorPagination
 
 
-class ReservationPagination(PageNumberPagination):
+class AsyncCursorPagination(CursorPagination):
+    """Cursor pagination that async views can await."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # DRF's own pagination, so both twins share its cursor semantics.
+        return await sync_to_async(self.paginate_queryset)(
+            queryset, request, view
+        )
+
+
+class PerformancePagination(AsyncCursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-show_time", "-id")
+
+
+class PlayPagination(AsyncCursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("id",)
+
+
+class ReservationPagination(CursorPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 100
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,88 @@
+"""
+Resized poster variants.
+
+Every uploaded poster is re-encoded into a few fixed widths and stored under
+content-hashed names next to the original, so each URL always points to the
+same bytes and can be cached forever.
+"""
+import hashlib
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.text import slugify
+from PIL import Image, ImageOps
+
+POSTER_DIRECTORY = "uploads/plays/"
+POSTER_SIZES = {
+    "thumbnail": 160,
+    "medium": 480,
+    "large": 1200,
+}
+JPEG_QUALITY = 82
+
+
+def content_hash(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def poster_name(title, digest, extension, size=None):
+    suffix = f"-{size}" if size else ""
+    return os.path.join(
+        POSTER_DIRECTORY, f"{slugify(title)}-{digest}{suffix}{extension}"
+    )
+
+
+def resize(image, width):
+    if image.width > width:
+        height = max(round(image.height * width / image.width), 1)
+        image = image.resize((width, height), Image.LANCZOS)
+
+    content = io.BytesIO()
+    image.save(
+        content,
+        format="JPEG",
+        quality=JPEG_QUALITY,
+        optimize=True,
+        progressive=True,
+    )
+    return content.getvalue()
+
+
+def generate_variants(play):
+    """Re-encode ``play.poster`` into every size and store the names."""
+    storage = play.poster.storage
+    with play.poster.open("rb") as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image = image.convert("RGB")
+
+    old_names = set(play.poster_variants.values())
+    variants = {}
+    for size, width in POSTER_SIZES.items():
+        content = resize(image, width)
+        name = poster_name(play.title, content_hash([content]), ".jpg", size)
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(content))
+        variants[size] = name
+
+    play.poster_variants = variants
+    play.save(update_fields=["poster_variants"])
+
+    for name in old_names - set(variants.values()):
+        storage.delete(name)
+
+    return variants
+
+
+def poster_url(original, variants, size, request=None):
+    """URL of the ``size`` variant, or of the original until it exists."""
+    name = variants.get(size) or original
+    if not name:
+        return None
+
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,334 @@
+"""
+In-process inverted index over plays and actors.
+
+Every worker keeps its own index. Local changes are applied incrementally
+from model signals; a shared generation counter in the default cache tells
+other workers that their copy is stale and must be rebuilt on next use.
+"""
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from theatre.cache import bump_counter, get_counters
+from theatre.models import Actor, Play
+
+GENERATION_KEY = "theatre:search:generation"
+TOKEN_RE = re.compile(r"\w+")
+
+TITLE_WEIGHT = 5
+ACTOR_WEIGHT = 3
+GENRE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text):
+    return [token.casefold() for token in TOKEN_RE.findall(text or "")]
+
+
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.generation = None
+        self.reset()
+
+    def reset(self):
+        self.play_postings = defaultdict(dict)
+        self.actor_postings = defaultdict(set)
+        self.play_terms = {}
+        self.actor_terms = {}
+        self.play_titles = {}
+        self.actor_names = {}
+        self.play_genres = {}
+        self.play_actors = {}
+        self.sorted_terms = None
+
+    def build(self):
+        plays = Play.objects.values_list("id", "title", "description")
+        genres = defaultdict(list)
+        for play_id, genre_id, name in Play.genres.through.objects.values_list(
+            "play_id", "genre_id", "genre__name"
+        ):
+            genres[play_id].append((genre_id, name))
+        actors = {
+            actor_id: f"{first_name} {last_name}"
+            for actor_id, first_name, last_name in Actor.objects.values_list(
+                "id", "first_name", "last_name"
+            )
+        }
+        play_actors = defaultdict(list)
+        for play_id, actor_id in Play.actors.through.objects.values_list(
+            "play_id", "actor_id"
+        ):
+            play_actors[play_id].append((actor_id, actors[actor_id]))
+
+        with self.lock:
+            self.reset()
+            for actor_id, full_name in actors.items():
+                self.add_actor(actor_id, full_name)
+            for play_id, title, description in plays:
+                self.add_play(
+                    play_id,
+                    title,
+                    description,
+                    genres[play_id],
+                    play_actors[play_id]
+                )
+
+    def add_play(self, play_id, title, description, genres, actors):
+        self.remove_play(play_id)
+
+        terms = defaultdict(int)
+        for token in tokenize(title):
+            terms[token] += TITLE_WEIGHT
+        for _, full_name in actors:
+            for token in tokenize(full_name):
+                terms[token] += ACTOR_WEIGHT
+        for _, name in genres:
+            for token in tokenize(name):
+                terms[token] += GENRE_WEIGHT
+        for token in tokenize(description):
+            terms[token] += DESCRIPTION_WEIGHT
+
+        for term, weight in terms.items():
+            if term not in self.play_postings:
+                self.sorted_terms = None
+            self.play_postings[term][play_id] = weight
+
+        self.play_terms[play_id] = set(terms)
+        self.play_titles[play_id] = title
+        self.play_genres[play_id] = {genre_id for genre_id, _ in genres}
+        self.play_actors[play_id] = {actor_id for actor_id, _ in actors}
+
+    def remove_play(self, play_id):
+        for term in self.play_terms.pop(play_id, ()):
+            postings = self.play_postings[term]
+            postings.pop(play_id, None)
+            if not postings:
+                del self.play_postings[term]
+                self.sorted_terms = None
+        self.play_titles.pop(play_id, None)
+        self.play_genres.pop(play_id, None)
+        self.play_actors.pop(play_id, None)
+
+    def add_actor(self, actor_id, full_name):
+        self.remove_actor(actor_id)
+
+        terms = set(tokenize(full_name))
+        for term in terms:
+            if term not in self.actor_postings:
+                self.sorted_terms = None
+            self.actor_postings[term].add(actor_id)
+
+        self.actor_terms[actor_id] = terms
+        self.actor_names[actor_id] = full_name
+
+    def remove_actor(self, actor_id):
+        for term in self.actor_terms.pop(actor_id, ()):
+            postings = self.actor_postings[term]
+            postings.discard(actor_id)
+            if not postings:
+                del self.actor_postings[term]
+                self.sorted_terms = None
+        self.actor_names.pop(actor_id, None)
+
+    def plays_with(self, genre_id=None, actor_id=None):
+        if genre_id is not None:
+            return [
+                play_id for play_id, genre_ids in self.play_genres.items()
+                if genre_id in genre_ids
+            ]
+        return [
+            play_id for play_id, actor_ids in self.play_actors.items()
+            if actor_id in actor_ids
+        ]
+
+    def expand(self, token):
+        if self.sorted_terms is None:
+            self.sorted_terms = sorted(
+                set(self.play_postings) | set(self.actor_postings)
+            )
+
+        terms = self.sorted_terms
+        position = bisect.bisect_left(terms, token)
+        while position < len(terms) and terms[position].startswith(token):
+            yield terms[position]
+            position += 1
+
+    def match(self, query, postings, prefix_only_last):
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+
+        scores = None
+        for position, token in enumerate(tokens):
+            use_prefix = not prefix_only_last or position == len(tokens) - 1
+            candidates = [token] if token in postings else []
+            if use_prefix:
+                candidates.extend(
+                    term for term in self.expand(token)
+                    if term != token and term in postings
+                )
+
+            token_scores = {}
+            for term in candidates:
+                factor = 1 if term == token else PREFIX_FACTOR
+                entries = postings[term]
+                if isinstance(entries, set):
+                    entries = dict.fromkeys(entries, 1)
+                for object_id, weight in entries.items():
+                    token_scores[object_id] = max(
+                        token_scores.get(object_id, 0), weight * factor
+                    )
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    object_id: score + token_scores[object_id]
+                    for object_id, score in scores.items()
+                    if object_id in token_scores
+                }
+            if not scores:
+                break
+
+        return scores
+
+    def search_plays(self, query, limit, prefix_only_last=True):
+        with self.lock:
+            scores = self.match(query, self.play_postings, prefix_only_last)
+            titles = self.play_titles
+            return sorted(
+                scores,
+                key=lambda play_id: (-scores[play_id], titles[play_id])
+            )[:limit]
+
+    def search_actors(self, query, limit, prefix_only_last=True):
+        with self.lock:
+            scores = self.match(query, self.actor_postings, prefix_only_last)
+            names = self.actor_names
+            return sorted(
+                scores,
+                key=lambda actor_id: (-scores[actor_id], names[actor_id])
+            )[:limit]
+
+    def autocomplete(self, query, limit):
+        with self.lock:
+            plays = self.search_plays(query, limit, prefix_only_last=False)
+            actors = self.search_actors(query, limit, prefix_only_last=False)
+            return (
+                [
+                    {"id": play_id, "title": self.play_titles[play_id]}
+                    for play_id in plays
+                ],
+                [
+                    {"id": actor_id, "full_name": self.actor_names[actor_id]}
+                    for actor_id in actors
+                ],
+            )
+
+
+index = SearchIndex()
+
+
+def get_index():
+    (generation,) = get_counters([GENERATION_KEY])
+
+    with index.lock:
+        if index.generation != generation:
+            index.build()
+            index.generation = generation
+
+    return index
+
+
+def mark_changed(apply_change):
+    with index.lock:
+        previous = index.generation
+        generation = bump_counter(GENERATION_KEY)
+
+        if previous is None or generation != previous + 1:
+            # Another worker changed the catalog since the last build, or
+            # the counter was evicted; rebuild from scratch on next use.
+            index.generation = None
+            return
+
+        apply_change()
+        index.generation = generation
+
+
+def refresh_play(play_id):
+    play = Play.objects.filter(pk=play_id).values_list(
+        "title", "description"
+    ).first()
+    if play is None:
+        index.remove_play(play_id)
+        return
+
+    title, description = play
+    genres = list(
+        Play.genres.through.objects
+        .filter(play_id=play_id)
+        .values_list("genre_id", "genre__name")
+    )
+    actors = [
+        (actor_id, f"{first_name} {last_name}")
+        for actor_id, first_name, last_name in (
+            Play.actors.through.objects
+            .filter(play_id=play_id)
+            .values_list("actor_id", "actor__first_name", "actor__last_name")
+        )
+    ]
+    index.add_play(play_id, title, description, genres, actors)
+
+
+def play_changed(play_ids):
+    def apply_change():
+        for play_id in play_ids:
+            refresh_play(play_id)
+
+    mark_changed(apply_change)
+
+
+def genre_changed(genre_id):
+    def apply_change():
+        play_ids = set(index.plays_with(genre_id=genre_id))
+        play_ids.update(
+            Play.genres.through.objects
+            .filter(genre_id=genre_id)
+            .values_list("play_id", flat=True)
+        )
+        for play_id in play_ids:
+            refresh_play(play_id)
+
+    mark_changed(apply_change)
+
+
+def actor_changed(actor_id):
+    def apply_change():
+        actor = Actor.objects.filter(pk=actor_id).first()
+        if actor is None:
+            index.remove_actor(actor_id)
+        else:
+            index.add_actor(actor_id, actor.full_name)
+
+        play_ids = set(index.plays_with(actor_id=actor_id))
+        play_ids.update(
+            Play.actors.through.objects
+            .filter(actor_id=actor_id)
+            .values_list("play_id", flat=True)
+        )
+        for play_id in play_ids:
+            refresh_play(play_id)
+
+    mark_changed(apply_change)
+
+
+def rebuild_later():
+    bump_counter(GENERATION_KEY)
+
+
+def rebuild():
+    rebuild_later()
+    return get_index()
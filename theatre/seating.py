@@ -0,0 +1,171 @@
+import base64
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Max, Min, Q, Value
+from django.utils import timezone
+
+from theatre.models import HeldSeat, SeatHold, Ticket
+
+HOLD_EXPIRY_KEY_PREFIX = "theatre:hold-expiry"
+# Bounds how long an entry computed alongside a new hold may miss it.
+HOLD_EXPIRY_TIMEOUT = 60
+
+
+def taken_seats(performance_id):
+    return Ticket.objects.filter(
+        performance_id=performance_id
+    ).values_list("row", "seat")
+
+
+def held_seats(performance_id):
+    return HeldSeat.objects.filter(
+        performance_id=performance_id,
+        hold__expires_at__gt=timezone.now(),
+    ).values_list("row", "seat")
+
+
+def occupied_seats(performance_id):
+    """``(row, seat, held)`` of taken and actively held seats, one query."""
+    return taken_seats(performance_id).values_list(
+        "row", "seat", Value(False, output_field=BooleanField())
+    ).union(
+        held_seats(performance_id).values_list(
+            "row", "seat", Value(True, output_field=BooleanField())
+        ),
+        all=True,
+    )
+
+
+def hold_expiry_key(performance_id):
+    return f"{HOLD_EXPIRY_KEY_PREFIX}:{performance_id}"
+
+
+def last_hold_expiry(performance_id):
+    """
+    When the latest hold for the performance ran out, in nanoseconds since
+    the epoch, or 0. Cached until its next hold runs out.
+    """
+    key = hold_expiry_key(performance_id)
+    now = timezone.now()
+    cached = cache.get(key)
+    if cached is not None:
+        lapsed, upcoming = cached
+        if upcoming is None or upcoming > now:
+            return lapsed
+
+    expiries = SeatHold.objects.filter(
+        performance_id=performance_id
+    ).aggregate(
+        lapsed=Max("expires_at", filter=Q(expires_at__lte=now)),
+        upcoming=Min("expires_at", filter=Q(expires_at__gt=now)),
+    )
+    lapsed = expiries["lapsed"]
+    lapsed = 0 if lapsed is None else int(lapsed.timestamp()) * 10 ** 9
+    cache.set(key, (lapsed, expiries["upcoming"]), HOLD_EXPIRY_TIMEOUT)
+    return lapsed
+
+
+def forget_hold_expiry(performance_id):
+    cache.delete(hold_expiry_key(performance_id))
+
+
+def pack_seats(rows, seats_in_row, seats):
+    """Pack (row, seat) pairs into a row-major, MSB-first bitmap."""
+    bitmap = bytearray((rows * seats_in_row + 7) // 8)
+
+    for row, seat in seats:
+        if 1 <= row <= rows and 1 <= seat <= seats_in_row:
+            index = (row - 1) * seats_in_row + seat - 1
+            bitmap[index >> 3] |= 0x80 >> (index & 7)
+
+    return bytes(bitmap)
+
+
+def row_masks(rows, seats_in_row, seats):
+    """One int per row with bit ``seat - 1`` set for every given seat."""
+    masks = [0] * rows
+
+    for row, seat in seats:
+        if 1 <= row <= rows and 1 <= seat <= seats_in_row:
+            masks[row - 1] |= 1 << (seat - 1)
+
+    return masks
+
+
+def best_blocks(masks, seats_in_row, count):
+    """
+    ``(row, first_seat)`` of every run of ``count`` free seats, closest to
+    the middle of the hall first, then front rows and lower seats first.
+    """
+    row_middle = (len(masks) + 1) / 2
+    seat_middle = (seats_in_row + 1) / 2
+    all_seats = (1 << seats_in_row) - 1
+    blocks = []
+
+    for row, mask in enumerate(masks, start=1):
+        free = ~mask & all_seats
+        # Bit i survives only if seats i + 1 .. i + count are all free.
+        starts = free
+        for offset in range(1, count):
+            starts &= free >> offset
+
+        while starts:
+            lowest = starts & -starts
+            starts ^= lowest
+            first = lowest.bit_length()
+            distance = (
+                (row - row_middle) ** 2
+                + (first + (count - 1) / 2 - seat_middle) ** 2
+            )
+            blocks.append((distance, row, first))
+
+    return [(row, first) for _, row, first in sorted(blocks)]
+
+
+def seat_map(performance, expanded=False):
+    return build_seat_map(
+        performance, list(occupied_seats(performance.id)), expanded
+    )
+
+
+async def aseat_map(performance, expanded=False):
+    seats = [seat async for seat in occupied_seats(performance.id)]
+    return build_seat_map(performance, seats, expanded)
+
+
+def build_seat_map(performance, seats, expanded=False):
+    """
+    Map of the seats that cannot be booked: ``bitmap`` has a bit for every
+    taken or held seat, counted apart in ``taken`` and ``held``.
+    """
+    theatre_hall = performance.theatre_hall
+    taken = sorted((row, seat) for row, seat, is_held in seats if not is_held)
+    # A holder may have booked their held seats directly.
+    held = sorted(
+        {(row, seat) for row, seat, is_held in seats if is_held} - set(taken)
+    )
+    bitmap = pack_seats(
+        theatre_hall.rows, theatre_hall.seats_in_row, taken + held
+    )
+
+    data = {
+        "performance": performance.id,
+        "rows": theatre_hall.rows,
+        "seats_in_row": theatre_hall.seats_in_row,
+        "capacity": theatre_hall.capacity,
+        "taken": len(taken),
+        "held": len(held),
+        "available": theatre_hall.capacity - len(taken) - len(held),
+        "encoding": "base64",
+        "bitmap": base64.b64encode(bitmap).decode("ascii"),
+    }
+
+    if expanded:
+        data["taken_seats"] = [
+            {"row": row, "seat": seat} for row, seat in taken
+        ]
+        data["held_seats"] = [
+            {"row": row, "seat": seat} for row, seat in held
+        ]
+
+    return data
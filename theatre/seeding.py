@@ -0,0 +1,336 @@
+import datetime
+import random
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from theatre import search
+from theatre.analytics import rebuild_sales_summary
+from theatre.cache import bump_version
+from theatre.cards import rebuild_cards
+from theatre.models import (
+    Genre,
+    Actor,
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    Ticket,
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_TICKETS_PER_RESERVATION = 6
+
+GENRE_NAMES = (
+    "Drama", "Comedy", "Tragedy", "Musical", "Opera", "Ballet", "Farce",
+    "Satire", "Melodrama", "Mystery", "Historical", "Fantasy", "Romance",
+    "Absurdist", "Documentary", "Puppetry", "Cabaret", "Children's",
+)
+FIRST_NAMES = (
+    "Anna", "Oleh", "Iryna", "Taras", "Maria", "John", "Jane", "Olena",
+    "Petro", "Sofia", "Andrii", "Kateryna", "David", "Emma", "Lucas",
+    "Mila", "Ivan", "Daria", "Marko", "Yulia", "Bohdan", "Nina", "Roman",
+)
+LAST_NAMES = (
+    "Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko",
+    "Smith", "Doe", "Melnyk", "Boyko", "Oliynyk", "Lysenko", "Marchenko",
+    "Rudenko", "Savchenko", "Petrenko", "Moroz", "Pavlenko", "Levchenko",
+)
+TITLE_WORDS = (
+    "Night", "Garden", "Winter", "Tale", "King", "Queen", "Storm", "Dream",
+    "Forest", "Song", "Shadow", "River", "Mirror", "Letter", "Island",
+    "Summer", "Fire", "Stone", "Masquerade", "Orchard", "Harbour", "Bell",
+)
+
+
+@contextmanager
+def throwaway_database():
+    """Run benchmarks against a fresh test database, never the real one."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def bulk_insert(model, objects, chunk_size):
+    created = []
+    for chunk in chunked(objects, chunk_size):
+        created.extend(model.objects.bulk_create(chunk))
+    return created
+
+
+def seed_user_email(seed, number):
+    return f"seed{seed}-user{number}@seed.theatre"
+
+
+def seed_users(count, seed, chunk_size, password="1qazcde3"):
+    password = make_password(password)
+    return bulk_insert(
+        get_user_model(),
+        (
+            get_user_model()(
+                email=seed_user_email(seed, i),
+                password=password
+            )
+            for i in range(count)
+        ),
+        chunk_size,
+    )
+
+
+def seed_halls(count, rng, chunk_size):
+    return bulk_insert(
+        TheatreHall,
+        (
+            TheatreHall(
+                name=f"Hall {i + 1}",
+                rows=rng.randint(10, 40),
+                seats_in_row=rng.randint(15, 40),
+            )
+            for i in range(count)
+        ),
+        chunk_size,
+    )
+
+
+def seed_genres(count, chunk_size):
+    return bulk_insert(
+        Genre,
+        (
+            Genre(
+                name=GENRE_NAMES[i % len(GENRE_NAMES)]
+                + ("" if i < len(GENRE_NAMES) else f" {i // len(GENRE_NAMES)}")
+            )
+            for i in range(count)
+        ),
+        chunk_size,
+    )
+
+
+def seed_actors(count, rng, chunk_size):
+    return bulk_insert(
+        Actor,
+        (
+            Actor(
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+            )
+            for _ in range(count)
+        ),
+        chunk_size,
+    )
+
+
+def seed_plays(count, rng, chunk_size):
+    def title(i):
+        words = rng.sample(TITLE_WORDS, 2)
+        return f"The {words[0]} of the {words[1]} {i + 1}"
+
+    return bulk_insert(
+        Play,
+        (
+            Play(
+                title=title(i),
+                description=" ".join(
+                    rng.choices(TITLE_WORDS, k=rng.randint(8, 30))
+                ).capitalize(),
+            )
+            for i in range(count)
+        ),
+        chunk_size,
+    )
+
+
+def seed_play_relations(plays, genres, actors, rng, chunk_size):
+    links = 0
+
+    if genres:
+        links += len(bulk_insert(
+            Play.genres.through,
+            (
+                Play.genres.through(play_id=play.id, genre_id=genre.id)
+                for play in plays
+                for genre in rng.sample(
+                    genres, min(len(genres), rng.randint(1, 3))
+                )
+            ),
+            chunk_size,
+        ))
+
+    if actors:
+        links += len(bulk_insert(
+            Play.actors.through,
+            (
+                Play.actors.through(play_id=play.id, actor_id=actor.id)
+                for play in plays
+                for actor in rng.sample(
+                    actors, min(len(actors), rng.randint(3, 8))
+                )
+            ),
+            chunk_size,
+        ))
+
+    return links
+
+
+def plan_sales(capacities, tickets):
+    """Spread ``tickets`` over performances without exceeding capacity."""
+    remaining = tickets
+    sold = []
+
+    for position, capacity in enumerate(capacities):
+        share = -(-remaining // (len(capacities) - position))
+        count = min(capacity, share)
+        sold.append(count)
+        remaining -= count
+
+    return sold
+
+
+def seed_performances(count, plays, halls, tickets, rng, chunk_size):
+    start = timezone.now().replace(
+        minute=0, second=0, microsecond=0
+    ) - datetime.timedelta(days=30)
+    assigned_halls = [halls[i % len(halls)] for i in range(count)]
+    sold = plan_sales(
+        [hall.capacity for hall in assigned_halls], tickets
+    )
+
+    return bulk_insert(
+        Performance,
+        (
+            Performance(
+                play=rng.choice(plays),
+                theatre_hall=hall,
+                show_time=start + datetime.timedelta(
+                    hours=3 * (i // len(halls))
+                ),
+                tickets_sold=sold[i],
+            )
+            for i, hall in enumerate(assigned_halls)
+        ),
+        chunk_size,
+    )
+
+
+def seed_sales(performances, users, rng, chunk_size):
+    reservations = []
+    tickets = []
+
+    def flush():
+        created = bulk_insert(Reservation, reservations, chunk_size)
+        for reservation, ticket in zip(
+            (reservation for reservation in created for _ in range(
+                reservation.ticket_count
+            )),
+            tickets
+        ):
+            ticket.reservation = reservation
+        bulk_insert(Ticket, tickets, chunk_size)
+        reservations.clear()
+        tickets.clear()
+
+    total = 0
+    for performance in performances:
+        seats_in_row = performance.theatre_hall.seats_in_row
+        position = 0
+        while position < performance.tickets_sold:
+            size = min(
+                rng.randint(1, MAX_TICKETS_PER_RESERVATION),
+                performance.tickets_sold - position
+            )
+            reservation = Reservation(user=rng.choice(users))
+            reservation.ticket_count = size
+            reservations.append(reservation)
+            for seat_index in range(position, position + size):
+                tickets.append(Ticket(
+                    performance=performance,
+                    row=seat_index // seats_in_row + 1,
+                    seat=seat_index % seats_in_row + 1,
+                ))
+            position += size
+
+        total += performance.tickets_sold
+        if len(tickets) >= chunk_size:
+            flush()
+
+    flush()
+    return total
+
+
+def invalidate_caches():
+    # bulk_create sends no model signals, so cached catalog responses,
+    # performance watermarks and the search index have to be invalidated
+    # by hand.
+    for model in (Genre, Actor, Play, TheatreHall, Performance):
+        bump_version(model)
+    search.rebuild_later()
+
+
+def seed_dataset(
+        halls,
+        plays,
+        performances,
+        tickets,
+        users=100,
+        genres=len(GENRE_NAMES),
+        actors=500,
+        seed=0,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        log=None,
+):
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    summary = {}
+
+    log(f"Creating {users} users")
+    user_objects = seed_users(users, seed, chunk_size)
+    summary["users"] = len(user_objects)
+
+    log(f"Creating {genres} genres, {actors} actors and {plays} plays")
+    genre_objects = seed_genres(genres, chunk_size)
+    actor_objects = seed_actors(actors, rng, chunk_size)
+    play_objects = seed_plays(plays, rng, chunk_size)
+    summary["genres"] = len(genre_objects)
+    summary["actors"] = len(actor_objects)
+    summary["plays"] = len(play_objects)
+    summary["play_links"] = seed_play_relations(
+        play_objects, genre_objects, actor_objects, rng, chunk_size
+    )
+    rebuild_cards(chunk_size)
+
+    log(f"Creating {halls} halls and {performances} performances")
+    hall_objects = seed_halls(halls, rng, chunk_size)
+    performance_objects = seed_performances(
+        performances, play_objects, hall_objects, tickets, rng, chunk_size
+    )
+    summary["halls"] = len(hall_objects)
+    summary["performances"] = len(performance_objects)
+
+    log(f"Selling up to {tickets} tickets")
+    summary["tickets"] = seed_sales(
+        performance_objects, user_objects, rng, chunk_size
+    )
+    rebuild_sales_summary(chunk_size)
+
+    transaction.on_commit(invalidate_caches)
+    return summary
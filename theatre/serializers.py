@@ -1,9 +1,27 @@
 import datetime
+from collections import defaultdict, namedtuple
+from functools import lru_cache
 
+from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from pytz import utc
 from rest_framework import serializers
-
+from rest_framework.fields import empty
+
+from theatre.analytics import OCCUPANCY_GROUPS, SALES_INTERVALS
+from theatre.booking import (
+    SeatsConflict,
+    SeatsUnavailable,
+    allocate_seats,
+    book_tickets,
+    hold_seats,
+    seat_errors,
+    seat_key,
+)
 from theatre.models import (
     Genre,
     Actor,
@@ -12,7 +30,129 @@ from theatre.models import (
     Performance,
     Ticket,
     Reservation,
+    SeatHold,
+    HeldSeat,
 )
+from theatre.posters import POSTER_SIZES, poster_url
+
+
+@lru_cache(maxsize=None)
+def mirrored_fields(serializer_class):
+    return tuple(
+        (name, field.to_representation)
+        for name, field in serializer_class().fields.items()
+        if not field.write_only
+    )
+
+
+def primary_keys(**kwargs):
+    return lambda: serializers.PrimaryKeyRelatedField(read_only=True, **kwargs)
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer taking ``fields``, the names to render, and ``expand``, the
+    relations to render in full. Once either is given, the relations in
+    ``collapsed_fields`` render as primary keys unless expanded.
+    """
+
+    # Field name -> factory of the field rendering it collapsed.
+    collapsed_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super(DynamicFieldsMixin, self).__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+
+        for name in list(self.fields):
+            if fields is not None and name not in fields:
+                self.fields.pop(name)
+            elif name in self.collapsed_fields and name not in (expand or ()):
+                self.fields[name] = self.collapsed_fields[name]()
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    async def aload(self, rows):
+        """Fetch what the rows need besides themselves, for async views."""
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer over ``QuerySet.values()`` rows that renders the
+    same output as ``mirror`` without building model instances, including
+    its ``fields`` and ``expand`` arguments.
+    """
+
+    mirror = None
+    # Output field name -> values() lookup or expression, when they differ.
+    sources = {}
+    # Output fields the subclass fills in itself -> the columns they read;
+    # ``computed_value(name, row)`` renders them.
+    computed = {}
+
+    class Meta:
+        list_serializer_class = ValuesListSerializer
+
+    def __init_subclass__(cls, **kwargs):
+        super(ValuesSerializer, cls).__init_subclass__(**kwargs)
+        if cls.computed and not hasattr(cls, "computed_value"):
+            raise TypeError(
+                f"{cls.__name__} has computed fields but no computed_value()."
+            )
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super(ValuesSerializer, self).__init__(*args, **kwargs)
+        self.rendered = self.rendered_fields(fields)
+        self.collapse = fields is not None or expand is not None
+        self.expand = expand or set()
+
+    @classmethod
+    def rendered_fields(cls, fields=None):
+        return [
+            (name, to_representation)
+            for name, to_representation in mirrored_fields(cls.mirror)
+            if fields is None or name in fields
+        ]
+
+    @classmethod
+    def values(cls, queryset, fields=None, expand=None, extra=()):
+        """
+        ``values()`` of the columns the selected fields read, plus the
+        ``extra`` columns, e.g. ordering keys pagination reads from rows,
+        which are selected but not rendered.
+        """
+        names = []
+        expressions = {}
+        for name, _ in cls.rendered_fields(fields):
+            if name in cls.computed:
+                names.extend(cls.computed[name])
+                continue
+            source = cls.sources.get(name, name)
+            if source == name:
+                names.append(name)
+            else:
+                expressions[name] = (
+                    F(source) if isinstance(source, str) else source
+                )
+        names.extend(name for name in extra if name not in expressions)
+        return queryset.values(*dict.fromkeys(names), **expressions)
+
+    def renders(self, name):
+        return name in dict(self.rendered)
+
+    def expands(self, name):
+        return not self.collapse or name in self.expand
+
+    def to_representation(self, row):
+        computed = self.computed
+        return {
+            name: (
+                self.computed_value(name, row) if name in computed
+                else None if row[name] is None
+                else to_representation(row[name])
+            )
+            for name, to_representation in self.rendered
+        }
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -33,7 +173,51 @@ class PlaySerializer(serializers.ModelSerializer):
         fields = ("id", "title", "description", "genres", "actors")
 
 
-class PlayListSerializer(PlaySerializer):
+@extend_schema_field(OpenApiTypes.URI)
+class PosterField(serializers.Field):
+    """URL of one poster size, falling back to the original upload."""
+
+    def __init__(self, size, **kwargs):
+        self.size = size
+        kwargs.update(source="*", read_only=True)
+        super(PosterField, self).__init__(**kwargs)
+
+    def to_representation(self, play):
+        return poster_url(
+            play.poster.name,
+            play.poster_variants,
+            self.size,
+            self.context.get("request")
+        )
+
+
+@extend_schema_field({
+    "type": "object",
+    "properties": {
+        size: {"type": "string", "format": "uri", "nullable": True}
+        for size in ("original", *POSTER_SIZES)
+    },
+})
+class PosterSetField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs.update(source="*", read_only=True)
+        super(PosterSetField, self).__init__(**kwargs)
+
+    def to_representation(self, play):
+        request = self.context.get("request")
+        return {
+            size: poster_url(
+                play.poster.name, play.poster_variants, size, request
+            )
+            for size in ("original", *POSTER_SIZES)
+        }
+
+
+class PlayListSerializer(DynamicFieldsMixin, PlaySerializer):
+    collapsed_fields = {
+        "genres": primary_keys(many=True),
+        "actors": primary_keys(many=True),
+    }
     genres = serializers.SlugRelatedField(
         many=True,
         read_only=True,
@@ -44,25 +228,139 @@ class PlayListSerializer(PlaySerializer):
         read_only=True,
         slug_field="full_name",
     )
+    poster = PosterField("thumbnail")
 
     class Meta:
         model = Play
         fields = ("id", "title", "description", "genres", "actors", "poster")
 
 
-class PlayDetailSerializer(PlaySerializer):
+class PlayValuesListSerializer(ValuesListSerializer):
+    """
+    Renders genres and actors from the play cards, falling back to the
+    through tables for plays whose card has not been built.
+    """
+
+    # Relation -> through table column of its id, and of its name parts.
+    relations = {
+        "genres": ("genre_id", ("genre__name",)),
+        "actors": ("actor_id", ("actor__first_name", "actor__last_name")),
+    }
+
+    def name_rows(self, play_ids):
+        rows = {}
+        for name, (key, name_columns) in self.relations.items():
+            if not self.child.renders(name):
+                continue
+            # Collapsed relations are rendered from the through table alone.
+            columns = name_columns if self.child.expands(name) else (key,)
+            rows[name] = (
+                getattr(Play, name).through.objects
+                .filter(play_id__in=play_ids)
+                .order_by(key)
+                .values_list("play_id", *columns)
+            )
+        return rows
+
+    def set_names(self, rows):
+        self.child.related = {}
+        for name, relation_rows in rows.items():
+            values = self.child.related[name] = defaultdict(list)
+            for play_id, *parts in relation_rows:
+                values[play_id].append(
+                    parts[0] if len(parts) == 1 else " ".join(parts)
+                )
+
+    def cardless_ids(self, rows):
+        return [row["id"] for row in rows if row.get("card", {}) is None]
+
+    async def aload(self, rows):
+        name_rows = self.name_rows(self.cardless_ids(rows))
+        self.set_names({
+            name: [row async for row in queryset]
+            for name, queryset in name_rows.items()
+        })
+
+    def to_representation(self, data):
+        rows = list(data)
+        if getattr(self.child, "related", None) is None:
+            self.set_names(self.name_rows(self.cardless_ids(rows)))
+
+        return super(PlayValuesListSerializer, self).to_representation(rows)
+
+
+class PlayListValuesSerializer(ValuesSerializer):
+    mirror = PlayListSerializer
+    computed = {
+        "genres": ("id", "card"),
+        "actors": ("id", "card"),
+        "poster": ("poster", "poster_variants"),
+    }
+
+    class Meta:
+        list_serializer_class = PlayValuesListSerializer
+
+    def computed_value(self, name, row):
+        if name == "poster":
+            return poster_url(
+                row["poster"],
+                row["poster_variants"],
+                "thumbnail",
+                self.context.get("request")
+            )
+
+        if row["card"] is None:
+            return self.related[name][row["id"]]
+        position = 1 if self.expands(name) else 0
+        return [pair[position] for pair in row["card"][name]]
+
+
+class PlaySuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+
+
+class ActorSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    full_name = serializers.CharField()
+
+
+class SearchResultSerializer(serializers.Serializer):
+    plays = PlayListSerializer(many=True)
+    actors = ActorSerializer(many=True)
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    plays = PlaySuggestionSerializer(many=True)
+    actors = ActorSuggestionSerializer(many=True)
+
+
+class PlayDetailSerializer(DynamicFieldsMixin, PlaySerializer):
+    collapsed_fields = PlayListSerializer.collapsed_fields
     genres = GenreSerializer(many=True, read_only=True)
     actors = ActorSerializer(many=True, read_only=True)
+    poster = PosterField("large")
+    posters = PosterSetField()
 
     class Meta:
         model = Play
-        fields = ("id", "title", "description", "genres", "actors", "poster")
+        fields = (
+            "id",
+            "title",
+            "description",
+            "genres",
+            "actors",
+            "poster",
+            "posters",
+        )
 
 
 class PlayPosterSerializer(serializers.ModelSerializer):
+    posters = PosterSetField()
+
     class Meta:
         model = Play
-        fields = ("id", "poster")
+        fields = ("id", "poster", "posters")
 
 
 class TheatreHallSerializer(serializers.ModelSerializer):
@@ -87,7 +385,7 @@ class PerformanceSerializer(serializers.ModelSerializer):
         return data
 
 
-class PerformanceListSerializer(PerformanceSerializer):
+class PerformanceListSerializer(DynamicFieldsMixin, PerformanceSerializer):
     play_title = serializers.CharField(source="play.title", read_only=True)
     theatre_hall_name = serializers.CharField(
         source="theatre_hall.name",
@@ -111,9 +409,75 @@ class PerformanceListSerializer(PerformanceSerializer):
         )
 
 
-class PerformanceDetailSerializer(PerformanceSerializer):
+class PerformanceListValuesSerializer(ValuesSerializer):
+    mirror = PerformanceListSerializer
+    sources = {
+        "play_title": "play__title",
+        "theatre_hall_name": "theatre_hall__name",
+        "theatre_hall_capacity": (
+            F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+        ),
+    }
+
+
+class PerformanceDetailSerializer(DynamicFieldsMixin, PerformanceSerializer):
+    collapsed_fields = {
+        "play": primary_keys(),
+        "theatre_hall": primary_keys(),
+    }
     play = PlayListSerializer()
     theatre_hall = TheatreHallSerializer()
+    available_tickets = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Performance
+        fields = (
+            "id",
+            "play",
+            "theatre_hall",
+            "available_tickets",
+            "show_time"
+        )
+
+
+class PerformanceScheduleSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    play_title = serializers.CharField()
+    theatre_hall_name = serializers.CharField()
+    available_tickets = serializers.IntegerField()
+    show_time = serializers.DateTimeField()
+
+
+class PerformanceScheduleDaySerializer(serializers.Serializer):
+    date = serializers.DateField()
+    performances = PerformanceScheduleSerializer(many=True)
+
+
+class OccupancySerializer(serializers.Serializer):
+    # A performance, play or hall id, or the first day of the period.
+    key = serializers.JSONField(read_only=True)
+    label = serializers.CharField(required=False)
+    performances = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    sold = serializers.IntegerField()
+    occupancy = serializers.FloatField()
+
+
+class OccupancyQuerySerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(
+        choices=list(OCCUPANCY_GROUPS), default="performance"
+    )
+
+
+class SalesQuerySerializer(serializers.Serializer):
+    interval = serializers.ChoiceField(
+        choices=list(SALES_INTERVALS), default="day"
+    )
+
+
+class SalesPeriodSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    tickets_sold = serializers.IntegerField()
 
 
 class PerformanceReservationSerializer(PerformanceListSerializer):
@@ -127,7 +491,97 @@ class PerformanceReservationSerializer(PerformanceListSerializer):
         )
 
 
+class LoadedLookupField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that resolves against objects loaded up front by a
+    batch serializer, falling back to a query when nothing was loaded.
+    """
+
+    def get_loaded(self):
+        return None
+
+    def to_internal_value(self, data):
+        loaded = self.get_loaded()
+        if loaded is None:
+            return super(LoadedLookupField, self).to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            obj = loaded.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+
+        return obj
+
+
+class PerformanceLookupField(LoadedLookupField):
+    def get_loaded(self):
+        return getattr(self.parent, "performances", None)
+
+
+class UserLookupField(LoadedLookupField):
+    def get_loaded(self):
+        return self.context.get("users")
+
+
+def collect_ids(items, key):
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item[key]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return ids
+
+
+class TicketBatchSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        performances = self.context.get("performances")
+        if performances is None:
+            performances = (
+                Performance.objects
+                .select_related("theatre_hall")
+                .in_bulk(collect_ids(
+                    data if isinstance(data, list) else [], "performance"
+                ))
+            )
+
+        self.child.performances = performances
+        try:
+            tickets_data = super(
+                TicketBatchSerializer, self
+            ).to_internal_value(data)
+        finally:
+            self.child.performances = None
+
+        seen = set()
+        duplicates = set()
+        for ticket_data in tickets_data:
+            key = seat_key(ticket_data)
+            if key in seen:
+                duplicates.add(key)
+            seen.add(key)
+
+        if duplicates:
+            raise serializers.ValidationError(
+                seat_errors(
+                    tickets_data,
+                    duplicates,
+                    "is requested more than once"
+                )
+            )
+
+        return tickets_data
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    performance = PerformanceLookupField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs)
         row_value = attrs["row"]
@@ -147,6 +601,8 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "performance")
+        list_serializer_class = TicketBatchSerializer
+        validators = []
 
 
 class TicketListSerializer(TicketSerializer):
@@ -168,10 +624,222 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
             reservation = Reservation.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(reservation=reservation, **ticket_data)
+            try:
+                book_tickets(reservation, tickets_data)
+            except SeatsUnavailable as error:
+                raise serializers.ValidationError({
+                    "tickets": seat_errors(
+                        tickets_data, error.seats, "is not available"
+                    )
+                })
             return reservation
 
     class Meta:
         model = Reservation
         fields = ("id", "tickets", "created_at")
+
+
+class ReservationAllocateSerializer(serializers.Serializer):
+    MAX_SEATS = 10
+
+    performance = PerformanceLookupField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
+    count = serializers.IntegerField(min_value=1, max_value=MAX_SEATS)
+
+    def validate(self, attrs):
+        data = super(ReservationAllocateSerializer, self).validate(attrs)
+        seats_in_row = attrs["performance"].theatre_hall.seats_in_row
+        if attrs["count"] > seats_in_row:
+            raise serializers.ValidationError({
+                "count": f"A row has only {seats_in_row} seats."
+            })
+
+        return data
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            reservation = Reservation.objects.create(
+                user=validated_data["user"]
+            )
+            allocate_seats(
+                reservation,
+                validated_data["performance"],
+                validated_data["count"],
+            )
+            return reservation
+
+    def to_representation(self, reservation):
+        return ReservationCreateSerializer(
+            reservation, context=self.context
+        ).data
+
+
+InvalidBatchItem = namedtuple("InvalidBatchItem", ("errors",))
+
+
+class ReservationBatchItemSerializer(serializers.Serializer):
+    user = UserLookupField(queryset=get_user_model().objects.all())
+    tickets = TicketSerializer(many=True, allow_empty=False)
+
+    def run_validation(self, data=empty):
+        # One invalid item is reported on its own rather than failing the
+        # whole batch.
+        try:
+            return super(ReservationBatchItemSerializer, self).run_validation(
+                data
+            )
+        except serializers.ValidationError as error:
+            return InvalidBatchItem(error.detail)
+
+
+class ReservationBatchSerializer(serializers.Serializer):
+    MAX_RESERVATIONS = 500
+
+    reservations = ReservationBatchItemSerializer(
+        many=True, allow_empty=False, max_length=MAX_RESERVATIONS
+    )
+
+    def to_internal_value(self, data):
+        # One query for every user and one for every performance in the
+        # batch, shared by all of its items.
+        items = data.get("reservations") if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            items = []
+        items = [item for item in items if isinstance(item, dict)]
+        tickets = [
+            ticket
+            for item in items if isinstance(item.get("tickets"), list)
+            for ticket in item["tickets"]
+        ]
+
+        self.context["users"] = get_user_model().objects.in_bulk(
+            collect_ids(items, "user")
+        )
+        self.context["performances"] = (
+            Performance.objects
+            .select_related("theatre_hall")
+            .in_bulk(collect_ids(tickets, "performance"))
+        )
+        try:
+            return super(ReservationBatchSerializer, self).to_internal_value(
+                data
+            )
+        finally:
+            del self.context["users"], self.context["performances"]
+
+
+class BookedSeatSerializer(serializers.Serializer):
+    performance = serializers.IntegerField()
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class ReservationBatchResultSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(
+        choices=["created", "conflict", "invalid"]
+    )
+    reservation = ReservationCreateSerializer(required=False)
+    seats = BookedSeatSerializer(
+        many=True,
+        required=False,
+        help_text="Seats that were not available, for conflicts",
+    )
+    errors = serializers.DictField(
+        required=False,
+        help_text="Validation errors of the item, for invalid items",
+    )
+
+    def to_representation(self, result):
+        if isinstance(result, InvalidBatchItem):
+            return {"status": "invalid", "errors": result.errors}
+
+        if result.reservation is None:
+            return {
+                "status": "conflict",
+                "seats": self.fields["seats"].to_representation([
+                    {"performance": performance_id, "row": row, "seat": seat}
+                    for performance_id, row, seat in result.seats
+                ]),
+            }
+
+        return {
+            "status": "created",
+            "reservation": self.fields["reservation"].to_representation({
+                "id": result.reservation.id,
+                "tickets": result.tickets,
+                "created_at": result.reservation.created_at,
+            }),
+        }
+
+
+class HeldSeatSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HeldSeat
+        fields = ("row", "seat")
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    MAX_HOLD_MINUTES = 30
+
+    performance = PerformanceLookupField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
+    seats = HeldSeatSerializer(many=True, allow_empty=False)
+    minutes = serializers.IntegerField(
+        write_only=True,
+        min_value=1,
+        max_value=MAX_HOLD_MINUTES,
+        default=10
+    )
+
+    def validate(self, attrs):
+        data = super(SeatHoldSerializer, self).validate(attrs)
+        theatre_hall = attrs["performance"].theatre_hall
+        seats = [(seat["row"], seat["seat"]) for seat in attrs["seats"]]
+
+        for row_value, seat_value in seats:
+            Ticket.validate_row(
+                row_value, theatre_hall.rows, serializers.ValidationError
+            )
+            Ticket.validate_seat(
+                seat_value,
+                theatre_hall.seats_in_row,
+                serializers.ValidationError
+            )
+
+        if len(set(seats)) != len(seats):
+            raise serializers.ValidationError(
+                {"Seats": "Each seat can be held only once"}
+            )
+
+        return data
+
+    def create(self, validated_data):
+        minutes = validated_data.pop("minutes")
+        try:
+            return hold_seats(
+                user=validated_data["user"],
+                performance=validated_data["performance"],
+                seats=[
+                    (seat["row"], seat["seat"])
+                    for seat in validated_data["seats"]
+                ],
+                expires_at=timezone.now() + datetime.timedelta(
+                    minutes=minutes
+                ),
+            )
+        except SeatsUnavailable as error:
+            raise SeatsConflict(error.seats)
+
+    class Meta:
+        model = SeatHold
+        fields = (
+            "id",
+            "performance",
+            "seats",
+            "minutes",
+            "created_at",
+            "expires_at"
+        )
+        read_only_fields = ("expires_at",)
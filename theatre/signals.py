@@ -0,0 +1,184 @@
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from django.utils import timezone
+
+from theatre import cards, events, search
+from theatre.booking import record_sales, release_tickets
+from theatre.cache import bump_version, bump_watermarks
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    SeatHold,
+    TheatreHall,
+    Ticket,
+)
+from theatre.seating import forget_hold_expiry
+
+
+def sale_day(ticket):
+    created_at = (
+        Reservation.objects
+        .filter(pk=ticket.reservation_id)
+        .values_list("created_at", flat=True)
+        .first()
+    )
+    return None if created_at is None else timezone.localdate(created_at)
+
+
+def deleted_directly(origin, model):
+    # ``origin`` is what delete() was called on: an instance or a queryset.
+    return (
+        origin.model if isinstance(origin, QuerySet) else type(origin)
+    ) is model
+
+
+@receiver(post_save, sender=Ticket)
+def count_ticket_sold(sender, instance, created, **kwargs):
+    if created:
+        Performance.objects.filter(pk=instance.performance_id).update(
+            tickets_sold=F("tickets_sold") + 1
+        )
+        day = sale_day(instance)
+        if day is not None:
+            record_sales({instance.performance_id: 1}, day)
+        events.tickets_changed(events.TAKEN, [instance])
+
+
+@receiver(pre_delete, sender=Reservation)
+def release_reservation_tickets(sender, instance, **kwargs):
+    # All of its tickets at once, rather than one by one as they cascade.
+    tickets = instance.tickets.only(
+        "reservation", "performance", "row", "seat"
+    )
+    release_tickets(
+        list(tickets),
+        timezone.localdate(instance.created_at),
+    )
+
+
+@receiver(post_delete, sender=Ticket)
+def count_ticket_released(sender, instance, origin, **kwargs):
+    # Tickets cascading from a reservation are released with it, and those
+    # cascading from a performance leave no counter behind.
+    if deleted_directly(origin, Ticket):
+        release_tickets([instance], sale_day(instance))
+
+
+@receiver(post_save, sender=Ticket)
+@receiver([post_save, post_delete], sender=SeatHold)
+@receiver([post_save, post_delete], sender=Performance)
+def bump_performance_watermark(sender, instance, **kwargs):
+    performance_id = (
+        instance.pk if sender is Performance else instance.performance_id
+    )
+    transaction.on_commit(
+        lambda: bump_watermarks(Performance, [performance_id])
+    )
+
+
+@receiver([post_save, post_delete], sender=SeatHold)
+def reset_hold_expiry(sender, instance, **kwargs):
+    performance_id = instance.performance_id
+    transaction.on_commit(lambda: forget_hold_expiry(performance_id))
+
+
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Actor)
+@receiver([post_save, post_delete], sender=Play)
+@receiver([post_save, post_delete], sender=TheatreHall)
+def bump_catalog_version(sender, **kwargs):
+    # Bumped before the commit, the new version could cache old rows.
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def bump_play_version(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(lambda: bump_version(Play))
+
+
+@receiver([post_save, post_delete], sender=Play)
+def reindex_play(sender, instance, **kwargs):
+    play_id = instance.pk
+    transaction.on_commit(lambda: search.play_changed([play_id]))
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def reindex_genre(sender, instance, **kwargs):
+    genre_id = instance.pk
+    transaction.on_commit(lambda: search.genre_changed(genre_id))
+
+
+@receiver([post_save, post_delete], sender=Actor)
+def reindex_actor(sender, instance, **kwargs):
+    actor_id = instance.pk
+    transaction.on_commit(lambda: search.actor_changed(actor_id))
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def reindex_play_relations(sender, instance, action, reverse, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    object_id = instance.pk
+    if not reverse:
+        transaction.on_commit(lambda: search.play_changed([object_id]))
+    elif sender is Play.genres.through:
+        transaction.on_commit(lambda: search.genre_changed(object_id))
+    else:
+        transaction.on_commit(lambda: search.actor_changed(object_id))
+
+
+@receiver(post_save, sender=Play)
+def refresh_play_card(sender, instance, **kwargs):
+    # Also overwrites whatever card a stale instance has just saved.
+    cards.refresh_cards([instance.pk])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Actor)
+def refresh_renamed_play_cards(sender, instance, created, **kwargs):
+    if not created:
+        cards.refresh_cards(cards.linked_play_ids(instance))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Actor)
+def remember_play_cards(sender, instance, **kwargs):
+    # The links are deleted without m2m_changed.
+    instance.card_play_ids = cards.linked_play_ids(instance)
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Actor)
+def refresh_unlinked_play_cards(sender, instance, **kwargs):
+    cards.refresh_cards(getattr(instance, "card_play_ids", ()))
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def refresh_linked_play_cards(
+        sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            cards.refresh_cards([instance.pk])
+    elif action == "pre_clear":
+        instance.card_play_ids = cards.linked_play_ids(instance)
+    elif action in ("post_add", "post_remove"):
+        cards.refresh_cards(pk_set)
+    elif action == "post_clear":
+        cards.refresh_cards(instance.card_play_ids)
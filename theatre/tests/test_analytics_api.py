@@ -0,0 +1,166 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.models import (
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    SalesSummary,
+)
+
+RESERVATION_URL = reverse("theatre:reservation-list")
+OCCUPANCY_URL = reverse("theatre:analytics-occupancy")
+SALES_URL = reverse("theatre:analytics-sales")
+
+
+class SalesAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="1qazcde3",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+
+        self.hamlet = Play.objects.create(title="Hamlet")
+        self.macbeth = Play.objects.create(title="Macbeth")
+        self.blue = TheatreHall.objects.create(
+            name="Blue", rows=2, seats_in_row=5
+        )
+        self.red = TheatreHall.objects.create(
+            name="Red", rows=4, seats_in_row=5
+        )
+        today = timezone.localdate()
+        next_wednesday = today + datetime.timedelta(days=9 - today.weekday())
+        show_time = timezone.make_aware(
+            datetime.datetime.combine(next_wednesday, datetime.time(12))
+        )
+        self.performances = [
+            Performance.objects.create(
+                play=play,
+                theatre_hall=hall,
+                show_time=show_time + datetime.timedelta(hours=hours)
+            )
+            for play, hall, hours in (
+                (self.hamlet, self.blue, 0),
+                (self.hamlet, self.red, 0),
+                (self.macbeth, self.blue, 3),
+            )
+        ]
+
+    def book(self, performance, *seats):
+        res = self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {"row": 1, "seat": seat, "performance": performance.id}
+                    for seat in seats
+                ]
+            },
+            format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def test_booking_updates_summary(self):
+        self.book(self.performances[0], 1, 2)
+        self.book(self.performances[0], 3)
+
+        summary = SalesSummary.objects.get()
+        self.assertEqual(summary.performance, self.performances[0])
+        self.assertEqual(summary.day, timezone.localdate())
+        self.assertEqual(summary.tickets_sold, 3)
+
+    def test_deleting_reservation_updates_summary(self):
+        reservation_id = self.book(self.performances[0], 1, 2)
+
+        Reservation.objects.get(pk=reservation_id).delete()
+
+        self.assertEqual(SalesSummary.objects.get().tickets_sold, 0)
+
+    def test_occupancy_by_play_and_hall(self):
+        self.book(self.performances[0], 1, 2, 3, 4, 5)
+        self.book(self.performances[1], 1)
+        self.book(self.performances[2], 1, 2)
+
+        res = self.client.get(OCCUPANCY_URL, {"group_by": "play"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (row["key"], row["label"], row["capacity"], row["sold"])
+                for row in res.data
+            ],
+            [
+                (self.hamlet.id, "Hamlet", 30, 6),
+                (self.macbeth.id, "Macbeth", 10, 2),
+            ]
+        )
+
+        res = self.client.get(
+            OCCUPANCY_URL, {"group_by": "hall", "play": "ham"}
+        )
+
+        self.assertEqual(
+            [(row["label"], row["occupancy"]) for row in res.data],
+            [("Blue", 0.5), ("Red", 0.05)]
+        )
+
+    def test_occupancy_by_week_reads_only_summary(self):
+        self.book(self.performances[2], 1, 2)
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(OCCUPANCY_URL, {"group_by": "week"})
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["performances"], 3)
+        self.assertEqual(res.data[0]["sold"], 2)
+        self.assertFalse(any(
+            "theatre_ticket" in query["sql"]
+            for query in context.captured_queries
+        ))
+
+    def test_sales_per_day(self):
+        self.book(self.performances[0], 1)
+        self.book(self.performances[2], 1, 2)
+
+        res = self.client.get(SALES_URL)
+
+        self.assertEqual(
+            res.data,
+            [{"period": str(timezone.localdate()), "tickets_sold": 3}]
+        )
+
+    def test_invalid_group_by(self):
+        res = self.client.get(OCCUPANCY_URL, {"group_by": "genre"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_analytics_are_admin_only(self):
+        self.admin.is_staff = False
+        self.admin.save()
+
+        res = self.client.get(SALES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_rebuild_sales_summary(self):
+        self.book(self.performances[0], 1, 2)
+        SalesSummary.objects.update(tickets_sold=99)
+
+        call_command("rebuild_sales_summary", stdout=StringIO())
+
+        self.assertEqual(SalesSummary.objects.get().tickets_sold, 2)
@@ -0,0 +1,162 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.models import (
+    Genre,
+    Actor,
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    Ticket,
+)
+
+
+class AsyncReadApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.authorization = f"Bearer {AccessToken.for_user(self.user)}"
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+
+        self.drama = Genre.objects.create(name="Drama")
+        actor = Actor.objects.create(first_name="Ian", last_name="McKellen")
+        hall = TheatreHall.objects.create(name="Blue", rows=3, seats_in_row=4)
+        self.plays = []
+        for title in ("Hamlet", "Macbeth", "King Lear"):
+            play = Play.objects.create(title=title, description="Tragedy")
+            play.genres.add(self.drama)
+            play.actors.add(actor)
+            self.plays.append(play)
+        self.performances = [
+            Performance.objects.create(
+                play=play,
+                theatre_hall=hall,
+                show_time=f"2030-06-0{day} 19:00:00+00:00",
+            )
+            for day, play in enumerate(self.plays, start=1)
+        ]
+        reservation = Reservation.objects.create(user=self.user)
+        for seat in (1, 3):
+            Ticket.objects.create(
+                row=2,
+                seat=seat,
+                performance=self.performances[0],
+                reservation=reservation,
+            )
+
+    async def aget(self, url, data=None, **headers):
+        return await self.async_client.get(
+            url, data, headers={"authorization": self.authorization, **headers}
+        )
+
+    async def get_both(self, name, args=(), data=None):
+        sync_res = await sync_to_async(self.client.get)(
+            reverse(f"theatre:{name}", args=args), data
+        )
+        async_res = await self.aget(
+            reverse(f"theatre:async-{name}", args=args), data
+        )
+        return sync_res, async_res
+
+    def assertSameBody(self, sync_res, async_res):
+        self.assertEqual(async_res.status_code, sync_res.status_code)
+        self.assertEqual(json.loads(async_res.content), sync_res.json())
+
+    async def test_detail_endpoints_match_sync(self):
+        performance = self.performances[0]
+        for name, args, data in (
+            ("performance-detail", [performance.id], None),
+            ("performance-seats", [performance.id], {"expanded": "true"}),
+            ("play-detail", [self.plays[1].id], None),
+        ):
+            with self.subTest(name=name):
+                self.assertSameBody(*await self.get_both(name, args, data))
+
+    async def test_lists_match_sync(self):
+        for name, data in (
+            ("performance-list", {"play": "mac"}),
+            ("play-list", {"genres": self.drama.id}),
+            ("play-list", {"title": "king"}),
+        ):
+            with self.subTest(name=name, data=data):
+                sync_res, async_res = await self.get_both(name, data=data)
+                self.assertEqual(async_res.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    json.loads(async_res.content)["results"],
+                    sync_res.json()["results"]
+                )
+
+    async def test_cursor_pagination(self):
+        url = reverse("theatre:async-performance-list") + "?page_size=2"
+        ids = []
+
+        while url:
+            res = await self.aget(url)
+            page = json.loads(res.content)
+            ids.extend(item["id"] for item in page["results"])
+            url = page["next"]
+            if url:
+                self.assertIn("/async/", url)
+
+        self.assertEqual(
+            ids, [performance.id for performance in self.performances[::-1]]
+        )
+
+    async def test_errors_match_sync(self):
+        for name, args, data in (
+            ("performance-detail", [0], None),
+            ("play-detail", ["nope"], None),
+            ("performance-list", None, {"date_range": "-1"}),
+            ("play-list", None, {"genres": 999}),
+        ):
+            with self.subTest(name=name, data=data):
+                self.assertSameBody(*await self.get_both(name, args, data))
+
+    async def test_requires_authentication(self):
+        res = await AsyncClient().get(
+            reverse("theatre:async-performance-list")
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("WWW-Authenticate", res.headers)
+
+    async def test_only_reads_are_served(self):
+        res = await self.async_client.post(
+            reverse("theatre:async-play-list"),
+            headers={"authorization": self.authorization}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(res.headers["Allow"], "GET, HEAD")
+
+    async def test_play_list_is_cached_with_etag(self):
+        url = reverse("theatre:async-play-list")
+        res = await self.aget(url)
+
+        res = await self.aget(url, if_none_match=res.headers["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_performance_detail_is_not_modified(self):
+        url = reverse(
+            "theatre:async-performance-detail", args=[self.performances[0].id]
+        )
+        res = await self.aget(url)
+
+        res = await self.aget(url, if_none_match=res.headers["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn("Last-Modified", res.headers)
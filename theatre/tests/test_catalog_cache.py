@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.models import Play, Genre, Actor
+
+GENRE_URL = reverse("theatre:genre-list")
+PLAY_URL = reverse("theatre:play-list")
+
+
+class CatalogResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_is_served_from_cache(self):
+        Genre.objects.create(name="Drama")
+        first = self.client.get(GENRE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(GENRE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_write_invalidates_cached_list(self):
+        self.client.get(GENRE_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(GENRE_URL, {"name": "Comedy"})
+        res = self.client.get(GENRE_URL)
+
+        self.assertEqual([genre["name"] for genre in res.data], ["Comedy"])
+
+    def test_version_moves_once_the_write_commits(self):
+        self.client.get(GENRE_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Genre.objects.create(name="Comedy")
+            # Read before the commit: still the old version.
+            self.assertEqual(self.client.get(GENRE_URL).data, [])
+        res = self.client.get(GENRE_URL)
+
+        self.assertEqual([genre["name"] for genre in res.data], ["Comedy"])
+
+    def test_related_changes_invalidate_play_list(self):
+        play = Play.objects.create(title="Hamlet")
+        self.client.get(PLAY_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            actor = Actor.objects.create(first_name="A", last_name="B")
+            play.actors.add(actor)
+        res = self.client.get(PLAY_URL)
+        self.assertIn("A B", str(res.data))
+
+        actor.first_name = "C"
+        with self.captureOnCommitCallbacks(execute=True):
+            actor.save()
+        res = self.client.get(PLAY_URL)
+        self.assertIn("C B", str(res.data))
+
+    def test_cached_per_scheme_and_host(self):
+        Play.objects.create(title="Hamlet", poster="uploads/plays/hamlet.jpg")
+
+        self.client.get(PLAY_URL)
+        res = self.client.get(PLAY_URL, secure=True)
+
+        self.assertTrue(
+            res.data["results"][0]["poster"].startswith("https://testserver/")
+        )
+
+    def test_if_none_match_returns_not_modified(self):
+        Genre.objects.create(name="Drama")
+        etag = self.client.get(GENRE_URL)["ETag"]
+
+        res = self.client.get(GENRE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res.content, b"")
+
+    def test_stale_etag_gets_full_response(self):
+        genre = Genre.objects.create(name="Drama")
+        etag = self.client.get(GENRE_URL)["ETag"]
+        genre.name = "Tragedy"
+        with self.captureOnCommitCallbacks(execute=True):
+            genre.save()
+
+        res = self.client.get(GENRE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
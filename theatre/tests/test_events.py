@@ -0,0 +1,211 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre import events
+from theatre.models import Play, TheatreHall, Performance, Reservation
+
+
+def parse_event(message):
+    fields = dict(
+        line.split(": ", 1) for line in message.decode().strip().split("\n")
+    )
+    return fields["event"], json.loads(fields["data"])
+
+
+class AvailabilityStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.authorization = f"Bearer {AccessToken.for_user(self.user)}"
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet"),
+            theatre_hall=TheatreHall.objects.create(
+                name="Blue", rows=3, seats_in_row=4
+            ),
+            show_time="2030-06-02 14:00:00+00:00",
+        )
+
+    def events_url(self, performance_id):
+        return reverse(
+            "theatre:async-performance-events", args=[performance_id]
+        )
+
+    async def open_stream(self):
+        res = await self.async_client.get(
+            self.events_url(self.performance.id),
+            headers={"authorization": self.authorization},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.headers["Content-Type"], events.CONTENT_TYPE)
+        return res.streaming_content
+
+    def book(self, *seats):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("theatre:reservation-list"),
+                {
+                    "tickets": [
+                        {
+                            "row": 2,
+                            "seat": seat,
+                            "performance": self.performance.id,
+                        }
+                        for seat in seats
+                    ]
+                },
+                format="json",
+            )
+
+    def cancel(self, reservation_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.get(id=reservation_id).delete()
+
+    async def test_snapshot_then_deltas(self):
+        stream = await self.open_stream()
+
+        kind, snapshot = parse_event(await anext(stream))
+        self.assertEqual(kind, "snapshot")
+        self.assertEqual(snapshot["available"], 12)
+
+        res = await sync_to_async(self.book)(3, 1)
+        kind, delta = parse_event(await anext(stream))
+        self.assertEqual(kind, events.TAKEN)
+        self.assertEqual(
+            delta["seats"], [{"row": 2, "seat": 1}, {"row": 2, "seat": 3}]
+        )
+        self.assertEqual(delta["available"], 10)
+
+        await sync_to_async(self.cancel)(res.data["id"])
+        kind, delta = parse_event(await anext(stream))
+        self.assertEqual(kind, events.RELEASED)
+        self.assertCountEqual(
+            delta["seats"], [{"row": 2, "seat": 1}, {"row": 2, "seat": 3}]
+        )
+        self.assertEqual(delta["available"], 12)
+
+        events.get_broker().end_streams()
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertEqual(events.get_broker().subscriber_count(), 0)
+
+    async def test_missing_performance(self):
+        res = await self.async_client.get(
+            self.events_url(self.performance.id + 1),
+            headers={"authorization": self.authorization},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(events.get_broker().subscriber_count(), 0)
+
+    def test_nothing_is_published_without_subscribers(self):
+        with self.assertNumQueries(0):
+            events.publish_availability(
+                events.TAKEN, {self.performance.id: [(1, 1)]}
+            )
+
+
+class BrokerTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = events.Broker(
+            "theatre.events.LocalBackend", queue_size=2
+        )
+
+    async def test_delivers_from_other_threads(self):
+        subscription = self.broker.subscribe(1)
+        other = self.broker.subscribe(2)
+
+        await asyncio.to_thread(
+            self.broker.publish, 1, events.TAKEN, {"available": 3}
+        )
+
+        kind, data = parse_event(await subscription.get(1))
+        self.assertEqual((kind, data), (events.TAKEN, {"available": 3}))
+        self.assertTrue(other.queue.empty())
+
+    async def test_slow_subscriber_is_ended(self):
+        subscription = self.broker.subscribe(1)
+
+        for available in range(3):
+            self.broker.publish(1, events.TAKEN, {"available": available})
+        await asyncio.sleep(0)
+
+        self.assertIsNone(await subscription.get(1))
+
+    async def test_closed_subscription_is_forgotten(self):
+        subscription = self.broker.subscribe(1)
+        subscription.close()
+
+        self.assertFalse(self.broker.backend.interested(1))
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+
+class StreamDisconnectMiddlewareTests(SimpleTestCase):
+    async def call(self, app, messages):
+        sent = []
+        queue = asyncio.Queue()
+        for message in messages:
+            queue.put_nowait(message)
+
+        async def send(message):
+            sent.append(message)
+
+        await asyncio.wait_for(
+            events.StreamDisconnectMiddleware(app)(
+                {"type": "http"}, queue.get, send
+            ),
+            1,
+        )
+        return sent
+
+    async def test_stream_is_cancelled_on_disconnect(self):
+        cancelled = []
+
+        async def app(scope, receive, send):
+            await receive()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"Content-Type", b"text/event-stream")],
+            })
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        await self.call(
+            app, [{"type": "http.request"}, {"type": "http.disconnect"}]
+        )
+
+        self.assertEqual(cancelled, [True])
+
+    async def test_other_responses_are_left_alone(self):
+        async def app(scope, receive, send):
+            await receive()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"Content-Type", b"application/json")],
+            })
+            await asyncio.sleep(0.01)
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        sent = await self.call(
+            app, [{"type": "http.request"}, {"type": "http.disconnect"}]
+        )
+
+        self.assertEqual(sent[-1]["body"], b"{}")
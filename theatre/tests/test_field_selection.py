@@ -0,0 +1,180 @@
+import datetime
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.models import Genre, Actor, Play, TheatreHall, Performance
+
+PLAY_URL = reverse("theatre:play-list")
+PERFORMANCE_URL = reverse("theatre:performance-list")
+
+
+class FieldSelectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        ))
+        self.drama = Genre.objects.create(name="Drama")
+        self.actor = Actor.objects.create(first_name="Anna", last_name="Moroz")
+        self.play = Play.objects.create(title="Hamlet", description="Denmark")
+        self.play.genres.add(self.drama)
+        self.play.actors.add(self.actor)
+        self.hall = TheatreHall.objects.create(
+            name="Blue", rows=10, seats_in_row=12
+        )
+        self.performance = Performance.objects.create(
+            play=self.play,
+            theatre_hall=self.hall,
+            show_time="2030-06-02 14:00:00+00:00",
+            tickets_sold=20,
+        )
+
+    def play_url(self):
+        return reverse("theatre:play-detail", args=[self.play.id])
+
+    def performance_url(self):
+        return reverse("theatre:performance-detail", args=[self.performance.id])
+
+    def later_performances(self, count):
+        start = datetime.datetime(2030, 6, 3, 14, tzinfo=datetime.timezone.utc)
+        return [
+            Performance(
+                play=self.play,
+                theatre_hall=self.hall,
+                show_time=start + datetime.timedelta(days=number),
+            )
+            for number in range(count)
+        ]
+
+    def test_play_list_fields(self):
+        res = self.client.get(PLAY_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"], [{"id": self.play.id, "title": "Hamlet"}]
+        )
+
+    def test_play_list_collapses_unless_expanded(self):
+        res = self.client.get(
+            PLAY_URL, {"fields": "genres,actors", "expand": "actors"}
+        )
+
+        self.assertEqual(
+            res.data["results"],
+            [{"genres": [self.drama.id], "actors": ["Anna Moroz"]}],
+        )
+
+    def test_play_detail_fields_and_expand(self):
+        res = self.client.get(
+            self.play_url(), {"fields": "title,genres,actors", "expand": "genres"}
+        )
+
+        self.assertEqual(
+            res.data,
+            {
+                "title": "Hamlet",
+                "genres": [{"id": self.drama.id, "name": "Drama"}],
+                "actors": [self.actor.id],
+            },
+        )
+
+    def test_play_detail_skips_unselected_relations(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(self.play_url(), {"fields": "id,title"})
+
+        self.assertEqual(res.data, {"id": self.play.id, "title": "Hamlet"})
+
+    def test_performance_detail_collapsed(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(self.performance_url(), {"expand": ""})
+
+        self.assertEqual(
+            res.data,
+            {
+                "id": self.performance.id,
+                "play": self.play.id,
+                "theatre_hall": self.hall.id,
+                "available_tickets": 100,
+                "show_time": "2030-06-02T14:00:00Z",
+            },
+        )
+
+    def test_performance_detail_expand_play(self):
+        res = self.client.get(
+            self.performance_url(), {"fields": "play", "expand": "play"}
+        )
+
+        self.assertEqual(res.data["play"]["genres"], ["Drama"])
+
+    def test_performance_list_fields(self):
+        res = self.client.get(
+            PERFORMANCE_URL, {"fields": "id,available_tickets"}
+        )
+
+        self.assertEqual(
+            res.data["results"],
+            [{"id": self.performance.id, "available_tickets": 100}],
+        )
+
+    def test_without_parameters_output_is_unchanged(self):
+        full = self.client.get(self.performance_url())
+
+        self.assertEqual(full.data["play"]["title"], "Hamlet")
+        self.assertEqual(full.data["theatre_hall"]["name"], "Blue")
+
+    def test_unknown_names_are_rejected(self):
+        res = self.client.get(
+            self.performance_url(), {"fields": "id,price", "expand": "genres"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {"fields", "expand"})
+
+    def test_paginated_lists_read_ordering_keys_they_do_not_render(self):
+        Play.objects.bulk_create(
+            [Play(title=f"Play {number}") for number in range(25)]
+        )
+        Performance.objects.bulk_create(self.later_performances(25))
+
+        for url, fields, count in (
+            (PLAY_URL, "title", 26),
+            (PERFORMANCE_URL, "play_title", 26),
+        ):
+            with self.subTest(url=url):
+                items = []
+                page = {"next": f"{url}?fields={fields}"}
+                while page["next"]:
+                    res = self.client.get(page["next"])
+                    self.assertEqual(res.status_code, status.HTTP_200_OK)
+                    page = res.json()
+                    items.extend(page["results"])
+
+                self.assertEqual(len(items), count)
+                self.assertEqual({tuple(item) for item in items}, {(fields,)})
+
+    async def test_async_paginated_list_with_fields(self):
+        user = await get_user_model().objects.aget(email="test@test.com")
+        await Performance.objects.abulk_create(
+            self.later_performances(25)
+        )
+
+        res = await self.async_client.get(
+            reverse("theatre:async-performance-list"),
+            {"fields": "play_title"},
+            headers={"authorization": f"Bearer {AccessToken.for_user(user)}"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        page = json.loads(res.content)
+        self.assertIsNotNone(page["next"])
+        self.assertEqual(page["results"][0], {"play_title": "Hamlet"})
@@ -0,0 +1,134 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.models import (
+    IdempotencyKey,
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    Ticket,
+)
+
+RESERVATION_URL = reverse("theatre:reservation-list")
+ALLOCATE_URL = reverse("theatre:reservation-allocate")
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet"),
+            theatre_hall=TheatreHall.objects.create(
+                name="Blue", rows=5, seats_in_row=5
+            ),
+            show_time="2030-06-02 14:00:00+00:00",
+        )
+
+    def payload(self, *seats):
+        return {
+            "tickets": [
+                {"row": 1, "seat": seat, "performance": self.performance.id}
+                for seat in seats
+            ]
+        }
+
+    def post(self, payload, key="key-1", url=RESERVATION_URL):
+        return self.client.post(
+            url, payload, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.post(self.payload(1, 2))
+        retry = self.post(self.payload(1, 2))
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_allocate_is_idempotent(self):
+        payload = {"performance": self.performance.id, "count": 2}
+
+        first = self.post(payload, url=ALLOCATE_URL)
+        retry = self.post(payload, url=ALLOCATE_URL)
+
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_keys_are_per_user(self):
+        self.post(self.payload(1))
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="other@test.com", password="1qazcde3"
+            )
+        )
+
+        res = self.post(self.payload(2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", res)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_key_reused_for_different_body(self):
+        self.post(self.payload(1))
+
+        res = self.post(self.payload(2))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_failed_request_is_not_stored(self):
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            performance=self.performance,
+            reservation=Reservation.objects.create(user=self.user),
+        )
+        self.assertEqual(
+            self.post(self.payload(1)).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        Ticket.objects.all().delete()
+        res = self.post(self.payload(1))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_key_is_stored_with_the_reservation(self):
+        res = self.post(self.payload(1))
+
+        record = IdempotencyKey.objects.get(user=self.user, key="key-1")
+        self.assertEqual(record.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(record.response["id"], res.data["id"])
+
+    def test_expired_key_books_again(self):
+        self.post(self.payload(1))
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - datetime.timedelta(days=2)
+        )
+
+        res = self.post(self.payload(2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", res)
+        self.assertEqual(Reservation.objects.count(), 2)
@@ -0,0 +1,108 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.instrumentation import registry
+
+PERFORMANCE_URL = reverse("theatre:performance-list")
+METRICS_URL = reverse("metrics")
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        res = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timings = [
+            entry.split(";")[0] for entry in res["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(
+            timings, ["db", "view", "serialize", "render", "total"]
+        )
+        self.assertIn('desc="1 queries"', res["Server-Timing"])
+
+    async def test_async_views_count_their_queries(self):
+        res = await self.async_client.get(
+            reverse("theatre:async-performance-list"),
+            headers={
+                "authorization": f"Bearer {AccessToken.for_user(self.user)}"
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="2 queries"', res["Server-Timing"])
+
+    def test_metrics_are_tagged_with_viewset_action(self):
+        self.client.get(PERFORMANCE_URL)
+        self.client.get(PERFORMANCE_URL)
+        self.user.is_staff = True
+        self.user.save()
+        # /metrics is a plain Django view, authenticated by the session.
+        self.client.force_login(self.user)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = res.content.decode()
+        self.assertIn(
+            "# TYPE theatre_request_duration_seconds histogram", body
+        )
+        self.assertIn(
+            'theatre_request_queries_bucket{handler="PerformanceViewSet.list",'
+            'method="GET",le="1"} 2',
+            body
+        )
+        self.assertIn(
+            'theatre_request_sql_seconds_count{handler='
+            '"PerformanceViewSet.list",method="GET"} 2',
+            body
+        )
+
+    def test_serializer_time_is_not_view_time(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        with mock.patch(
+            "theatre.serializers.GenreSerializer.to_representation",
+            side_effect=lambda genre: time.sleep(0.05) or {},
+        ):
+            res = self.client.post(
+                reverse("theatre:genre-list"), {"name": "Drama"}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        timings = dict(
+            entry.split(";dur=")
+            for entry in res["Server-Timing"].split(", ")
+            if not entry.startswith("db")
+        )
+        self.assertGreaterEqual(float(timings["serialize"]), 50)
+        self.assertLess(float(timings["view"]), 50)
+
+    def test_metrics_forbidden_to_other_users(self):
+        # Also from localhost, where a reverse proxy would connect from.
+        res = self.client.get(METRICS_URL, REMOTE_ADDR="127.0.0.1")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_metrics_allowed_to_listed_scrapers(self):
+        res = self.client.get(METRICS_URL, REMOTE_ADDR="10.0.0.1")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
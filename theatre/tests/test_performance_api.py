@@ -0,0 +1,470 @@
+import base64
+import datetime
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.booking import hold_seats
+from theatre.models import (
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    SeatHold,
+    HeldSeat,
+    Ticket,
+)
+
+PERFORMANCE_URL = reverse("theatre:performance-list")
+SCHEDULE_URL = reverse("theatre:performance-schedule")
+
+
+def sample_performance(**params):
+    play = Play.objects.create(title="Hamlet", description="Tragedy")
+    theatre_hall = TheatreHall.objects.create(
+        name="Blue", rows=3, seats_in_row=4
+    )
+
+    defaults = {
+        "show_time": "2030-06-02 14:00:00+00:00",
+        "play": play,
+        "theatre_hall": theatre_hall,
+    }
+    defaults.update(params)
+
+    return Performance.objects.create(**defaults)
+
+
+def detail_url(performance_id):
+    return reverse("theatre:performance-detail", args=[performance_id])
+
+
+def seats_url(performance_id):
+    return reverse("theatre:performance-seats", args=[performance_id])
+
+
+class PerformanceSeatsApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.performance = sample_performance()
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in ((1, 1), (2, 4), (3, 2)):
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                performance=self.performance,
+                reservation=reservation,
+            )
+
+    def test_seats_bitmap(self):
+        res = self.client.get(seats_url(self.performance.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["capacity"], 12)
+        self.assertEqual(res.data["taken"], 3)
+        self.assertEqual(res.data["available"], 9)
+        self.assertNotIn("taken_seats", res.data)
+        # bits 0, 7 and 9 of a 12-bit row-major map
+        self.assertEqual(
+            base64.b64decode(res.data["bitmap"]),
+            bytes([0b10000001, 0b01000000])
+        )
+
+    def test_seats_expanded(self):
+        res = self.client.get(
+            seats_url(self.performance.id), {"expanded": "true"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["taken_seats"],
+            [
+                {"row": 1, "seat": 1},
+                {"row": 2, "seat": 4},
+                {"row": 3, "seat": 2},
+            ]
+        )
+
+    def test_seats_held_by_others_are_unavailable(self):
+        other = get_user_model().objects.create_user(
+            email="other@test.com", password="1qazcde3"
+        )
+        now = timezone.now()
+        hold_seats(
+            other, self.performance, [(1, 2)], now + datetime.timedelta(1)
+        )
+        expired = SeatHold.objects.create(
+            user=other,
+            performance=self.performance,
+            expires_at=now - datetime.timedelta(1),
+        )
+        HeldSeat.objects.create(
+            hold=expired, performance=self.performance, row=1, seat=3
+        )
+
+        res = self.client.get(
+            seats_url(self.performance.id), {"expanded": "true"}
+        )
+
+        self.assertEqual(res.data["taken"], 3)
+        self.assertEqual(res.data["held"], 1)
+        self.assertEqual(res.data["available"], 8)
+        self.assertEqual(res.data["held_seats"], [{"row": 1, "seat": 2}])
+        self.assertEqual(
+            base64.b64decode(res.data["bitmap"]),
+            bytes([0b11000001, 0b01000000])
+        )
+
+    def test_seats_single_scan(self):
+        with self.assertNumQueries(2):
+            self.client.get(seats_url(self.performance.id))
+
+    def test_seats_auth_required(self):
+        res = APIClient().get(seats_url(self.performance.id))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PerformanceAvailabilityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def reserve(self, *seats):
+        return self.client.post(
+            reverse("theatre:reservation-list"),
+            {
+                "tickets": [
+                    {
+                        "row": row,
+                        "seat": seat,
+                        "performance": self.performance.id
+                    }
+                    for row, seat in seats
+                ]
+            },
+            format="json",
+        )
+
+    def test_reservation_updates_sold_counter(self):
+        self.reserve((1, 1), (1, 2), (1, 3))
+
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 3)
+
+        res = self.client.get(PERFORMANCE_URL)
+        self.assertEqual(res.data["results"][0]["available_tickets"], 9)
+
+        res = self.client.get(detail_url(self.performance.id))
+        self.assertEqual(res.data["available_tickets"], 9)
+
+    def test_deleting_reservation_releases_seats(self):
+        res = self.reserve((1, 1), (1, 2))
+        Reservation.objects.get(id=res.data["id"]).delete()
+
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 0)
+
+    def test_rebuild_tickets_sold(self):
+        self.reserve((2, 1), (2, 2))
+        Performance.objects.update(tickets_sold=7)
+
+        call_command("rebuild_tickets_sold", stdout=StringIO())
+
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 2)
+
+
+class PerformanceConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def reserve(self, *seats):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("theatre:reservation-list"),
+                {
+                    "tickets": [
+                        {
+                            "row": 1,
+                            "seat": seat,
+                            "performance": self.performance.id
+                        }
+                        for seat in seats
+                    ]
+                },
+                format="json",
+            )
+
+    def get(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_performance_is_not_modified_without_queries(self):
+        for url in (
+            detail_url(self.performance.id), seats_url(self.performance.id)
+        ):
+            with self.subTest(url=url):
+                res = self.client.get(url)
+                self.assertIn("Last-Modified", res)
+
+                with self.assertNumQueries(0):
+                    res = self.get(url, res["ETag"])
+
+                self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertIn("Last-Modified", res)
+
+    def test_detail_and_seats_have_different_etags(self):
+        detail = self.client.get(detail_url(self.performance.id))
+        seats = self.client.get(seats_url(self.performance.id))
+
+        self.assertNotEqual(detail["ETag"], seats["ETag"])
+        self.assertEqual(
+            self.get(seats_url(self.performance.id), detail["ETag"])
+            .status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_booking_changes_etag(self):
+        etag = self.client.get(detail_url(self.performance.id))["ETag"]
+
+        self.reserve(1, 2)
+        res = self.get(detail_url(self.performance.id), etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["available_tickets"], 10)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_released_ticket_changes_etag(self):
+        reservation_id = self.reserve(1).data["id"]
+        etag = self.client.get(seats_url(self.performance.id))["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.get(id=reservation_id).delete()
+        res = self.get(seats_url(self.performance.id), etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["taken"], 0)
+
+    def test_hold_changes_etag(self):
+        etag = self.client.get(seats_url(self.performance.id))["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hold_seats(
+                self.user,
+                self.performance,
+                [(1, 1)],
+                timezone.now() + datetime.timedelta(minutes=10),
+            )
+        res = self.get(seats_url(self.performance.id), etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["held"], 1)
+
+    def test_expired_hold_changes_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hold_seats(
+                self.user,
+                self.performance,
+                [(1, 1)],
+                timezone.now() + datetime.timedelta(minutes=10),
+            )
+        etag = self.client.get(seats_url(self.performance.id))["ETag"]
+
+        later = timezone.now() + datetime.timedelta(minutes=11)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            res = self.get(seats_url(self.performance.id), etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["held"], 0)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_play_change_changes_etag(self):
+        etag = self.client.get(detail_url(self.performance.id))["ETag"]
+
+        self.performance.play.title = "Macbeth"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.performance.play.save()
+        res = self.get(detail_url(self.performance.id), etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["play"]["title"], "Macbeth")
+
+    def test_missing_performance_is_not_found(self):
+        res = self.get(detail_url(self.performance.id + 1), "*")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", res)
+
+
+class PerformanceWindowTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.today = timezone.localdate()
+        self.play = Play.objects.create(title="Hamlet")
+        self.other_play = Play.objects.create(title="Macbeth")
+        self.hall = TheatreHall.objects.create(
+            name="Blue", rows=10, seats_in_row=10
+        )
+
+    def performance_on(self, days, hour=19, play=None):
+        show_time = timezone.make_aware(
+            datetime.datetime.combine(
+                self.today + datetime.timedelta(days=days),
+                datetime.time(hour)
+            )
+        )
+        return Performance.objects.create(
+            play=play or self.play,
+            theatre_hall=self.hall,
+            show_time=show_time
+        )
+
+
+class PerformanceDateWindowTests(PerformanceWindowTestCase):
+    def test_from_to_are_inclusive_days(self):
+        self.performance_on(1)
+        inside = [self.performance_on(2, 0), self.performance_on(3, 23)]
+        self.performance_on(4, 0)
+
+        res = self.client.get(PERFORMANCE_URL, {
+            "from": self.today + datetime.timedelta(days=2),
+            "to": self.today + datetime.timedelta(days=3),
+        })
+
+        self.assertEqual(
+            sorted(p["id"] for p in res.data["results"]),
+            sorted(p.id for p in inside)
+        )
+
+    def test_date_range_counts_days_from_today(self):
+        self.performance_on(-1)
+        inside = [self.performance_on(0, 23), self.performance_on(2, 23)]
+        self.performance_on(3)
+
+        res = self.client.get(PERFORMANCE_URL, {"date_range": 2})
+
+        self.assertEqual(
+            sorted(p["id"] for p in res.data["results"]),
+            sorted(p.id for p in inside)
+        )
+
+    def test_schedule_groups_upcoming_performances_by_day(self):
+        self.performance_on(-1)
+        first = self.performance_on(1, 18)
+        second = self.performance_on(1, 21, play=self.other_play)
+        third = self.performance_on(2, 19)
+        self.performance_on(30)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(SCHEDULE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [day["date"] for day in res.data],
+            [
+                str(self.today + datetime.timedelta(days=1)),
+                str(self.today + datetime.timedelta(days=2)),
+            ]
+        )
+        self.assertEqual(
+            [p["id"] for p in res.data[0]["performances"]],
+            [first.id, second.id]
+        )
+        self.assertEqual(
+            res.data[0]["performances"][1]["play_title"], "Macbeth"
+        )
+        self.assertEqual(
+            res.data[1]["performances"][0]["available_tickets"], 100
+        )
+        self.assertEqual(res.data[1]["performances"][0]["id"], third.id)
+
+    def test_schedule_with_explicit_window_and_play(self):
+        self.performance_on(1)
+        wanted = self.performance_on(20, play=self.other_play)
+
+        res = self.client.get(SCHEDULE_URL, {
+            "to": self.today + datetime.timedelta(days=25),
+            "play": "mac",
+        })
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["performances"][0]["id"], wanted.id)
+
+
+class PerformanceStreamingTests(PerformanceWindowTestCase):
+    def setUp(self):
+        super(PerformanceStreamingTests, self).setUp()
+        self.user.is_staff = True
+        self.user.save()
+
+    def stream(self, **params):
+        res = self.client.get(PERFORMANCE_URL, {"stream": "true", **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return json.loads(b"".join(res.streaming_content))
+
+    def test_stream_matches_paginated_items(self):
+        for days in range(1, 8):
+            self.performance_on(days)
+
+        res = self.client.get(PERFORMANCE_URL, {"page_size": 100})
+
+        self.assertEqual(
+            self.stream(), json.loads(json.dumps(res.data["results"]))
+        )
+
+    def test_stream_applies_filters_and_ordering(self):
+        self.performance_on(1, play=self.other_play)
+        wanted = [self.performance_on(days) for days in (2, 3)]
+
+        items = self.stream(play="ham")
+
+        self.assertEqual(
+            [item["id"] for item in items],
+            [performance.id for performance in reversed(wanted)]
+        )
+
+    def test_stream_empty_list(self):
+        self.assertEqual(self.stream(), [])
+
+    def test_stream_is_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(PERFORMANCE_URL, {"stream": "true"})
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from theatre.models import Genre, Actor, Play
+from theatre.serializers import PlayListSerializer
+
+PLAY_URL = reverse("theatre:play-list")
+
+
+class PlayCardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        ))
+        self.drama = Genre.objects.create(name="Drama")
+        self.comedy = Genre.objects.create(name="Comedy")
+        self.actor = Actor.objects.create(first_name="Anna", last_name="Moroz")
+        self.play = Play.objects.create(title="Hamlet")
+        self.play.genres.add(self.drama, self.comedy)
+        self.play.actors.add(self.actor)
+
+    def card(self):
+        return Play.objects.values_list("card", flat=True).get(
+            pk=self.play.pk
+        )
+
+    def test_card_follows_links(self):
+        self.assertEqual(
+            self.card(),
+            {
+                "genres": [
+                    [self.drama.id, "Drama"], [self.comedy.id, "Comedy"]
+                ],
+                "actors": [[self.actor.id, "Anna Moroz"]],
+            },
+        )
+
+        self.play.genres.remove(self.comedy)
+        self.actor.plays.clear()
+
+        self.assertEqual(
+            self.card(),
+            {"genres": [[self.drama.id, "Drama"]], "actors": []},
+        )
+
+    def test_renames_and_deletes_refresh_cards(self):
+        self.actor.last_name = "Boyko"
+        self.actor.save()
+        self.drama.delete()
+
+        self.assertEqual(
+            self.card(),
+            {
+                "genres": [[self.comedy.id, "Comedy"]],
+                "actors": [[self.actor.id, "Anna Boyko"]],
+            },
+        )
+
+    def test_list_reads_cards_in_one_query(self):
+        Play.objects.create(title="Untitled")
+
+        with self.assertNumQueries(1):
+            res = self.client.get(PLAY_URL)
+
+        self.assertEqual(
+            res.data["results"],
+            PlayListSerializer(
+                Play.objects.order_by("id"), many=True
+            ).data,
+        )
+
+    def test_missing_cards_fall_back_and_rebuild(self):
+        Play.objects.update(card=None)
+
+        with self.assertNumQueries(3):
+            fallback = self.client.get(PLAY_URL)
+        call_command("rebuild_play_cards", stdout=StringIO())
+        rebuilt = self.client.get(PLAY_URL)
+
+        self.assertEqual(fallback.data, rebuilt.data)
+        self.assertEqual(rebuilt.data["results"][0]["genres"], [
+            "Drama", "Comedy"
+        ])
+        self.assertIsNotNone(self.card())
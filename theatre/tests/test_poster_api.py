@@ -0,0 +1,114 @@
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.models import Play
+from theatre.posters import POSTER_SIZES
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_file(width=2000, height=1000, name="poster.png"):
+    content = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(content, "PNG")
+    content.name = name
+    content.seek(0)
+    return content
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PosterUploadTests(TestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="1qazcde3",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.play = Play.objects.create(title="King Lear")
+
+    def upload(self, image=None):
+        res = self.client.post(
+            reverse("theatre:play-upload-image", args=[self.play.id]),
+            {"poster": image or image_file()},
+            format="multipart"
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.play.refresh_from_db()
+        return res
+
+    def test_upload_creates_resized_variants(self):
+        res = self.upload()
+
+        name = os.path.basename(self.play.poster.name)
+        self.assertRegex(name, r"^king-lear-[0-9a-f]{12}\.png$")
+        self.assertEqual(set(self.play.poster_variants), set(POSTER_SIZES))
+        for size, width in POSTER_SIZES.items():
+            with default_storage.open(self.play.poster_variants[size]) as f:
+                self.assertEqual(Image.open(f).size, (width, width // 2))
+        self.assertTrue(res.data["posters"]["thumbnail"].endswith(
+            self.play.poster_variants["thumbnail"]
+        ))
+
+    def test_small_posters_are_not_upscaled(self):
+        self.upload(image_file(width=300, height=150))
+
+        with default_storage.open(self.play.poster_variants["large"]) as f:
+            self.assertEqual(Image.open(f).size, (300, 150))
+
+    def test_list_and_detail_use_different_sizes(self):
+        self.upload()
+
+        res = self.client.get(reverse("theatre:play-list"))
+        self.assertTrue(res.data["results"][0]["poster"].endswith(
+            self.play.poster_variants["thumbnail"]
+        ))
+
+        res = self.client.get(
+            reverse("theatre:play-detail", args=[self.play.id])
+        )
+        self.assertTrue(
+            res.data["poster"].endswith(self.play.poster_variants["large"])
+        )
+        self.assertTrue(
+            res.data["posters"]["original"].endswith(self.play.poster.name)
+        )
+
+    def test_reupload_gets_new_names_and_drops_old_variants(self):
+        self.upload()
+        old_variants = self.play.poster_variants
+
+        self.upload(image_file(width=1000, height=1000))
+
+        self.assertNotEqual(self.play.poster_variants, old_variants)
+        for name in old_variants.values():
+            self.assertFalse(default_storage.exists(name))
+
+    def test_backfill_command(self):
+        self.play.poster = default_storage.save(
+            "uploads/plays/legacy", image_file()
+        )
+        self.play.save()
+
+        call_command(
+            "generate_poster_variants", stdout=StringIO(), stderr=StringIO()
+        )
+
+        self.play.refresh_from_db()
+        self.assertEqual(set(self.play.poster_variants), set(POSTER_SIZES))
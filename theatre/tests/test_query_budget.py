@@ -0,0 +1,285 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre import search
+from theatre.cards import rebuild_cards
+from theatre.models import (
+    Genre,
+    Actor,
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    Ticket,
+)
+
+PLAYS = 30
+HALLS = 3
+PERFORMANCES_PER_PLAY = 2
+RESERVATIONS = 12
+TICKETS_PER_RESERVATION = 4
+
+
+def seed_catalog():
+    genres = Genre.objects.bulk_create(
+        [Genre(name=f"Genre {i}") for i in range(8)]
+    )
+    actors = Actor.objects.bulk_create(
+        [Actor(first_name=f"First{i}", last_name=f"Last{i}")
+         for i in range(20)]
+    )
+    plays = Play.objects.bulk_create(
+        [Play(title=f"Play {i}", description=f"Description {i}")
+         for i in range(PLAYS)]
+    )
+    Play.genres.through.objects.bulk_create([
+        Play.genres.through(play_id=play.id, genre_id=genres[j].id)
+        for i, play in enumerate(plays)
+        for j in {i % 8, (i + 3) % 8}
+    ])
+    Play.actors.through.objects.bulk_create([
+        Play.actors.through(play_id=play.id, actor_id=actors[j].id)
+        for i, play in enumerate(plays)
+        for j in {i % 20, (i + 5) % 20, (i + 11) % 20}
+    ])
+    rebuild_cards()
+    halls = TheatreHall.objects.bulk_create(
+        [TheatreHall(name=f"Hall {i}", rows=20, seats_in_row=25)
+         for i in range(HALLS)]
+    )
+    start = timezone.now() + datetime.timedelta(hours=1)
+    performances = Performance.objects.bulk_create([
+        Performance(
+            play=play,
+            theatre_hall=halls[(i + j) % HALLS],
+            show_time=start + datetime.timedelta(hours=3 * (i * 2 + j)),
+        )
+        for i, play in enumerate(plays)
+        for j in range(PERFORMANCES_PER_PLAY)
+    ])
+    return genres, actors, plays, halls, performances
+
+
+class QueryBudgetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="1qazcde3"
+        )
+        cls.admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="1qazcde3",
+            is_staff=True
+        )
+        (
+            cls.genres,
+            cls.actors,
+            cls.plays,
+            cls.halls,
+            cls.performances,
+        ) = seed_catalog()
+
+        reservations = Reservation.objects.bulk_create(
+            [Reservation(user=cls.user) for _ in range(RESERVATIONS)]
+        )
+        Ticket.objects.bulk_create([
+            Ticket(
+                reservation=reservation,
+                performance=cls.performances[(i + j) % len(cls.performances)],
+                row=i + 1,
+                seat=j + 1,
+            )
+            for i, reservation in enumerate(reservations)
+            for j in range(TICKETS_PER_RESERVATION)
+        ])
+        cls.reservation = reservations[0]
+
+    def setUp(self):
+        cache.clear()
+        search.index.generation = None
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertBudget(self, queries, method, url, data=None, status_code=200):
+        with self.assertNumQueries(queries):
+            res = getattr(self.client, method)(url, data, format="json")
+
+        self.assertEqual(res.status_code, status_code, res.data)
+        return res
+
+
+class TheatreQueryBudgetTests(QueryBudgetTestCase):
+    def test_genre_endpoints(self):
+        self.assertBudget(1, "get", reverse("theatre:genre-list"))
+        self.assertBudget(
+            1,
+            "get",
+            reverse("theatre:genre-detail", args=[self.genres[0].id])
+        )
+
+    def test_actor_endpoints(self):
+        self.assertBudget(1, "get", reverse("theatre:actor-list"))
+        self.assertBudget(
+            1,
+            "get",
+            reverse("theatre:actor-detail", args=[self.actors[0].id])
+        )
+
+    def test_play_endpoints(self):
+        self.assertBudget(1, "get", reverse("theatre:play-list"))
+        self.assertBudget(
+            3, "get", reverse("theatre:play-detail", args=[self.plays[0].id])
+        )
+
+    def test_theatre_hall_endpoints(self):
+        self.assertBudget(1, "get", reverse("theatre:theatrehall-list"))
+        self.assertBudget(
+            1,
+            "get",
+            reverse("theatre:theatrehall-detail", args=[self.halls[0].id])
+        )
+
+    def test_performance_endpoints(self):
+        performance_id = self.performances[0].id
+
+        self.assertBudget(1, "get", reverse("theatre:performance-list"))
+        self.assertBudget(
+            3,
+            "get",
+            reverse("theatre:performance-detail", args=[performance_id])
+        )
+        self.assertBudget(
+            3,
+            "get",
+            reverse("theatre:performance-seats", args=[performance_id])
+        )
+        self.assertBudget(
+            1,
+            "get",
+            reverse("theatre:performance-schedule"),
+            {"to": "2100-01-01"}
+        )
+
+    def test_reservation_endpoints(self):
+        self.assertBudget(2, "get", reverse("theatre:reservation-list"))
+        self.assertBudget(
+            2,
+            "get",
+            reverse("theatre:reservation-detail", args=[self.reservation.id])
+        )
+        self.assertBudget(
+            12,
+            "post",
+            reverse("theatre:reservation-list"),
+            {
+                "tickets": [
+                    {
+                        "row": 20,
+                        "seat": seat,
+                        "performance": self.performances[seat].id
+                    }
+                    for seat in range(1, 21)
+                ]
+            },
+            status_code=status.HTTP_201_CREATED,
+        )
+
+    def test_reservation_delete(self):
+        performance = self.performances[-1]
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.bulk_create([
+            Ticket(
+                reservation=reservation,
+                performance=performance,
+                row=row,
+                seat=seat,
+            )
+            for row in range(30, 40)
+            for seat in range(1, 11)
+        ])
+        Performance.objects.filter(pk=performance.pk).update(
+            tickets_sold=100
+        )
+
+        with self.assertNumQueries(6):
+            reservation.delete()
+
+        performance.refresh_from_db()
+        self.assertEqual(performance.tickets_sold, 0)
+
+    def test_seat_hold_endpoints(self):
+        performance = self.performances[-1]
+
+        res = self.assertBudget(
+            10,
+            "post",
+            reverse("theatre:seathold-list"),
+            {
+                "performance": performance.id,
+                "seats": [{"row": 19, "seat": seat} for seat in range(1, 11)],
+            },
+            status_code=status.HTTP_201_CREATED,
+        )
+        hold_id = res.data["id"]
+        self.assertBudget(
+            2, "get", reverse("theatre:seathold-detail", args=[hold_id])
+        )
+        self.assertBudget(
+            16,
+            "post",
+            reverse("theatre:seathold-confirm", args=[hold_id]),
+            status_code=status.HTTP_201_CREATED,
+        )
+
+    def test_search_endpoints(self):
+        self.assertBudget(
+            7, "get", reverse("theatre:search-list"), {"q": "play"}
+        )
+        self.assertBudget(
+            0, "get", reverse("theatre:search-autocomplete"), {"q": "firs"}
+        )
+
+
+class UserQueryBudgetTests(QueryBudgetTestCase):
+    def test_register(self):
+        self.client.force_authenticate(None)
+
+        self.assertBudget(
+            2,
+            "post",
+            reverse("user:register"),
+            {"email": "new@test.com", "password": "1qazcde3"},
+            status_code=status.HTTP_201_CREATED,
+        )
+
+    def test_manage_user(self):
+        self.assertBudget(0, "get", reverse("user:manage"))
+        self.assertBudget(
+            2, "patch", reverse("user:manage"), {"email": "me@test.com"}
+        )
+
+    def test_token_endpoints(self):
+        self.client.force_authenticate(None)
+
+        with self.assertNumQueries(1):
+            res = self.client.post(
+                reverse("user:token_obtain_pair"),
+                {"email": "user@test.com", "password": "1qazcde3"},
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.post(
+                reverse("user:token_refresh"),
+                {"refresh": res.data["refresh"]},
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
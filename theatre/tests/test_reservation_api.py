@@ -0,0 +1,439 @@
+import datetime
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.booking import find_blocks, find_taken_seats, hold_seats
+from theatre.models import (
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    Ticket,
+)
+
+RESERVATION_URL = reverse("theatre:reservation-list")
+BATCH_URL = reverse("theatre:reservation-batch")
+ALLOCATE_URL = reverse("theatre:reservation-allocate")
+
+
+def sample_performance(**params):
+    play = Play.objects.create(title="Hamlet", description="Tragedy")
+    theatre_hall = TheatreHall.objects.create(
+        name="Blue", rows=10, seats_in_row=10
+    )
+
+    defaults = {
+        "show_time": "2030-06-02 14:00:00+00:00",
+        "play": play,
+        "theatre_hall": theatre_hall,
+    }
+    defaults.update(params)
+
+    return Performance.objects.create(**defaults)
+
+
+class ReservationCreateApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def tickets(self, *seats, performance=None):
+        performance = performance or self.performance
+        return [
+            {"row": row, "seat": seat, "performance": performance.id}
+            for row, seat in seats
+        ]
+
+    def test_create_reservation(self):
+        payload = {"tickets": self.tickets((1, 1), (1, 2))}
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(t["row"], t["seat"]) for t in res.data["tickets"]],
+            [(1, 1), (1, 2)]
+        )
+        reservation = Reservation.objects.get(id=res.data["id"])
+        self.assertEqual(reservation.user, self.user)
+        self.assertEqual(reservation.tickets.count(), 2)
+
+    def test_create_reservation_query_count_is_flat(self):
+        seats = [(row, seat) for row in range(1, 5) for seat in range(1, 11)]
+        payload = {"tickets": self.tickets(*seats)}
+
+        with self.assertNumQueries(12):
+            res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ticket.objects.count(), 40)
+
+    def test_seat_out_of_range(self):
+        payload = {"tickets": self.tickets((1, 1), (11, 1))}
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][0], {})
+        self.assertIn("Rows", res.data["tickets"][1])
+
+    def test_unknown_performance(self):
+        payload = {"tickets": [{"row": 1, "seat": 1, "performance": 999}]}
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("performance", res.data["tickets"][0])
+
+    def test_duplicate_seat_in_request(self):
+        payload = {"tickets": self.tickets((1, 1), (2, 2), (1, 1))}
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Seats", res.data["tickets"][0])
+        self.assertEqual(res.data["tickets"][1], {})
+        self.assertIn("Seats", res.data["tickets"][2])
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_taken_seat_is_reported_per_ticket(self):
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=3, seat=3, performance=self.performance,
+            reservation=reservation
+        )
+        payload = {"tickets": self.tickets((3, 2), (3, 3))}
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][0], {})
+        self.assertIn("not available", res.data["tickets"][1]["Seats"])
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+
+class ReservationListApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+        self.reservations = [
+            Reservation.objects.create(user=self.user) for _ in range(7)
+        ]
+
+    def test_cursor_pagination(self):
+        res = self.client.get(RESERVATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        first_page = [reservation["id"] for reservation in res.data["results"]]
+
+        res = self.client.get(res.data["next"])
+        second_page = [
+            reservation["id"] for reservation in res.data["results"]
+        ]
+
+        self.assertEqual(
+            first_page + second_page,
+            [reservation.id for reservation in reversed(self.reservations)]
+        )
+        self.assertIsNone(res.data["next"])
+
+    def test_only_own_reservations_are_listed(self):
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="1qazcde3"
+        )
+        Reservation.objects.create(user=other_user)
+
+        res = self.client.get(RESERVATION_URL, {"page_size": 100})
+
+        self.assertEqual(len(res.data["results"]), 7)
+
+    def test_stream_lists_all_reservations_with_tickets(self):
+        self.user.is_staff = True
+        self.user.save()
+        performance = sample_performance()
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            performance=performance,
+            reservation=self.reservations[0]
+        )
+
+        res = self.client.get(RESERVATION_URL, {"stream": "true"})
+        items = json.loads(b"".join(res.streaming_content))
+
+        self.assertEqual(
+            [item["id"] for item in items],
+            [reservation.id for reservation in reversed(self.reservations)]
+        )
+        self.assertEqual(
+            items[-1]["tickets"][0]["performance"]["play_title"], "Hamlet"
+        )
+
+
+class ReservationBatchApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="1qazcde3",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{i}@test.com", password="1qazcde3"
+            )
+            for i in range(3)
+        ]
+        self.performance = sample_performance()
+
+    def item(self, user, *seats):
+        return {
+            "user": user.id,
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ],
+        }
+
+    def post(self, *items):
+        return self.client.post(
+            BATCH_URL, {"reservations": list(items)}, format="json"
+        )
+
+    def test_batch_reports_created_and_conflicting_items(self):
+        Ticket.objects.create(
+            row=5,
+            seat=5,
+            performance=self.performance,
+            reservation=Reservation.objects.create(user=self.users[0]),
+        )
+
+        res = self.post(
+            self.item(self.users[0], (1, 1), (1, 2)),
+            self.item(self.users[1], (5, 4), (5, 5)),
+            self.item(self.users[2], (1, 2), (1, 3)),
+            self.item(self.users[2], (2, 1)),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["status"] for item in res.data],
+            ["created", "conflict", "conflict", "created"]
+        )
+        self.assertEqual(
+            res.data[1]["seats"],
+            [{"performance": self.performance.id, "row": 5, "seat": 5}]
+        )
+        self.assertEqual(res.data[2]["seats"][0]["seat"], 2)
+        created = Reservation.objects.get(
+            id=res.data[0]["reservation"]["id"]
+        )
+        self.assertEqual(created.user, self.users[0])
+        self.assertEqual(
+            [(t["row"], t["seat"]) for t in res.data[0]["reservation"]
+             ["tickets"]],
+            [(1, 1), (1, 2)]
+        )
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 4)
+        self.assertEqual(
+            self.performance.sales.get().tickets_sold, 4
+        )
+
+    def test_seats_held_by_someone_else_conflict(self):
+        hold_seats(
+            self.users[0],
+            self.performance,
+            [(3, 3)],
+            timezone.now() + datetime.timedelta(minutes=5),
+        )
+
+        res = self.post(
+            self.item(self.users[0], (3, 3)),
+            self.item(self.users[1], (3, 3)),
+        )
+
+        self.assertEqual(
+            [item["status"] for item in res.data], ["created", "conflict"]
+        )
+
+    def test_seats_taken_while_writing_are_retried(self):
+        other = Reservation.objects.create(user=self.users[0])
+        Ticket.objects.create(
+            row=1, seat=1, performance=self.performance, reservation=other
+        )
+
+        # The first lookup misses the ticket, as if it was booked right
+        # after it; the insert then fails and the batch is retried.
+        with mock.patch(
+            "theatre.booking.find_taken_seats",
+            side_effect=[set(), find_taken_seats(
+                [(self.performance.id, 1, 1)]
+            )],
+        ):
+            res = self.post(
+                self.item(self.users[1], (1, 1)),
+                self.item(self.users[2], (1, 2)),
+            )
+
+        self.assertEqual(
+            [item["status"] for item in res.data], ["conflict", "created"]
+        )
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        items = [
+            self.item(self.users[i % 3], (i + 1, 1), (i + 1, 2))
+            for i in range(10)
+        ]
+
+        with self.assertNumQueries(11):
+            res = self.post(*items)
+
+        self.assertEqual(len(res.data), 10)
+        self.assertEqual(Ticket.objects.count(), 20)
+
+    def test_invalid_items_are_reported_and_the_rest_booked(self):
+        res = self.post(
+            self.item(self.users[0], (1, 1)),
+            {"user": 0, "tickets": []},
+            self.item(self.users[1], (99, 1)),
+            "not an item",
+            self.item(self.users[2], (1, 2)),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["status"] for item in res.data],
+            ["created", "invalid", "invalid", "invalid", "created"]
+        )
+        self.assertEqual(set(res.data[1]["errors"]), {"user", "tickets"})
+        self.assertEqual(set(res.data[2]["errors"]), {"tickets"})
+        self.assertIn("non_field_errors", res.data[3]["errors"])
+        self.assertEqual(
+            sorted(
+                Reservation.objects.values_list("user_id", flat=True)
+            ),
+            [self.users[0].id, self.users[2].id]
+        )
+
+    def test_malformed_batch_is_rejected(self):
+        res = self.client.post(
+            BATCH_URL, {"reservations": []}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("reservations", res.data)
+
+    def test_batch_is_admin_only(self):
+        self.client.force_authenticate(self.users[0])
+
+        res = self.post(self.item(self.users[0], (1, 1)))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReservationAllocateApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+        self.other = Reservation.objects.create(user=self.user)
+
+    def take(self, row, *seats):
+        for seat in seats:
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                performance=self.performance,
+                reservation=self.other,
+            )
+
+    def allocate(self, count):
+        return self.client.post(
+            ALLOCATE_URL,
+            {"performance": self.performance.id, "count": count},
+            format="json"
+        )
+
+    def seats(self, res):
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return [(t["row"], t["seat"]) for t in res.data["tickets"]]
+
+    def test_allocates_middle_of_empty_hall(self):
+        res = self.allocate(4)
+
+        self.assertEqual(self.seats(res), [(5, 4), (5, 5), (5, 6), (5, 7)])
+        reservation = Reservation.objects.get(id=res.data["id"])
+        self.assertEqual(reservation.user, self.user)
+        self.assertEqual(reservation.tickets.count(), 4)
+
+    def test_skips_taken_and_held_seats(self):
+        self.take(5, 5)
+        hold_seats(
+            get_user_model().objects.create_user(
+                email="other@test.com", password="1qazcde3"
+            ),
+            self.performance,
+            [(6, 6)],
+            timezone.now() + datetime.timedelta(minutes=5),
+        )
+
+        res = self.allocate(2)
+
+        self.assertEqual(self.seats(res), [(5, 6), (5, 7)])
+
+    def test_no_block_left(self):
+        for row in range(1, 11):
+            self.take(row, 3, 7)
+
+        res = self.allocate(4)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_count_must_fit_in_a_row(self):
+        self.performance.theatre_hall.seats_in_row = 3
+        self.performance.theatre_hall.save()
+
+        res = self.allocate(4)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("count", res.data)
+
+    def test_retries_when_block_is_taken_meanwhile(self):
+        fresh = find_blocks(self.performance, 2)
+        self.take(5, 5, 6)
+
+        with mock.patch(
+            "theatre.booking.find_blocks",
+            side_effect=[fresh, find_blocks(self.performance, 2)],
+        ):
+            res = self.allocate(2)
+
+        self.assertEqual(self.seats(res), [(6, 5), (6, 6)])
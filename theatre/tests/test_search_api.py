@@ -0,0 +1,124 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre import search
+from theatre.models import Play, Genre, Actor
+
+SEARCH_URL = reverse("theatre:search-list")
+AUTOCOMPLETE_URL = reverse("theatre:search-autocomplete")
+
+
+class SearchApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search.index.generation = None
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.tragedy = Genre.objects.create(name="Tragedy")
+        self.actor = Actor.objects.create(
+            first_name="Laurence", last_name="Olivier"
+        )
+        self.hamlet = Play.objects.create(
+            title="Hamlet", description="Prince of Denmark"
+        )
+        self.hamlet.genres.add(self.tragedy)
+        self.hamlet.actors.add(self.actor)
+        self.macbeth = Play.objects.create(
+            title="Macbeth", description="A Scottish tragedy"
+        )
+
+    def search(self, query):
+        return self.client.get(SEARCH_URL, {"q": query})
+
+    def test_title_ranks_above_description(self):
+        res = self.search("tragedy")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [play["title"] for play in res.data["plays"]],
+            ["Hamlet", "Macbeth"]
+        )
+
+    def test_search_by_actor_name(self):
+        res = self.search("olivier")
+
+        self.assertEqual(
+            [play["id"] for play in res.data["plays"]], [self.hamlet.id]
+        )
+        self.assertEqual(
+            [actor["id"] for actor in res.data["actors"]], [self.actor.id]
+        )
+
+    def test_all_terms_must_match(self):
+        res = self.search("scottish prince")
+
+        self.assertEqual(res.data["plays"], [])
+
+    def test_autocomplete_prefix(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "ma"})
+
+        self.assertEqual(
+            res.data["plays"], [{"id": self.macbeth.id, "title": "Macbeth"}]
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "lau oli"})
+
+        self.assertEqual(
+            res.data["actors"],
+            [{"id": self.actor.id, "full_name": "Laurence Olivier"}]
+        )
+
+    def test_autocomplete_does_not_query_database(self):
+        self.client.get(AUTOCOMPLETE_URL, {"q": "ham"})
+
+        with self.assertNumQueries(0):
+            self.client.get(AUTOCOMPLETE_URL, {"q": "mac"})
+
+    def test_signals_update_index(self):
+        self.search("hamlet")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            othello = Play.objects.create(title="Othello")
+        with self.captureOnCommitCallbacks(execute=True):
+            othello.genres.add(self.tragedy)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tragedy.name = "Drama"
+            self.tragedy.save()
+
+        self.assertEqual(
+            [play["id"] for play in self.search("drama").data["plays"]],
+            [self.hamlet.id, othello.id]
+        )
+        self.assertEqual(
+            [play["id"] for play in self.search("tragedy").data["plays"]],
+            [self.macbeth.id]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.actor.delete()
+
+        self.assertEqual(self.search("olivier").data["actors"], [])
+
+    def test_rebuild_command(self):
+        self.search("hamlet")
+        Play.objects.filter(pk=self.macbeth.pk).update(title="King Lear")
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertEqual(
+            [play["id"] for play in self.search("lear").data["plays"]],
+            [self.macbeth.id]
+        )
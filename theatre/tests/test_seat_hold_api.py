@@ -0,0 +1,197 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.models import (
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    Ticket,
+    SeatHold,
+    HeldSeat,
+)
+
+SEAT_HOLD_URL = reverse("theatre:seathold-list")
+RESERVATION_URL = reverse("theatre:reservation-list")
+
+
+def sample_performance(**params):
+    play = Play.objects.create(title="Hamlet", description="Tragedy")
+    theatre_hall = TheatreHall.objects.create(
+        name="Blue", rows=10, seats_in_row=10
+    )
+
+    defaults = {
+        "show_time": "2030-06-02 14:00:00+00:00",
+        "play": play,
+        "theatre_hall": theatre_hall,
+    }
+    defaults.update(params)
+
+    return Performance.objects.create(**defaults)
+
+
+def detail_url(hold_id):
+    return reverse("theatre:seathold-detail", args=[hold_id])
+
+
+def confirm_url(hold_id):
+    return reverse("theatre:seathold-confirm", args=[hold_id])
+
+
+class SeatHoldApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="1qazcde3"
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="1qazcde3"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def hold(self, *seats, minutes=10):
+        return self.client.post(
+            SEAT_HOLD_URL,
+            {
+                "performance": self.performance.id,
+                "seats": [{"row": row, "seat": seat} for row, seat in seats],
+                "minutes": minutes,
+            },
+            format="json",
+        )
+
+    def hold_for_other_user(self, *seats, expires_at=None):
+        hold = SeatHold.objects.create(
+            user=self.other_user,
+            performance=self.performance,
+            expires_at=expires_at or timezone.now() + datetime.timedelta(
+                minutes=5
+            ),
+        )
+        for row, seat in seats:
+            HeldSeat.objects.create(
+                hold=hold, performance=self.performance, row=row, seat=seat
+            )
+        return hold
+
+    def test_hold_seats(self):
+        res = self.hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            res.data["seats"], [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}]
+        )
+        self.assertEqual(HeldSeat.objects.count(), 2)
+
+    def test_contested_seats_conflict(self):
+        self.hold_for_other_user((1, 2))
+
+        res = self.hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["seats"],
+            [{"performance": self.performance.id, "row": 1, "seat": 2}]
+        )
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_sold_seats_conflict(self):
+        reservation = Reservation.objects.create(user=self.other_user)
+        Ticket.objects.create(
+            row=2, seat=2, performance=self.performance,
+            reservation=reservation
+        )
+
+        res = self.hold((2, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_expired_hold_does_not_block(self):
+        self.hold_for_other_user(
+            (1, 1), expires_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+        res = self.hold((1, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_held_seat_cannot_be_reserved_by_others(self):
+        self.hold_for_other_user((3, 3))
+
+        res = self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {"row": 3, "seat": 3, "performance": self.performance.id}
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_confirm_hold(self):
+        hold_id = self.hold((4, 1), (4, 2)).data["id"]
+
+        res = self.client.post(confirm_url(hold_id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        reservation = Reservation.objects.get(id=res.data["id"])
+        self.assertEqual(reservation.user, self.user)
+        self.assertEqual(reservation.tickets.count(), 2)
+        self.assertFalse(SeatHold.objects.exists())
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 2)
+
+    def test_confirm_expired_hold(self):
+        hold_id = self.hold((4, 1)).data["id"]
+        SeatHold.objects.update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        res = self.client.post(confirm_url(hold_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_release_hold(self):
+        hold_id = self.hold((5, 5)).data["id"]
+
+        res = self.client.delete(detail_url(hold_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(HeldSeat.objects.exists())
+
+    def test_cannot_see_other_users_hold(self):
+        hold = self.hold_for_other_user((6, 6))
+
+        res = self.client.delete(detail_url(hold.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sweep_expired_holds(self):
+        self.hold_for_other_user(
+            (1, 1), (1, 2),
+            expires_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        self.hold_for_other_user((2, 1))
+
+        call_command("sweep_seat_holds", stdout=StringIO())
+
+        self.assertEqual(SeatHold.objects.count(), 1)
+        self.assertEqual(HeldSeat.objects.count(), 1)
@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from theatre.models import (
+    Genre,
+    Actor,
+    Play,
+    Performance,
+    SalesSummary,
+    Ticket,
+)
+
+SEED_OPTIONS = {
+    "genres": 4,
+    "actors": 12,
+    "plays": 6,
+    "halls": 2,
+    "performances": 5,
+    "tickets": 40,
+    "users": 3,
+}
+
+
+class SeedTheatreCommandTests(TestCase):
+    def seed(self, **options):
+        call_command(
+            "seed_theatre",
+            stdout=StringIO(),
+            stderr=StringIO(),
+            **SEED_OPTIONS,
+            **options
+        )
+
+    def test_seed_creates_requested_rows(self):
+        self.seed(chunk_size=7)
+
+        self.assertEqual(Genre.objects.count(), 4)
+        self.assertEqual(Actor.objects.count(), 12)
+        self.assertEqual(Play.objects.count(), 6)
+        self.assertEqual(Performance.objects.count(), 5)
+        self.assertEqual(Ticket.objects.count(), 40)
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertFalse(
+            Play.objects.annotate(genre_count=Count("genres"))
+            .filter(genre_count=0).exists()
+        )
+        self.assertFalse(
+            Play.objects.annotate(actor_count=Count("actors"))
+            .filter(actor_count__lt=3).exists()
+        )
+        for performance in Performance.objects.annotate(
+            sold=Count("tickets")
+        ):
+            self.assertEqual(performance.tickets_sold, performance.sold)
+        self.assertEqual(
+            SalesSummary.objects.aggregate(sold=Sum("tickets_sold"))["sold"],
+            40
+        )
+
+    def test_seed_is_reproducible(self):
+        self.seed(seed=1)
+        first = list(Play.objects.order_by("id").values_list(
+            "title", "description"
+        ))
+        Play.objects.all().delete()
+
+        self.seed(seed=2)
+        self.assertNotEqual(
+            list(Play.objects.values_list("title", "description")), first
+        )
+        Play.objects.all().delete()
+
+        get_user_model().objects.all().delete()
+        self.seed(seed=1)
+        self.assertEqual(
+            list(Play.objects.order_by("id").values_list(
+                "title", "description"
+            )),
+            first
+        )
+
+    def test_same_seed_twice_is_rejected(self):
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
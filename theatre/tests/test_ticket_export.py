@@ -0,0 +1,118 @@
+import csv
+import datetime
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from theatre.models import (
+    Play,
+    TheatreHall,
+    Performance,
+    Reservation,
+    Ticket,
+)
+
+EXPORT_URL = reverse("theatre:ticket-export-list")
+
+
+class TicketExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="1qazcde3",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+
+        hall = TheatreHall.objects.create(name="Blue", rows=5, seats_in_row=5)
+        self.hamlet = Play.objects.create(title="Hamlet")
+        macbeth = Play.objects.create(title="Macbeth")
+        performances = [
+            Performance.objects.create(
+                play=play,
+                theatre_hall=hall,
+                show_time=timezone.now() + datetime.timedelta(days=days)
+            )
+            for days, play in ((1, self.hamlet), (2, macbeth))
+        ]
+
+        self.old_reservation = Reservation.objects.create(user=self.admin)
+        Reservation.objects.filter(pk=self.old_reservation.pk).update(
+            created_at=timezone.now() - datetime.timedelta(days=10)
+        )
+        reservation = Reservation.objects.create(user=self.admin)
+        for seat, (performance, owner) in enumerate(
+            (
+                (performances[0], self.old_reservation),
+                (performances[0], reservation),
+                (performances[1], reservation),
+            ),
+            start=1
+        ):
+            Ticket.objects.create(
+                row=1, seat=seat, performance=performance, reservation=owner
+            )
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return b"".join(res.streaming_content).decode()
+
+    def test_csv_export_joins_related_rows(self):
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+
+        self.assertEqual([row["seat"] for row in rows], ["1", "2", "3"])
+        self.assertEqual(rows[2]["play_title"], "Macbeth")
+        self.assertEqual(rows[0]["theatre_hall"], "Blue")
+        self.assertEqual(rows[0]["user_email"], "admin@test.com")
+
+    def test_ndjson_export_with_filters(self):
+        today = timezone.localdate()
+
+        content = self.export(
+            output="ndjson", play=self.hamlet.id, **{"from": today}
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["seat"], 2)
+        self.assertEqual(rows[0]["play_id"], self.hamlet.id)
+
+    def test_unknown_output_format(self):
+        res = self.client.get(EXPORT_URL, {"output": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_is_admin_only(self):
+        self.admin.is_staff = False
+        self.admin.save()
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        out = io.StringIO()
+
+        call_command(
+            "export_tickets",
+            "--format=ndjson",
+            f"--to={timezone.localdate() - datetime.timedelta(days=5)}",
+            "--chunk-size=1",
+            stdout=out
+        )
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+
+        self.assertEqual(
+            [row["reservation_id"] for row in rows],
+            [self.old_reservation.id]
+        )
@@ -0,0 +1,140 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from theatre.models import (
+    Genre,
+    Actor,
+    Play,
+    TheatreHall,
+    Performance,
+)
+from theatre.serializers import (
+    PlayListSerializer,
+    PlayListValuesSerializer,
+    PerformanceListSerializer,
+    PerformanceListValuesSerializer,
+    ValuesSerializer,
+)
+
+
+class ValuesSerializerTests(TestCase):
+    def setUp(self):
+        drama = Genre.objects.create(name="Drama")
+        comedy = Genre.objects.create(name="Comedy")
+        first = Actor.objects.create(first_name="Anna", last_name="Moroz")
+        second = Actor.objects.create(first_name="Ivan", last_name="Boyko")
+
+        self.hamlet = Play.objects.create(
+            title="Hamlet", description="Prince of Denmark"
+        )
+        self.hamlet.genres.add(comedy, drama)
+        self.hamlet.actors.add(second, first)
+        Play.objects.filter(pk=self.hamlet.pk).update(
+            poster="uploads/plays/hamlet.jpg"
+        )
+        Play.objects.create(title="Untitled", description=None)
+
+        hall = TheatreHall.objects.create(
+            name="Blue", rows=10, seats_in_row=12
+        )
+        show_time = timezone.now().replace(microsecond=123456)
+        for hours in range(3):
+            Performance.objects.create(
+                play=self.hamlet,
+                theatre_hall=hall,
+                show_time=show_time + datetime.timedelta(hours=hours),
+                tickets_sold=hours * 7,
+            )
+
+        self.request = RequestFactory().get("/api/theatre/plays/")
+        self.context = {"request": self.request}
+
+    def render(self, serializer):
+        return JSONRenderer().render(serializer.data)
+
+    def test_play_list_output_is_identical(self):
+        plays = Play.objects.order_by("id")
+
+        self.assertEqual(
+            self.render(PlayListValuesSerializer(
+                PlayListValuesSerializer.values(plays),
+                many=True,
+                context=self.context
+            )),
+            self.render(PlayListSerializer(
+                plays.prefetch_related("genres", "actors"),
+                many=True,
+                context=self.context
+            )),
+        )
+
+    def test_performance_list_output_is_identical(self):
+        performances = Performance.objects.order_by("-show_time").annotate(
+            available_tickets=(
+                F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+                - F("tickets_sold")
+            )
+        )
+
+        self.assertEqual(
+            self.render(PerformanceListValuesSerializer(
+                PerformanceListValuesSerializer.values(performances),
+                many=True,
+            )),
+            self.render(PerformanceListSerializer(
+                performances.select_related("play", "theatre_hall"),
+                many=True,
+            )),
+        )
+
+    def test_selected_fields_output_is_identical(self):
+        plays = Play.objects.order_by("id")
+
+        for selection in (
+            {"fields": {"id", "genres", "poster"}, "expand": set()},
+            {"fields": None, "expand": {"actors"}},
+        ):
+            with self.subTest(**selection):
+                self.assertEqual(
+                    self.render(PlayListValuesSerializer(
+                        PlayListValuesSerializer.values(plays, **selection),
+                        many=True,
+                        context=self.context,
+                        **selection
+                    )),
+                    self.render(PlayListSerializer(
+                        plays.prefetch_related("genres", "actors"),
+                        many=True,
+                        context=self.context,
+                        **selection
+                    )),
+                )
+
+    def test_computed_fields_need_computed_value(self):
+        with self.assertRaises(TypeError):
+            class MissingSerializer(ValuesSerializer):
+                mirror = PlayListSerializer
+                computed = {"poster": ("poster",)}
+
+    def test_list_endpoint_uses_values_rows(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            email="test@test.com", password="1qazcde3"
+        ))
+
+        res = client.get(reverse("theatre:play-list"))
+
+        self.assertEqual(
+            res.data["results"][0]["poster"],
+            "http://testserver/vol/web/media/uploads/plays/hamlet.jpg"
+        )
+        self.assertEqual(
+            res.data["results"][0]["actors"], ["Anna Moroz", "Ivan Boyko"]
+        )
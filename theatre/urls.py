@@ -2,12 +2,16 @@ from django.urls import path, include
 from rest_framework import routers
 
 from theatre.views import (
+    AnalyticsViewSet,
     GenreViewSet,
     ActorViewSet,
     PlayViewSet,
     TheatreHallViewSet,
     PerformanceViewSet,
-    ReservationViewSet
+    ReservationViewSet,
+    SeatHoldViewSet,
+    SearchViewSet,
+    TicketExportViewSet,
 )
 
 router = routers.DefaultRouter()
@@ -17,7 +21,50 @@ router.register("plays", PlayViewSet)
 router.register("theatre-halls", TheatreHallViewSet)
 router.register("performances", PerformanceViewSet)
 router.register("reservations", ReservationViewSet)
+router.register("seat-holds", SeatHoldViewSet)
+router.register("search", SearchViewSet, basename="search")
+router.register(
+    "exports/tickets", TicketExportViewSet, basename="ticket-export"
+)
+
+router.register("analytics", AnalyticsViewSet, basename="analytics")
+
+async_urlpatterns = [
+    path(
+        "performances/",
+        PerformanceViewSet.as_async_view("list", basename="performance"),
+        name="async-performance-list",
+    ),
+    path(
+        "performances/<pk>/",
+        PerformanceViewSet.as_async_view("retrieve", basename="performance"),
+        name="async-performance-detail",
+    ),
+    path(
+        "performances/<pk>/seats/",
+        PerformanceViewSet.as_async_view("seats", basename="performance"),
+        name="async-performance-seats",
+    ),
+    path(
+        "performances/<pk>/events/",
+        PerformanceViewSet.as_async_view("events", basename="performance"),
+        name="async-performance-events",
+    ),
+    path(
+        "plays/",
+        PlayViewSet.as_async_view("list", basename="play"),
+        name="async-play-list",
+    ),
+    path(
+        "plays/<pk>/",
+        PlayViewSet.as_async_view("retrieve", basename="play"),
+        name="async-play-detail",
+    ),
+]
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("", include(router.urls)),
+    path("async/", include(async_urlpatterns)),
+]
 
 app_name = "theatre"
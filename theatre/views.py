@@ -1,65 +1,466 @@
-from django.db.models import F, Count
-from drf_spectacular.utils import extend_schema
-from rest_framework import filters, status
+import datetime
+from itertools import groupby, islice
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiParameter,
+)
+from rest_framework import status
 from rest_framework import viewsets, mixins
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAdminUser
+from rest_framework.exceptions import (
+    MethodNotAllowed,
+    PermissionDenied,
+    ValidationError,
+)
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from theatre.filters import PlayFilter, PerformanceFilter
+from theatre import analytics, events, search
+from theatre.booking import (
+    SeatsConflict,
+    SeatsUnavailable,
+    book_batch,
+    confirm_hold,
+)
+from theatre.cache import CachedResponseMixin, WatermarkMixin
+from theatre.export import OUTPUT_FORMATS, export_tickets
+from theatre.instrumentation import SerializerTimingMixin, timed_serializer
+from theatre.idempotency import (
+    IDEMPOTENCY_KEY_PARAMETER,
+    IdempotentCreateMixin,
+)
+from theatre.filters import (
+    PlayFilter,
+    PerformanceFilter,
+    TicketExportFilter,
+    day_start,
+)
 from theatre.models import (
     Genre,
     Actor,
     Play,
     TheatreHall,
     Performance,
-    Reservation
+    Reservation,
+    SeatHold,
+    Ticket,
+)
+from theatre.pagination import (
+    PerformancePagination,
+    PlayPagination,
+    ReservationPagination,
 )
-from theatre.pagination import ReservationPagination
 from theatre.permissions import IsAdminOrIfAuthenticatedReadOnly
+from theatre.posters import generate_variants
+from theatre.seating import aseat_map, last_hold_expiry, seat_map
 from theatre.serializers import (
     GenreSerializer,
     ActorSerializer,
     PlaySerializer,
     PlayListSerializer,
+    PlayListValuesSerializer,
     PlayDetailSerializer,
     TheatreHallSerializer,
     PerformanceSerializer,
     PerformanceListSerializer,
+    PerformanceListValuesSerializer,
     PerformanceDetailSerializer,
+    PerformanceScheduleDaySerializer,
     ReservationCreateSerializer,
     ReservationListSerializer,
+    ReservationAllocateSerializer,
+    ReservationBatchSerializer,
+    ReservationBatchResultSerializer,
     PlayPosterSerializer,
+    SeatHoldSerializer,
+    SearchResultSerializer,
+    AutocompleteSerializer,
+    OccupancyQuerySerializer,
+    OccupancySerializer,
+    SalesQuerySerializer,
+    SalesPeriodSerializer,
+    InvalidBatchItem,
+    mirrored_fields,
 )
 
+FIELD_SELECTION_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type=OpenApiTypes.STR,
+        description="Comma-separated fields to return, all by default",
+    ),
+    OpenApiParameter(
+        "expand",
+        type=OpenApiTypes.STR,
+        description=(
+            "Comma-separated relations to return in full; once `fields` "
+            "or `expand` is given, the others are returned as ids"
+        ),
+    ),
+]
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class AsyncReadMixin:
+    """
+    Async twins of a viewset's read actions for the ASGI entry point.
+
+    ``as_async_view("list")`` serves ``alist()`` and so on. Authentication,
+    permissions, throttling and filtering run through the usual DRF hooks
+    in a worker thread, so they behave exactly like the sync views; the
+    rows themselves are fetched with the async ORM.
+    """
+
+    @classmethod
+    def as_async_view(cls, action, **initkwargs):
+        handler_name = f"a{action}"
+
+        async def view(request, *args, **kwargs):
+            self = cls(**initkwargs)
+            self.action = action
+            self.action_map = {"get": action}
+            self.http_method_names = ["get", "head"]
+            self.get = self.head = getattr(self, handler_name)
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        # Async-only actions are documented from their handler.
+        view.actions = {
+            "get": action if hasattr(cls, action) else handler_name
+        }
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            if request.method.lower() not in self.http_method_names:
+                raise MethodNotAllowed(request.method)
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        # Rendering happens in the handler, as for any template response.
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def afilter_queryset(self, queryset):
+        # Filter forms may validate their choices against the database.
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            DjangoValidationError,
+        ):
+            raise Http404
+
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(await self.aget_object())
+        return Response(serializer.data)
+
+
+class FieldSelectionMixin:
+    """
+    ``?fields=`` and ``?expand=`` for the list and retrieve actions, passed
+    on to serializers taking them. ``wants()`` and ``expands()`` tell
+    ``get_queryset`` what it still has to load.
+    """
+
+    field_selection_actions = ("list", "retrieve")
+    field_selection = {}
+
+    def initial(self, request, *args, **kwargs):
+        super(FieldSelectionMixin, self).initial(request, *args, **kwargs)
+        self.field_selection = self.get_field_selection(request)
+
+    def get_field_selection(self, request):
+        params = request.query_params
+        if (
+            self.action not in self.field_selection_actions
+            or not {"fields", "expand"} & set(params)
+        ):
+            return {}
+
+        serializer_class = self.get_serializer_class()
+        fields = split_names(params.get("fields", "")) or None
+        expand = split_names(params.get("expand", ""))
+
+        errors = {}
+        unknown = (fields or set()) - {
+            name for name, _ in mirrored_fields(serializer_class)
+        }
+        if unknown:
+            errors["fields"] = [
+                f"Unknown fields: {', '.join(sorted(unknown))}."
+            ]
+        unknown = expand - set(serializer_class.collapsed_fields)
+        if unknown:
+            errors["expand"] = [
+                f"Cannot expand: {', '.join(sorted(unknown))}."
+            ]
+        if errors:
+            raise ValidationError(errors)
+
+        return {"fields": fields, "expand": expand}
+
+    def wants(self, name):
+        fields = self.field_selection.get("fields")
+        return fields is None or name in fields
+
+    def expands(self, name):
+        return self.wants(name) and (
+            not self.field_selection or name in self.field_selection["expand"]
+        )
+
+    def selected_columns(self, columns=None):
+        """
+        Columns ``only()`` has to load for the selected fields, or None for
+        all of them. ``columns`` maps fields to the columns they read, when
+        those are not a single column of the same name.
+        """
+        fields = self.field_selection.get("fields")
+        if fields is None:
+            return None
+
+        selected = {"id"}
+        for name in fields:
+            selected.update((columns or {}).get(name, (name,)))
+        return sorted(selected)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(self.field_selection)
+        return super(FieldSelectionMixin, self).get_serializer(*args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    Serve the list action from ``values()`` rows through
+    ``values_serializer_class`` instead of model instances.
+    """
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_values_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_values_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_values_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.get_values_queryset(
+            await self.afilter_queryset(self.get_queryset())
+        )
+
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else [row async for row in queryset]
+        serializer = self.get_values_serializer(rows, many=True)
+        await serializer.aload(rows)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def get_values_queryset(self, queryset):
+        ordering = getattr(self.pagination_class, "ordering", ())
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        return self.values_serializer_class.values(
+            queryset,
+            extra=[column.lstrip("-") for column in ordering],
+            **getattr(self, "field_selection", {})
+        )
+
+    def get_values_serializer(self, *args, **kwargs):
+        kwargs.setdefault("context", self.get_serializer_context())
+        kwargs.update(getattr(self, "field_selection", {}))
+        return timed_serializer(
+            self.request, self.values_serializer_class(*args, **kwargs)
+        )
+
+
+class StreamingListMixin:
+    """
+    Let staff fetch a whole list action as one JSON array with
+    ``?stream=true``, read in chunks and written as it is serialized.
+    """
+
+    stream_chunk_size = 1000
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "stream",
+                type=OpenApiTypes.BOOL,
+                description=(
+                    "Staff only: return every matching item unpaginated "
+                    "as a streamed JSON array"
+                ),
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        if not self.is_streaming(request):
+            return super(StreamingListMixin, self).list(
+                request, *args, **kwargs
+            )
+
+        if not request.user.is_staff:
+            raise PermissionDenied("Streaming lists are limited to staff.")
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if getattr(self, "values_serializer_class", None) is not None:
+            queryset = self.get_values_queryset(queryset)
+            get_serializer = self.get_values_serializer
+        else:
+            get_serializer = self.get_serializer
+
+        ordering = getattr(self.pagination_class, "ordering", None)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+
+        return StreamingHttpResponse(
+            self.stream(queryset, get_serializer),
+            content_type="application/json",
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        if not self.is_streaming(request):
+            return await super(StreamingListMixin, self).alist(
+                request, *args, **kwargs
+            )
+
+        # The stream is written from a sync iterator either way.
+        return await sync_to_async(self.list)(request, *args, **kwargs)
+
+    def is_streaming(self, request):
+        return request.query_params.get("stream") in ("1", "true")
+
+    def stream(self, queryset, get_serializer):
+        renderer = JSONRenderer()
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        separator = b"["
+
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            serializer = get_serializer(chunk, many=True)
+            for item in serializer.data:
+                yield separator + renderer.render(item)
+                separator = b","
+
+        yield b"[]" if separator == b"[" else b"]"
+
 
 @extend_schema(tags=["Genre"])
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(
+    SerializerTimingMixin, CachedResponseMixin, viewsets.ModelViewSet
+):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Genre,)
 
 
 @extend_schema(tags=["Actor"])
-class ActorViewSet(viewsets.ModelViewSet):
+class ActorViewSet(
+    SerializerTimingMixin, CachedResponseMixin, viewsets.ModelViewSet
+):
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Actor,)
 
 
 @extend_schema(tags=["Play"])
-class PlayViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+    retrieve=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+)
+class PlayViewSet(
+    SerializerTimingMixin,
+    StreamingListMixin,
+    CachedResponseMixin,
+    FieldSelectionMixin,
+    ValuesListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     queryset = Play.objects.all()
     serializer_class = PlaySerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Play, Genre, Actor)
     filterset_class = PlayFilter
+    pagination_class = PlayPagination
+    values_serializer_class = PlayListValuesSerializer
 
     def get_queryset(self):
         queryset = self.queryset
 
-        if self.action in ("list", "retrieve"):
-            queryset = queryset.prefetch_related("genres", "actors")
+        if self.action == "retrieve":
+            for name, model in (("genres", Genre), ("actors", Actor)):
+                if self.expands(name):
+                    queryset = queryset.prefetch_related(name)
+                elif self.wants(name):
+                    queryset = queryset.prefetch_related(
+                        Prefetch(name, queryset=model.objects.only("id"))
+                    )
+
+            columns = self.selected_columns({
+                "genres": (),
+                "actors": (),
+                "poster": ("poster", "poster_variants"),
+                "posters": ("poster", "poster_variants"),
+            })
+            if columns is not None:
+                queryset = queryset.only(*columns)
 
         return queryset
 
@@ -86,39 +487,95 @@ class PlayViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(play, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            generate_variants(serializer.save())
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @extend_schema(tags=["Theatre Hall"])
-class TheatreHallViewSet(viewsets.ModelViewSet):
+class TheatreHallViewSet(
+    SerializerTimingMixin, CachedResponseMixin, viewsets.ModelViewSet
+):
     queryset = TheatreHall.objects.all()
     serializer_class = TheatreHallSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (TheatreHall,)
 
 
 @extend_schema(tags=["Performance"])
-class PerformanceViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+    retrieve=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+)
+class PerformanceViewSet(
+    SerializerTimingMixin,
+    StreamingListMixin,
+    FieldSelectionMixin,
+    ValuesListMixin,
+    WatermarkMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     queryset = Performance.objects.all()
     serializer_class = PerformanceSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     filterset_class = PerformanceFilter
+    pagination_class = PerformancePagination
+    values_serializer_class = PerformanceListValuesSerializer
+    watermark_models = (Performance, Play, Genre, Actor, TheatreHall)
     ordering_fields = ["show_time"]
+    SCHEDULE_DAYS = 7
 
     def get_queryset(self):
         queryset = self.queryset
 
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve") and self.wants(
+            "available_tickets"
+        ):
+            queryset = queryset.annotate(available_tickets=(
+                F("theatre_hall__rows")
+                * F("theatre_hall__seats_in_row")
+                - F("tickets_sold")
+            ))
+
+        if self.action == "retrieve":
+            related = [
+                name
+                for name in ("play", "theatre_hall")
+                if self.expands(name)
+            ]
+            if related:
+                queryset = queryset.select_related(*related)
+            if self.expands("play"):
+                queryset = queryset.prefetch_related(
+                    "play__genres",
+                    "play__actors"
+                )
+
+            columns = self.selected_columns({"available_tickets": ()})
+            if columns is not None:
+                queryset = queryset.only(*columns)
+
+        if self.action in ("seats", "events"):
+            queryset = queryset.select_related("theatre_hall")
+
+        if self.action == "schedule":
             queryset = (
                 queryset
-                .select_related("play", "theatre_hall")
-                .annotate(available_tickets=(
-                    F("theatre_hall__rows")
-                    * F("theatre_hall__seats_in_row")
-                    - Count("tickets")
-                ))
+                .filter(show_time__gte=timezone.now())
+                .order_by("show_time", "id")
+                .values(
+                    "id",
+                    "show_time",
+                    play_title=F("play__title"),
+                    theatre_hall_name=F("theatre_hall__name"),
+                    available_tickets=(
+                        F("theatre_hall__rows")
+                        * F("theatre_hall__seats_in_row")
+                        - F("tickets_sold")
+                    ),
+                )
             )
 
         return queryset
@@ -131,9 +588,107 @@ class PerformanceViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    @extend_schema(responses=PerformanceScheduleDaySerializer(many=True))
+    @action(methods=["GET"], detail=False, url_path="schedule")
+    def schedule(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if not {"to", "date_range"} & set(request.query_params):
+            last_day = timezone.localdate() + datetime.timedelta(
+                days=self.SCHEDULE_DAYS
+            )
+            queryset = queryset.filter(show_time__lt=day_start(last_day))
+
+        days = [
+            {"date": date, "performances": list(performances)}
+            for date, performances in groupby(
+                queryset,
+                key=lambda performance: timezone.localdate(
+                    performance["show_time"]
+                )
+            )
+        ]
+        serializer = timed_serializer(
+            request, PerformanceScheduleDaySerializer(days, many=True)
+        )
+
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "expanded",
+                type=OpenApiTypes.BOOL,
+                description="Also list taken seats as row/seat objects",
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(methods=["GET"], detail=True, url_path="seats")
+    def seats(self, request, pk=None):
+        return self.watermarked_response(self.seat_map_response, request)
+
+    async def aseats(self, request, pk=None):
+        return await self.awatermarked_response(
+            self.aseat_map_response, request
+        )
+
+    def seat_map_response(self, request):
+        performance = self.get_object()
+
+        return Response(
+            seat_map(performance, expanded=self.seats_expanded(request))
+        )
+
+    async def aseat_map_response(self, request):
+        performance = await self.aget_object()
+
+        return Response(
+            await aseat_map(performance, expanded=self.seats_expanded(request))
+        )
+
+    @extend_schema(
+        description=(
+            "Server-sent events: a `snapshot` of the seat map, then `taken` "
+            "and `released` deltas with the remaining seat count"
+        ),
+        responses={(200, events.CONTENT_TYPE): OpenApiTypes.STR},
+    )
+    async def aevents(self, request, pk=None):
+        performance = await self.aget_object()
+        # Subscribe before reading the snapshot, so no commit can fall
+        # between the two.
+        subscription = events.get_broker().subscribe(performance.id)
+        try:
+            snapshot = await aseat_map(performance)
+        except BaseException:
+            subscription.close()
+            raise
+        await sync_to_async(events.release_connections)()
+
+        return StreamingHttpResponse(
+            events.stream(subscription, snapshot),
+            content_type=events.CONTENT_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def get_watermark_lapse(self, pk):
+        # Expired holds free their seats without bumping the watermark.
+        if self.action == "seats":
+            return last_hold_expiry(pk)
+        return 0
+
+    def seats_expanded(self, request):
+        return request.query_params.get("expanded", "").lower() in (
+            "1", "true", "yes"
+        )
+
 
 @extend_schema(tags=["Reservation"])
 class ReservationViewSet(
+    SerializerTimingMixin,
+    StreamingListMixin,
+    IdempotentCreateMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
@@ -141,17 +696,20 @@ class ReservationViewSet(
 ):
     queryset = Reservation.objects.all()
     serializer_class = ReservationListSerializer
-    filter_backends = [filters.OrderingFilter]
     pagination_class = ReservationPagination
-    ordering_fields = ["show_time"]
 
     def get_queryset(self):
         queryset = self.queryset.filter(user=self.request.user)
 
         if self.action in ("list", "retrieve"):
             queryset = queryset.prefetch_related(
-                "tickets",
-                "tickets__performance"
+                Prefetch(
+                    "tickets",
+                    queryset=Ticket.objects.select_related(
+                        "performance__play",
+                        "performance__theatre_hall"
+                    )
+                )
             )
 
         return queryset
@@ -162,4 +720,256 @@ class ReservationViewSet(
     def get_serializer_class(self):
         if self.action == "create":
             return ReservationCreateSerializer
+        if self.action == "allocate":
+            return ReservationAllocateSerializer
+        if self.action == "batch":
+            return ReservationBatchSerializer
         return ReservationListSerializer
+
+    @extend_schema(
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
+        responses={201: ReservationCreateSerializer},
+    )
+    @action(methods=["POST"], detail=False, url_path="allocate")
+    def allocate(self, request):
+        """
+        Book ``count`` adjacent seats picked by the server, as close to the
+        middle of the hall as possible.
+        """
+        return self.create(request)
+
+    @extend_schema(responses=ReservationBatchResultSerializer(many=True))
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="batch",
+        permission_classes=[IsAdminUser],
+        pagination_class=None,
+    )
+    def batch(self, request):
+        """
+        Book reservations for any users at once, for box offices and
+        resellers. Every item gets its own result: the created
+        reservation, the seats that were not available or, for an item
+        that is not valid, its errors.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        items = serializer.validated_data["reservations"]
+        booked = iter(book_batch([
+            (item["user"], item["tickets"])
+            for item in items
+            if not isinstance(item, InvalidBatchItem)
+        ]))
+        results = [
+            item if isinstance(item, InvalidBatchItem) else next(booked)
+            for item in items
+        ]
+        serializer = timed_serializer(
+            request, ReservationBatchResultSerializer(results, many=True)
+        )
+        return Response(serializer.data)
+
+
+@extend_schema(tags=["Seat Hold"])
+class SeatHoldViewSet(
+    SerializerTimingMixin,
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet
+):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        queryset = self.queryset.filter(
+            user=self.request.user,
+            expires_at__gt=timezone.now()
+        )
+
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related("seats")
+
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @extend_schema(request=None, responses={201: ReservationCreateSerializer})
+    @action(methods=["POST"], detail=True, url_path="confirm")
+    def confirm(self, request, pk=None):
+        hold = self.get_object()
+
+        try:
+            reservation = confirm_hold(hold)
+        except SeatHold.DoesNotExist:
+            raise Http404
+        except SeatsUnavailable as error:
+            raise SeatsConflict(error.seats)
+
+        serializer = timed_serializer(
+            request, ReservationCreateSerializer(reservation)
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(
+    tags=["Search"],
+    parameters=[
+        OpenApiParameter("q", description="Search text", required=True),
+        OpenApiParameter("limit", type=OpenApiTypes.INT),
+    ],
+)
+class SearchViewSet(viewsets.ViewSet):
+    permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 50
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get("limit", ""))
+        except ValueError:
+            return self.DEFAULT_LIMIT
+        return max(1, min(limit, self.MAX_LIMIT))
+
+    @extend_schema(responses=SearchResultSerializer)
+    def list(self, request):
+        query = request.query_params.get("q", "")
+        limit = self.get_limit()
+        index = search.get_index()
+
+        play_ids = index.search_plays(query, limit)
+        actor_ids = index.search_actors(query, limit)
+        plays = Play.objects.prefetch_related("genres", "actors").in_bulk(
+            play_ids
+        )
+        actors = Actor.objects.in_bulk(actor_ids)
+
+        serializer = timed_serializer(request, SearchResultSerializer(
+            {
+                "plays": [plays[pk] for pk in play_ids if pk in plays],
+                "actors": [actors[pk] for pk in actor_ids if pk in actors],
+            },
+            context={"request": request},
+        ))
+        return Response(serializer.data)
+
+    @extend_schema(responses=AutocompleteSerializer)
+    @action(methods=["GET"], detail=False, url_path="autocomplete")
+    def autocomplete(self, request):
+        plays, actors = search.get_index().autocomplete(
+            request.query_params.get("q", ""), self.get_limit()
+        )
+
+        serializer = timed_serializer(
+            request,
+            AutocompleteSerializer({"plays": plays, "actors": actors}),
+        )
+        return Response(serializer.data)
+
+
+@extend_schema(tags=["Ticket Export"])
+class TicketExportViewSet(GenericViewSet):
+    queryset = Ticket.objects.all()
+    permission_classes = (IsAdminUser,)
+    filterset_class = TicketExportFilter
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "output",
+                enum=list(OUTPUT_FORMATS),
+                description="Export format, csv by default",
+            ),
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATE,
+                description="First sale day, inclusive",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATE,
+                description="Last sale day, inclusive",
+            ),
+        ],
+        responses={
+            (200, content_type): OpenApiTypes.STR
+            for content_type, _ in OUTPUT_FORMATS.values()
+        },
+    )
+    def list(self, request):
+        output = request.query_params.get("output", "csv")
+        if output not in OUTPUT_FORMATS:
+            raise ValidationError({
+                "output": f"Choose one of: {', '.join(OUTPUT_FORMATS)}."
+            })
+
+        queryset = self.filter_queryset(self.get_queryset())
+        content_type, _ = OUTPUT_FORMATS[output]
+        response = StreamingHttpResponse(
+            export_tickets(queryset, output), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tickets.{output}"'
+        )
+        return response
+
+
+PERFORMANCE_FILTER_PARAMETERS = [
+    OpenApiParameter("from", type=OpenApiTypes.DATE),
+    OpenApiParameter("to", type=OpenApiTypes.DATE),
+    OpenApiParameter("date_range", type=OpenApiTypes.INT),
+    OpenApiParameter("play", type=OpenApiTypes.STR),
+]
+
+
+@extend_schema(tags=["Analytics"])
+class AnalyticsViewSet(viewsets.ViewSet):
+    """Reads the sales summary table, never the ticket table."""
+
+    permission_classes = (IsAdminUser,)
+
+    def filter_performances(self):
+        filterset = PerformanceFilter(
+            self.request.query_params, queryset=Performance.objects.all()
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset.qs
+
+    @extend_schema(
+        parameters=[OccupancyQuerySerializer, *PERFORMANCE_FILTER_PARAMETERS],
+        responses=OccupancySerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="occupancy")
+    def occupancy(self, request):
+        query = OccupancyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        rows = analytics.occupancy(
+            self.filter_performances(), query.validated_data["group_by"]
+        )
+        serializer = timed_serializer(
+            request, OccupancySerializer(rows, many=True)
+        )
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[SalesQuerySerializer, *PERFORMANCE_FILTER_PARAMETERS],
+        responses=SalesPeriodSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="sales")
+    def sales(self, request):
+        query = SalesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        rows = analytics.sales(
+            self.filter_performances(), query.validated_data["interval"]
+        )
+        serializer = timed_serializer(
+            request, SalesPeriodSerializer(rows, many=True)
+        )
+        return Response(serializer.data)
@@ -47,7 +47,6 @@ INSTALLED_APPS = [
 
     "rest_framework",
     "rest_framework_simplejwt",
-    "debug_toolbar",
     "django_filters",
     "drf_spectacular",
 
@@ -57,7 +56,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "theatre.instrumentation.InstrumentationMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -66,6 +65,25 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(2, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
+# Addresses of scrapers that reach the workers directly and may read the
+# /metrics endpoint besides staff users. Behind a reverse proxy every request
+# comes from the proxy's address, so leave this empty there.
+METRICS_ALLOWED_IPS = [
+    address
+    for address in os.environ.get("METRICS_ALLOWED_IPS", "").split(",")
+    if address
+]
+
+# Carries seat availability events to stream subscribers: LocalBackend stays
+# within the publishing process, PostgresBackend reaches every worker
+AVAILABILITY_EVENTS_BACKEND = os.environ.get(
+    "AVAILABILITY_EVENTS_BACKEND", "theatre.events.LocalBackend"
+)
+
 ROOT_URLCONF = "theatre_api_service.urls"
 
 TEMPLATES = [